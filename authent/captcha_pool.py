@@ -0,0 +1,149 @@
+"""
+Vorgerenderter Captcha-Pool in Redis.
+
+Das Rendern eines Captchas (PIL) ist teuer; unter Bot-Last wäre es der größte
+CPU-Posten der Web-Prozesse. Ein Celery-Task (``authent.tasks``) füllt deshalb
+einen Pool mit fertigen Captchas; der Request-Pfad entnimmt nur noch eins.
+
+Pro Captcha liegen in Redis (jeweils mit TTL):
+
+* ``captcha:img:<id>`` – PNG-Bytes (ausgeliefert von ``views.captcha_pool_image``)
+* ``captcha:ans:<id>`` – HMAC der Lösung (nie die Lösung selbst)
+* ``captcha:pool``     – ZSET der verfügbaren IDs, Score = Ablaufzeitpunkt
+
+Entnahme per ``ZPOPMIN`` (jede ID wird genau einmal ausgegeben), Prüfung per
+``GETDEL`` (jede Lösung wird genau einmal akzeptiert). Ist der Pool leer, wird
+ein Captcha im Request erzeugt – wie bisher, nur ohne DB-Zeile.
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+
+import redis
+from django.conf import settings
+
+from config.cache import get_redis, make_key
+
+logger = logging.getLogger(__name__)
+
+POOL_KEY = "captcha:pool"
+IMAGE_KEY = "captcha:img:{id}"
+ANSWER_KEY = "captcha:ans:{id}"
+# Obergrenze für Versuche, ein noch gültiges Captcha aus dem Pool zu ziehen
+MAX_POP_ATTEMPTS = 5
+
+
+def _key(template: str, captcha_id: str = "") -> str:
+    return make_key(template.format(id=captcha_id))
+
+
+def _answer_hash(response: str) -> str:
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(), response.strip().lower().encode(), hashlib.sha256
+    )
+    return digest.hexdigest()
+
+
+def render_captcha() -> tuple[str, bytes]:
+    """
+    Erzeugt ein Captcha mit den Einstellungen von django-simple-captcha
+    (Challenge-Funktion, Schrift, Rauschen) und gibt ``(lösung, png)`` zurück.
+    Die dafür nötige ``CaptchaStore``-Zeile wird sofort wieder gelöscht.
+    """
+    from captcha.models import CaptchaStore
+    from captcha.views import captcha_image
+
+    key = CaptchaStore.generate_key()
+    try:
+        store = CaptchaStore.objects.get(hashkey=key)
+        png = captcha_image(None, key).content
+        return store.response, png
+    finally:
+        CaptchaStore.objects.filter(hashkey=key).delete()
+
+
+def _store(target, captcha_id: str, response: str, png: bytes, ttl: int) -> None:
+    """Bild + Lösungs-Hash ablegen (``target``: Redis-Client oder Pipeline)."""
+    target.set(_key(IMAGE_KEY, captcha_id), png, ex=ttl)
+    target.set(_key(ANSWER_KEY, captcha_id), _answer_hash(response), ex=ttl)
+
+
+def fill_pool(limit: int | None = None) -> int:
+    """
+    Füllt den Pool auf ``CAPTCHA_POOL_SIZE`` auf (höchstens ``limit`` neue
+    Captchas pro Aufruf). Fast abgelaufene Einträge werden vorher entfernt.
+    Gibt die Anzahl neu erzeugter Captchas zurück.
+    """
+    r = get_redis()
+    now = time.time()
+    pool = _key(POOL_KEY)
+    r.zremrangebyscore(pool, "-inf", now + settings.CAPTCHA_POOL_MIN_REMAINING)
+    missing = settings.CAPTCHA_POOL_SIZE - r.zcard(pool)
+    if limit is not None:
+        missing = min(missing, limit)
+
+    created = 0
+    for _ in range(max(0, missing)):
+        response, png = render_captcha()
+        captcha_id = secrets.token_urlsafe(16)
+        ttl = settings.CAPTCHA_POOL_TTL
+        pipe = r.pipeline()
+        _store(pipe, captcha_id, response, png, ttl)
+        pipe.zadd(pool, {captcha_id: now + ttl})
+        pipe.execute()
+        created += 1
+    return created
+
+
+def issue() -> str:
+    """
+    Nächstes Captcha aus dem Pool nehmen (oder im Notfall sofort erzeugen).
+    Gibt die Captcha-ID zurück.
+    """
+    try:
+        r = get_redis()
+        pool = _key(POOL_KEY)
+        for _ in range(MAX_POP_ATTEMPTS):
+            popped = r.zpopmin(pool)
+            if not popped:
+                break
+            captcha_id, _expires = popped[0]
+            captcha_id = captcha_id.decode() if isinstance(captcha_id, bytes) else captcha_id
+            if r.exists(_key(ANSWER_KEY, captcha_id)):
+                return captcha_id
+
+        logger.warning("Captcha-Pool leer – erzeuge Captcha im Request")
+        response, png = render_captcha()
+        captcha_id = secrets.token_urlsafe(16)
+        _store(r, captcha_id, response, png, settings.CAPTCHA_POOL_TTL)
+        return captcha_id
+    except redis.RedisError as exc:
+        logger.error("Captcha-Pool nicht erreichbar: %s", exc)
+        raise
+
+
+def get_image(captcha_id: str) -> bytes | None:
+    try:
+        return get_redis().get(_key(IMAGE_KEY, captcha_id))
+    except redis.RedisError:
+        return None
+
+
+def verify(captcha_id: str, response: str) -> bool:
+    """Prüft die Lösung und verbraucht das Captcha (auch bei falscher Antwort)."""
+    if not captcha_id or response is None:
+        return False
+    try:
+        r = get_redis()
+        expected = r.getdel(_key(ANSWER_KEY, captcha_id))
+        r.delete(_key(IMAGE_KEY, captcha_id))
+    except redis.RedisError as exc:
+        logger.error("Captcha-Prüfung nicht möglich: %s", exc)
+        return False
+    if expected is None:
+        return False
+    expected = expected.decode() if isinstance(expected, bytes) else expected
+    return hmac.compare_digest(expected, _answer_hash(response))
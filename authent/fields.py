@@ -0,0 +1,53 @@
+"""
+Formularfeld für Captchas aus dem Redis-Pool (``authent.captcha_pool``).
+
+Ersetzt ``captcha.fields.CaptchaField``: gleiches Bedienkonzept (Bild +
+verstecktes ID-Feld + Antwortfeld), aber ohne ``CaptchaStore``-Zeile und
+ohne Rendern im Request.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+from captcha.fields import CaptchaAnswerInput, CaptchaHiddenInput
+
+from . import captcha_pool
+
+
+class PooledCaptchaWidget(forms.MultiWidget):
+    template_name = 'authent/widgets/pooled_captcha.html'
+
+    def __init__(self, attrs=None):
+        super().__init__((CaptchaHiddenInput(attrs), CaptchaAnswerInput(attrs)), attrs)
+
+    def decompress(self, value):
+        return [None, None]
+
+    def get_context(self, name, value, attrs):
+        # Jedes Rendern gibt ein neues Captcha aus (eine Antwort wird nie zurückgegeben)
+        captcha_id = captcha_pool.issue()
+        context = super().get_context(name, [captcha_id, ''], attrs)
+        context['image_url'] = reverse('captcha_pool_image', args=[captcha_id])
+        return context
+
+
+class PooledCaptchaField(forms.MultiValueField):
+    widget = PooledCaptchaWidget
+    default_error_messages = {
+        'invalid': _('Ungültiges Captcha.'),
+    }
+
+    def __init__(self, **kwargs):
+        fields = (forms.CharField(), forms.CharField())
+        super().__init__(fields, require_all_fields=True, **kwargs)
+
+    def compress(self, data_list):
+        return data_list
+
+    def clean(self, value):
+        captcha_id, response = super().clean(value)
+        if not captcha_pool.verify(captcha_id, response):
+            raise ValidationError(self.error_messages['invalid'], code='invalid')
+        return response
@@ -1,8 +1,9 @@
-from captcha.fields import CaptchaField
 from django import forms
+from authent.fields import PooledCaptchaField
 
 class CaptchaForm(forms.Form):
-    captcha = CaptchaField()
+    # Captchas kommen vorgerendert aus dem Redis-Pool (authent/captcha_pool.py)
+    captcha = PooledCaptchaField()
     class Meta:
         fields = "captcha"
     pass
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+TOTP-QR-Code ohne Dateisystem.
+
+Der QR-Code wird als SVG im Speicher erzeugt und als ``data:``-URI direkt ins
+Template eingebettet – keine PNG-Datei unter ``MEDIA_ROOT``, kein
+Static-Serving, nichts aufzuräumen. Das Ergebnis liegt bis zur erfolgreichen
+2FA-Verifizierung in der Session, damit ein erneutes Anzeigen nicht neu rendert.
+"""
+
+import base64
+
+import qrcode
+from qrcode.image.svg import SvgPathFillImage
+
+SESSION_KEY = 'otp_qr'
+
+
+def render_qr_data_uri(data: str) -> str:
+    """``data`` als QR-Code (SVG) → ``data:image/svg+xml;base64,…``."""
+    svg = qrcode.make(data, image_factory=SvgPathFillImage).to_string()
+    return 'data:image/svg+xml;base64,' + base64.b64encode(svg).decode('ascii')
+
+
+def otp_qr_data_uri(request, device) -> str:
+    """QR-Code für ``device.config_url``, zwischengespeichert in der Session."""
+    cached = request.session.get(SESSION_KEY)
+    if cached and cached.get('device_id') == device.pk:
+        return cached['uri']
+    uri = render_qr_data_uri(device.config_url)
+    request.session[SESSION_KEY] = {'device_id': device.pk, 'uri': uri}
+    return uri
+
+
+def forget_otp_qr(request) -> None:
+    """QR-Code aus der Session entfernen (nach erfolgreicher Verifizierung)."""
+    request.session.pop(SESSION_KEY, None)
@@ -0,0 +1,19 @@
+import logging
+
+from celery import shared_task
+
+from . import captcha_pool
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name='authent.tasks.refill_captcha_pool')
+def refill_captcha_pool(self, limit=None):
+    """
+    Füllt den Captcha-Pool in Redis auf (Beat, siehe CELERY_BEAT_SCHEDULE).
+    Das Rendern findet damit im Worker statt, nicht im Web-Prozess.
+    """
+    created = captcha_pool.fill_pool(limit=limit)
+    if created:
+        logger.info("Captcha-Pool: %d neue Captchas", created)
+    return created
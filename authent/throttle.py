@@ -0,0 +1,192 @@
+"""
+Login-Drosselung mit gleitendem Zeitfenster, gemeinsam für alle Worker.
+
+Fehlversuche werden in Redis pro (Benutzername, Subnetz), pro IP und pro
+Subnetz (IPv4 /24, IPv6 /64) als Sorted Set (Score = Zeitstempel in ms)
+gezählt. Prüfen und Zählen laufen jeweils als Lua-Skript – atomar über alle
+Schlüssel, ohne Race zwischen Workern.
+
+Der Benutzername allein führt zu keiner Sperre – sonst könnte jeder von
+überall jedes Konto (auch das des Admins) mit ein paar falschen Passwörtern
+aussperren. Sein Zähler (deutlich höheres Limit) verlangt nur ein neues
+Captcha pro Versuch (:func:`needs_captcha`).
+
+Die Prüfung geschieht *vor* ``authenticate()``; ein gesperrter Versuch kostet
+also keinen Passwort-Hash. Zusätzlich merkt sich jeder Prozess aktive
+Sperren in einem lokalen TTL-Cache – wiederholte Versuche eines gesperrten
+Angreifers erreichen Redis gar nicht erst.
+"""
+
+import hashlib
+import ipaddress
+import logging
+import threading
+import time
+
+import redis
+from cachetools import TTLCache
+from django.conf import settings
+
+from config.cache import get_redis, make_key
+from ip_policy import TrustedProxies, parse_networks
+
+logger = logging.getLogger(__name__)
+
+# KEYS: Zähler; ARGV: jetzt_ms, fenster_ms, limit_1 … limit_n
+# Rückgabe: je Schlüssel 0 = erlaubt, sonst ms bis zum nächsten freien Versuch
+_CHECK_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local waits = {}
+for i, key in ipairs(KEYS) do
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  waits[i] = 0
+  if redis.call('ZCARD', key) >= tonumber(ARGV[i + 2]) then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    waits[i] = math.max(1, tonumber(oldest[2]) + window - now)
+  end
+end
+return waits
+"""
+
+# KEYS: Zähler; ARGV: jetzt_ms, fenster_ms, eindeutiges Mitglied
+_HIT_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+for _, key in ipairs(KEYS) do
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  redis.call('ZADD', key, now, ARGV[3])
+  redis.call('PEXPIRE', key, window)
+end
+return 1
+"""
+
+_scripts = None
+_deny = TTLCache(maxsize=settings.LOGIN_THROTTLE_LOCAL_CACHE_SIZE, ttl=settings.LOGIN_THROTTLE_WINDOW)
+_deny_lock = threading.Lock()
+_proxies = TrustedProxies(parse_networks(settings.ADMIN_TRUSTED_PROXIES))
+
+
+def client_ip(request) -> str:
+    """Client-IP (``X-Forwarded-For`` nur hinter vertrauenswürdigen Proxys)."""
+    return _proxies.client_ip(
+        request.META.get("REMOTE_ADDR"), request.META.get("HTTP_X_FORWARDED_FOR"),
+    ) or ""
+
+
+def _subnet(ip: str) -> str:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return "invalid"
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{addr}/{prefix}", strict=False))
+
+
+def _user_key(username: str, *scope: str) -> str:
+    digest = hashlib.sha256((username or "").strip().lower().encode()).hexdigest()[:32]
+    return make_key("login_throttle", "user", digest, *scope)
+
+
+def _keys(username: str, ip: str) -> list[tuple[str, int]]:
+    """``[(schlüssel, limit), …]`` der harten Sperren: Benutzername im Subnetz, IP und Subnetz."""
+    limits = settings.LOGIN_THROTTLE_LIMITS
+    subnet = _subnet(ip)
+    return [
+        (_user_key(username, subnet), limits["user"]),
+        (make_key("login_throttle", "ip", ip), limits["ip"]),
+        (make_key("login_throttle", "subnet", subnet), limits["subnet"]),
+    ]
+
+
+def _get_scripts():
+    global _scripts
+    if _scripts is None:
+        r = get_redis()
+        _scripts = (r.register_script(_CHECK_LUA), r.register_script(_HIT_LUA))
+    return _scripts
+
+
+def check(username: str, ip: str) -> int:
+    """
+    Gibt 0 zurück, wenn ein Login-Versuch erlaubt ist, sonst die Wartezeit
+    in Sekunden.
+    """
+    keys = _keys(username, ip)
+    now = time.time()
+    with _deny_lock:
+        until = max((_deny.get(key, 0) for key, _ in keys), default=0)
+    if until > now:
+        return int(until - now) + 1
+
+    try:
+        check_script, _ = _get_scripts()
+        waits = check_script(
+            keys=[key for key, _ in keys],
+            args=[int(now * 1000), settings.LOGIN_THROTTLE_WINDOW * 1000, *(limit for _, limit in keys)],
+        )
+    except redis.RedisError as exc:
+        # Fail-open: der IP-Ratelimit-Decorator des Logins greift weiterhin
+        logger.warning("Login-Drosselung nicht prüfbar (%s)", exc)
+        return 0
+
+    retry_ms = max(int(w) for w in waits)
+    if retry_ms <= 0:
+        return 0
+    with _deny_lock:
+        # Nur die überschrittenen Schlüssel lokal sperren
+        for (key, _), wait in zip(keys, waits):
+            if int(wait) > 0:
+                _deny[key] = now + int(wait) / 1000
+    return retry_ms // 1000 + 1
+
+
+def needs_captcha(username: str) -> bool:
+    """
+    ``True``, wenn ein Benutzername von überall her viele Fehlversuche hatte
+    (``LOGIN_THROTTLE_LIMITS["user_captcha"]``) – dann kostet jeder Versuch
+    ein neues Captcha, gesperrt wird das Konto aber nicht.
+    """
+    now = time.time()
+    try:
+        check_script, _ = _get_scripts()
+        waits = check_script(
+            keys=[_user_key(username)],
+            args=[int(now * 1000), settings.LOGIN_THROTTLE_WINDOW * 1000,
+                  settings.LOGIN_THROTTLE_LIMITS["user_captcha"]],
+        )
+    except redis.RedisError as exc:
+        logger.warning("Login-Drosselung nicht prüfbar (%s)", exc)
+        return False
+    return int(waits[0]) > 0
+
+
+def record_failure(username: str, ip: str) -> None:
+    """Fehlversuch für Benutzername (global und im Subnetz), IP und Subnetz zählen."""
+    keys = [key for key, _ in _keys(username, ip)] + [_user_key(username)]
+    now = time.time()
+    member = f"{now:.6f}:{threading.get_ident()}"
+    try:
+        _, hit_script = _get_scripts()
+        hit_script(
+            keys=keys,
+            args=[int(now * 1000), settings.LOGIN_THROTTLE_WINDOW * 1000, member],
+        )
+    except redis.RedisError as exc:
+        logger.warning("Login-Fehlversuch nicht gezählt (%s)", exc)
+
+
+def reset_user(username: str, ip: str) -> None:
+    """
+    Nach erfolgreichem Login die Zähler des Benutzernamens verwerfen.
+    IP- und Subnetz-Zähler bleiben – sonst könnte ein Angreifer sie mit einem
+    eigenen Konto zurücksetzen.
+    """
+    keys = [_user_key(username, _subnet(ip)), _user_key(username)]
+    with _deny_lock:
+        for key in keys:
+            _deny.pop(key, None)
+    try:
+        get_redis().delete(*keys)
+    except redis.RedisError:
+        pass
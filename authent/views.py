@@ -3,40 +3,19 @@ from django.contrib.auth.models import User, AnonymousUser
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django_otp.plugins.otp_totp.models import TOTPDevice
-import qrcode
-from io import BytesIO
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-import random
-import string
 from authent.forms import CaptchaForm
+from authent.qr import otp_qr_data_uri, forget_otp_qr
+from authent import captcha_pool, throttle
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
 from core.settings import PLATFORM_NAME, IP_RATELIMIT_PER_MINUTE
 from django_smart_ratelimit import rate_limit
 
 from paas.models import UserDeploymentLimit
 
 
-def generateRandomString(length=20):
-  """
-  Generiert eine zufällige Zeichenkette mit Buchstaben (Groß- und Kleinbuchstaben) und Zahlen.
-
-  Args:
-    length: Die Länge der zu generierenden Zeichenkette.  Standardmäßig 20.
-
-  Returns:
-    Eine zufällige Zeichenkette.
-  """
-  signs = string.ascii_letters + string.digits
-  randomString = ''.join(random.choice(signs) for _ in range(length))
-  return randomString
-
 @rate_limit(key='ip', rate=f'{IP_RATELIMIT_PER_MINUTE}/m', block=True)
 def verify_2fa(request):
-    # Image Name des QR Code aus der Session abrufen und Bild-Datei löschen
-    img_name = request.session.get('img_name')
-    file_path = f'otp_qr/{img_name}'
-    path = default_storage.delete(file_path)
-
     # Stelle sicher, dass der Benutzer ID aus der Sitzung abgerufen wird
     user = None
     temp_user_id = request.session.get('temp_user_id')
@@ -59,6 +38,7 @@ def verify_2fa(request):
             # OTP korrekt, 2FA erfolgreich bestätigt
             device.confirmed = True
             device.save()
+            forget_otp_qr(request)
 
             # Benutzer jetzt vollständig einloggen
             if temp_user_id:
@@ -111,9 +91,26 @@ def login_view(request):
     if request.method == "POST":
         username = request.POST["username"]
         password = request.POST["password"]
+        ip = throttle.client_ip(request)
+
+        # Vor authenticate() – gesperrte Versuche kosten keinen Passwort-Hash
+        retry_after = throttle.check(username, ip)
+        if retry_after:
+            response = render(request, 'authent/login.html', {
+                'error_message': f"Zu viele Fehlversuche. Bitte in {retry_after // 60 + 1} Minuten erneut versuchen.",
+                "PLATFORM_NAME": PLATFORM_NAME,
+            }, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        # Konto wird von überall her geraten: nicht sperren, aber jeder Versuch kostet ein Captcha
+        if throttle.needs_captcha(username):
+            request.session.pop('captcha_solved', None)
+
         user = authenticate(request,username=username,password=password)
 
         if user is not None:
+            throttle.reset_user(username, ip)
             # Wenn der Benutzer 2FA aktiviert hat, leite zur OTP-Verifizierung weiter
             if user.totpdevice_set.exists() and user.totpdevice_set.first().confirmed:
                 # Temporäre Sitzung ohne vollständiges Login, nur für 2FA
@@ -124,6 +121,7 @@ def login_view(request):
             login(request, user)
             return redirect('dashboard')  # Weiterleitung zur Startseite oder Dashboard
         else:
+            throttle.record_failure(username, ip)
             login_attempts = login_attempts+1
             request.session['login_attempts'] = login_attempts
             error_message="Benutzername oder Passwort nicht korrekt!"
@@ -229,29 +227,15 @@ def register_view(request):
             # Erstelle ein neues TOTP-Gerät für den Benutzer
             device = TOTPDevice.objects.create(user=user)
 
-            # QR-Code aus dem URL für das TOTP-Gerät generieren
-            img = qrcode.make(device.config_url)  # QR-Code für den geheimen Schlüssel erstellen
-            img_io = BytesIO()
-            img.save(img_io)
-            img_io.seek(0)
+            # QR-Code im Speicher als SVG‑data‑URI erzeugen (keine Datei unter MEDIA_ROOT)
+            qr_code_url = otp_qr_data_uri(request, device)
             otp_config_url = device.config_url
 
-            # Speichern des QR-Codes im richtigen Verzeichnis
-            #img_name = f'otp_qr_{user.username}.png'
-            rand_str = generateRandomString(20)
-            img_name = f'otp_qr_{rand_str}.png'
-            request.session['img_name'] = img_name
-
-            # Speichern im MEDIA_ROOT-Verzeichnis (sicherer Ort für benutzerspezifische Dateien)
-            file_path = f'otp_qr/{img_name}'  # Verzeichnis "otp_qr" unter MEDIA_ROOT
-            img_file = ContentFile(img_io.read())
-            path = default_storage.save(file_path, img_file)
-
             # Erfolgsmeldung und Weiterleitung
             success_message = "Registrierung erfolgreich. 2FA muss noch eingerichtet werden."
-            # Den Dateipfad zur Anzeige des QR-Codes zurückgeben
+            # QR-Code (data‑URI) zur Anzeige zurückgeben
             return render(request, 'authent/enable_2fa.html', {
-                'qr_code_url': default_storage.url(path),
+                'qr_code_url': qr_code_url,
                 'success_message': success_message,
                 'otp_config_url': otp_config_url,
                 'PLATFORM_NAME': PLATFORM_NAME,
@@ -268,4 +252,11 @@ def register_view(request):
     })  # Formularseite anzeigen
 
 
-
+@never_cache
+def captcha_pool_image(request, captcha_id):
+    """Liefert ein vorgerendertes Captcha-Bild aus Redis (kein Rendern, keine DB)."""
+    png = captcha_pool.get_image(captcha_id)
+    if png is None:
+        # 410 wie django-simple-captcha: abgelaufen oder schon verbraucht
+        return HttpResponse(status=410)
+    return HttpResponse(png, content_type="image/png")
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ConfigAppConfig(AppConfig):
+  name = 'config'
+  default_auto_field = 'django.db.models.BigAutoField'
+
+  def ready(self):
+      # Signals für die Cache-Invalidierung der Platform-Settings registrieren
+      import config.signals  # noqa
+      logger.debug("Config signals loaded.")
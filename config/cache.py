@@ -0,0 +1,136 @@
+"""
+Gemeinsame Cache-Schicht auf Basis des Redis-Servers, der ohnehin als
+Celery-Broker benötigt wird.
+
+* ``cache`` (Django) ist in ``core/settings.py`` als ``RedisCache`` mit
+  ``KEY_PREFIX`` konfiguriert – alle Gunicorn- und Celery-Prozesse sehen
+  dieselben Werte.
+* :func:`get_redis` liefert einen rohen Redis-Client (gleiche Instanz/DB)
+  für Operationen, die die Django-Cache-API nicht abbildet (Listen, Lua …).
+* :func:`incr` ist ein atomarer Zähler (z.B. Round-Robin).
+* :func:`get_or_compute` schützt teure Werte vor Cache-Stampedes
+  (Single-Flight-Lock + probabilistisches, frühzeitiges Neuberechnen).
+"""
+
+import logging
+import math
+import random
+import time
+from typing import Any, Callable
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_SUFFIX = ":lock"
+LOCK_TIMEOUT = 30           # Sekunden – max. Dauer einer Neuberechnung
+LOCK_WAIT = 5.0             # Sekunden, die Verlierer auf den Gewinner warten
+LOCK_POLL_INTERVAL = 0.05
+
+_pool = None
+
+
+def make_key(*parts) -> str:
+    """
+    Baut einen Namespace-Schlüssel für *rohe* Redis-Zugriffe.
+    (Die Django-Cache-API hängt ``KEY_PREFIX`` selbst an.)
+    """
+    return ":".join([settings.CACHE_KEY_PREFIX, *(str(p) for p in parts)])
+
+
+def get_redis() -> redis.Redis:
+    """
+    Roher Redis-Client auf dieselbe Datenbank wie der Django-Cache.
+    Der Connection-Pool wird pro Prozess einmalig angelegt.
+    """
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool.from_url(
+            settings.REDIS_CACHE_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return redis.Redis(connection_pool=_pool)
+
+
+def incr(key: str, timeout: int | None = None) -> int:
+    """
+    Atomarer Zähler über alle Prozesse hinweg.
+    Legt den Schlüssel bei Bedarf mit 0 an und liefert den *neuen* Wert.
+    """
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Schlüssel ist zwischen add() und incr() abgelaufen
+        cache.add(key, 0, timeout)
+        return cache.incr(key)
+
+
+def _should_refresh_early(delta: float, expiry: float, beta: float) -> bool:
+    """
+    XFetch („Optimal Probabilistic Cache Stampede Prevention“):
+    je näher das Ablaufdatum und je teurer die Berechnung (``delta``),
+    desto wahrscheinlicher rechnet *ein* Aufrufer vorzeitig neu.
+    """
+    if beta <= 0:
+        return False
+    return time.time() - delta * beta * math.log(random.random() or 1e-12) >= expiry
+
+
+def _compute_and_store(key: str, compute: Callable[[], Any], timeout: int) -> Any:
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(key, (value, delta, time.time() + timeout), timeout)
+    return value
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int = 300,
+    beta: float = 1.0,
+) -> Any:
+    """
+    Liefert ``compute()`` aus dem Cache – mit Stampede-Schutz.
+
+    * Treffer: Wert wird direkt zurückgegeben; kurz vor Ablauf rechnet genau
+      ein Prozess (der das Lock bekommt) im Voraus neu, alle anderen liefern
+      weiterhin den alten Wert.
+    * Fehlschlag: nur der Lock-Inhaber berechnet, die übrigen warten bis zu
+      ``LOCK_WAIT`` Sekunden auf das Ergebnis und rechnen erst danach selbst.
+    * Ist Redis nicht erreichbar, wird einfach direkt berechnet.
+    """
+    lock_key = f"{key}{LOCK_SUFFIX}"
+    try:
+        entry = cache.get(key)
+        if entry is not None:
+            value, delta, expiry = entry
+            if _should_refresh_early(delta, expiry, beta) and cache.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    return _compute_and_store(key, compute, timeout)
+                finally:
+                    cache.delete(lock_key)
+            return value
+
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            try:
+                return _compute_and_store(key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+
+        # Ein anderer Prozess rechnet bereits – kurz auf sein Ergebnis warten
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        return _compute_and_store(key, compute, timeout)
+
+    except redis.RedisError as exc:
+        logger.warning("Cache nicht verfügbar (%s) – berechne %s direkt", exc, key)
+        return compute()
@@ -0,0 +1,182 @@
+"""
+Zweistufiger Cache für :class:`~config.models.PlatformSetting`.
+
+1. Prozess-lokaler Snapshot (``dict``) – ein Zugriff im Hot-Path ist ein
+   Dict-Lookup, Typ-Konvertierungen werden pro Snapshot nur einmal gemacht.
+2. Gemeinsamer Redis-Cache – der Snapshot *aller* Settings wird mit einer
+   einzigen Query geladen und unter einer Versionsnummer abgelegt.
+
+Speichern/Löschen eines ``PlatformSetting`` erhöht die Versionsnummer
+(siehe ``config/signals.py``). Jeder Prozess vergleicht seine lokale
+Version höchstens alle ``PLATFORM_SETTINGS_LOCAL_TTL`` Sekunden mit Redis
+und lädt bei Abweichung den neuen Snapshot.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from config.cache import get_or_compute, incr
+from config.models import PlatformSetting
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "platform_settings:version"
+SNAPSHOT_KEY = "platform_settings:snapshot:{version}"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+TRUE_VALUES = ("true", "1", "yes", "on")
+# Version eines direkt aus der DB geladenen Snapshots (Redis nicht erreichbar) –
+# nie gleich einer Redis-Version, unterliegt aber wie diese ``local_ttl``
+LOCAL_VERSION = "local"
+
+
+def _to_bool(raw: str) -> bool:
+    return raw.strip().lower() in TRUE_VALUES
+
+
+def _to_json(raw: str) -> Any:
+    return json.loads(raw)
+
+
+# cast_type → Konverter (``json``, ``list`` und ``dict`` parsen JSON)
+CASTS: dict[Any, Callable[[str], Any]] = {
+    str: str,
+    int: int,
+    float: float,
+    bool: _to_bool,
+    json: _to_json,
+    list: _to_json,
+    dict: _to_json,
+}
+
+
+class SettingsRegistry:
+    """Prozess-lokaler Snapshot aller Platform-Settings."""
+
+    def __init__(self, local_ttl: float | None = None):
+        self.local_ttl = (
+            local_ttl if local_ttl is not None
+            else getattr(settings, "PLATFORM_SETTINGS_LOCAL_TTL", 5)
+        )
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._raw: dict[str, str] = {}
+        self._typed: dict[tuple, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Laden / Invalidieren
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _load_all() -> dict[str, str]:
+        """Alle Settings mit *einer* Query."""
+        return dict(PlatformSetting.objects.values_list("key", "value"))
+
+    @staticmethod
+    def _shared_version() -> int:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    def _refresh(self) -> None:
+        try:
+            version = self._shared_version()
+            if version == self._version:
+                return
+            raw = get_or_compute(
+                SNAPSHOT_KEY.format(version=version), self._load_all, SNAPSHOT_TIMEOUT
+            )
+        except redis.RedisError as exc:
+            # Ohne Redis: vorhandenen Snapshot weiterverwenden, sonst direkt aus der DB.
+            # Der nächste Versuch folgt erst nach local_ttl – sonst kostete jeder
+            # Zugriff während eines Ausfalls den Socket-Timeout plus eine Query.
+            logger.warning("Settings-Version nicht lesbar (%s)", exc)
+            if self._version is not None:
+                return
+            version, raw = LOCAL_VERSION, self._load_all()
+
+        self._raw = raw
+        self._typed = {}
+        self._version = version
+
+    def snapshot(self) -> dict[str, str]:
+        """Aktueller Roh-Snapshot (``key → value``)."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.local_ttl or self._version is None:
+            with self._lock:
+                if now - self._checked_at >= self.local_ttl or self._version is None:
+                    self._refresh()
+                    self._checked_at = now
+        return self._raw
+
+    def invalidate(self) -> None:
+        """Version erhöhen → alle Prozesse laden beim nächsten Check neu."""
+        try:
+            incr(VERSION_KEY)
+        except redis.RedisError as exc:
+            logger.warning("Settings-Version konnte nicht erhöht werden (%s)", exc)
+        self._checked_at = 0.0
+        self._version = None
+
+    # ------------------------------------------------------------------
+    # Zugriff
+    # ------------------------------------------------------------------
+    def _lookup(self, key: str, cast_type: Any) -> tuple[bool, bool, Any]:
+        """
+        Liefert ``(vorhanden, konvertiert, wert)``; das Ergebnis wird pro
+        Snapshot und ``(key, cast_type)`` nur einmal berechnet.
+        """
+        raw = self.snapshot()
+        typed = self._typed
+        cache_key = (key, cast_type)
+        if cache_key in typed:
+            return typed[cache_key]
+        if key not in raw:
+            return False, False, None
+
+        value, ok = raw[key], True
+        try:
+            value = CASTS.get(cast_type, cast_type)(value)
+        except Exception:
+            ok = False
+        typed[cache_key] = (True, ok, value)
+        return True, ok, value
+
+    def get(self, key: str, default: Any = None, cast_type: Any = str) -> Any:
+        """
+        Typisierter Zugriff; schlägt die Konvertierung fehl, wird der rohe
+        String geliefert (wie bisher in ``get_app_setting``).
+        """
+        found, _, value = self._lookup(key, cast_type)
+        return value if found else default
+
+    def _get_typed(self, key: str, default: Any, cast_type: Any) -> Any:
+        found, ok, value = self._lookup(key, cast_type)
+        return value if found and ok else default
+
+    def get_str(self, key: str, default: str | None = None) -> str | None:
+        return self._get_typed(key, default, str)
+
+    def get_int(self, key: str, default: int | None = None) -> int | None:
+        return self._get_typed(key, default, int)
+
+    def get_float(self, key: str, default: float | None = None) -> float | None:
+        return self._get_typed(key, default, float)
+
+    def get_bool(self, key: str, default: bool | None = None) -> bool | None:
+        return self._get_typed(key, default, bool)
+
+    def get_json(self, key: str, default: Any = None) -> Any:
+        return self._get_typed(key, default, json)
+
+
+registry = SettingsRegistry()
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from config.models import PlatformSetting
+from config.registry import registry
+
+
+@receiver(post_save, sender=PlatformSetting)
+@receiver(post_delete, sender=PlatformSetting)
+def invalidate_platform_settings(sender, instance: PlatformSetting, **kwargs):
+  """Neue Settings-Version erst nach dem Commit – sonst lesen andere Prozesse noch den alten Stand."""
+  transaction.on_commit(registry.invalidate)
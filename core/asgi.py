@@ -3,6 +3,9 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Die Log-Streams (``paas.views.stream_logs``) sind asynchron; unter ASGI hält ein
+offener Stream nur eine Coroutine statt eines ganzen Workers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,7 +13,7 @@ app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Importiere alle Aufgaben (Tasks)
-app.autodiscover_tasks(['paas.tasks'])
+app.autodiscover_tasks(['paas.tasks', 'authent.tasks'])
 
 # Celery-Logger explizit setzen
 logger = logging.getLogger('celery')
@@ -35,6 +35,20 @@ ADMIN_IP_LIMITER_ENABLED = os.getenv('ADMIN_IP_LIMITER_ENABLED','True').lower()
 
 private_ip_ranges_raw = os.getenv('PRIVATE_IP_RANGES', '127.0.0.1')
 PRIVATE_IP_RANGES = [h.strip() for h in private_ip_ranges_raw.split(',')]
+# Optionale Listen (eine CIDR pro Zeile), z.B. für tausende Netze
+ADMIN_IP_ALLOWLIST_FILE = os.getenv('ADMIN_IP_ALLOWLIST_FILE')
+ADMIN_IP_DENYLIST_FILE = os.getenv('ADMIN_IP_DENYLIST_FILE')
+# Nur von diesen Adressen wird X-Forwarded-For ausgewertet (Reverse-Proxy). Standard: nur Loopback –
+# jeder Host in einem vertrauten Netz kann die Client-IP frei setzen (Login-Drossel, /metrics).
+# Läuft der Proxy in einem anderen Container/Host, genau dessen Adresse ergänzen (z.B. 172.17.0.1).
+trusted_proxies_raw = os.getenv('ADMIN_TRUSTED_PROXIES', '127.0.0.0/8,::1')
+ADMIN_TRUSTED_PROXIES = [h.strip() for h in trusted_proxies_raw.split(',') if h.strip()]
+ADMIN_IP_DECISION_CACHE_SIZE = 4096
+
+# Prometheus-Endpunkt /metrics (paas/metrics.py): erlaubte Netze + optionales Bearer-Token
+metrics_networks_raw = os.getenv('METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16')
+METRICS_ALLOWED_NETWORKS = [h.strip() for h in metrics_networks_raw.split(',') if h.strip()]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 # Application definition
 
@@ -52,14 +66,15 @@ INSTALLED_APPS = [
     'captcha',
     'django_smart_ratelimit',
     'paas.apps.PaasConfig',
-    'config',
+    'config.apps.ConfigAppConfig',
     'django_celery_beat',
     'two_factor',
 ]
 
 MIDDLEWARE = [
+    'middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'middleware.AdminOnlyFromPrivateIPMiddleware',
@@ -67,7 +82,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_otp.middleware.OTPMiddleware',
+    'middleware.AsyncOTPMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -169,11 +184,45 @@ CAPTCHA_FONT_SIZE = 40
 CAPTCHA_LENGTH = 8
 #CAPTCHA_CHALLENGE_FUNCT = 'captcha.helpers.random_char_challenge'
 CAPTCHA_CHALLENGE_FUNCT = 'captcha.helpers.math_challenge'
+# Vorgerenderter Pool in Redis (authent/captcha_pool.py)
+CAPTCHA_POOL_SIZE = int(os.getenv('CAPTCHA_POOL_SIZE', '200'))
+CAPTCHA_POOL_TTL = 30 * 60                  # Lebensdauer eines Captchas (Sekunden)
+CAPTCHA_POOL_MIN_REMAINING = 10 * 60        # kürzer gültige Einträge nicht mehr ausgeben
 
 REDIS_SERVER_IP = os.getenv('REDIS_SERVER_IP', '127.0.0.1')
 REDIS_SERVER_PORT = os.getenv('REDIS_SERVER_PORT', '6379')
 REDIS_SERVER_DB = os.getenv('REDIS_SERVER_DB', '0')
 
+# -------------------------------------------------------------
+# Cache – gemeinsamer Redis-Cache für alle Gunicorn-/Celery-Prozesse
+# (statt LocMemCache pro Prozess). Läuft auf dem Broker-Redis,
+# Schlüssel werden über CACHE_KEY_PREFIX vom Celery-Bestand getrennt.
+# -------------------------------------------------------------
+REDIS_CACHE_DB = os.getenv('REDIS_CACHE_DB', REDIS_SERVER_DB)
+REDIS_CACHE_URL = os.getenv(
+    'REDIS_CACHE_URL',
+    f'redis://{REDIS_SERVER_IP}:{REDIS_SERVER_PORT}/{REDIS_CACHE_DB}'
+)
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'privycloud')
+
+# Wie oft (Sekunden) ein Prozess seinen lokalen PlatformSetting-Snapshot
+# gegen die Versionsnummer in Redis prüft (config/registry.py)
+PLATFORM_SETTINGS_LOCAL_TTL = float(os.getenv('PLATFORM_SETTINGS_LOCAL_TTL', '5'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+        },
+    }
+}
+
 
 RATELIMIT_BACKEND = 'redis'
 RATELIMIT_REDIS = {
@@ -182,8 +231,59 @@ RATELIMIT_REDIS = {
     'db': REDIS_SERVER_DB,
 }
 USER_RATELIMIT_PER_HOUR = 100
+API_RATELIMIT_PER_HOUR = 1800                 # JSON‑Polling (ca. alle 2 s)
 IP_RATELIMIT_PER_MINUTE = 10
 
+# Login-Drosselung (authent/throttle.py): Fehlversuche pro gleitendem Fenster
+LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', '900'))   # Sekunden
+LOGIN_THROTTLE_LIMITS = {
+    'user': int(os.getenv('LOGIN_THROTTLE_PER_USER', '10')),            # je Benutzername und Subnetz
+    'user_captcha': int(os.getenv('LOGIN_THROTTLE_USER_CAPTCHA', '50')),  # je Benutzername: danach Captcha pro Versuch
+    'ip': int(os.getenv('LOGIN_THROTTLE_PER_IP', '20')),
+    'subnet': int(os.getenv('LOGIN_THROTTLE_PER_SUBNET', '100')),        # IPv4 /24, IPv6 /64
+}
+LOGIN_THROTTLE_LOCAL_CACHE_SIZE = 10000                                   # lokale Sperren pro Prozess
+
+# -------------------------------------------------------------
+# Live-Logs (SSE, paas/streams.py)
+# -------------------------------------------------------------
+LOG_STREAM_MAX_PER_USER = int(os.getenv('LOG_STREAM_MAX_PER_USER', '2'))
+LOG_STREAM_IDLE_TIMEOUT = int(os.getenv('LOG_STREAM_IDLE_TIMEOUT', '300'))   # Sekunden ohne neue Zeile
+LOG_STREAM_HEARTBEAT = 15                                                   # Keepalive-Kommentar
+LOG_STREAM_QUEUE_SIZE = 500                                                 # gepufferte Zeilen pro Stream
+LOG_STREAM_MAX_TAIL = 1000
+LOG_STREAM_CONNECT_TIMEOUT = 15
+
+# -------------------------------------------------------------
+# Remote-Kommandos (paas/shell.py, paas/transport.py)
+# -------------------------------------------------------------
+# Eine langlebige /bin/sh pro SSH-Verbindung statt eines Kanals pro Kommando
+SSH_PERSISTENT_SHELL = os.getenv('SSH_PERSISTENT_SHELL', 'True').lower() in ('1', 'true', 'yes')
+SSH_COMMAND_TIMEOUT = int(os.getenv('SSH_COMMAND_TIMEOUT', '600'))         # Sekunden pro Kommando
+# Transport "openssh" (RemoteHost.transport): ssh-Binary mit ControlMaster
+OPENSSH_BINARY = os.getenv('OPENSSH_BINARY', 'ssh')
+OPENSSH_CONTROL_DIR = os.getenv('OPENSSH_CONTROL_DIR', '/tmp/privycloud-ssh')
+OPENSSH_CONTROL_PERSIST = int(os.getenv('OPENSSH_CONTROL_PERSIST', '600'))  # Sekunden nach dem letzten Aufruf
+# Host beendet Kommandos nach Ablauf selbst (coreutils "timeout -k", paas/deadlines.py) – nur ohne
+# Shell-Sitzung (SSH_PERSISTENT_SHELL=False); die Sitzung beendet Kommandos selbst (paas/shell.py)
+SSH_REMOTE_KILL = os.getenv('SSH_REMOTE_KILL', 'True').lower() in ('1', 'true', 'yes')
+
+# -------------------------------------------------------------
+# Zeitlimits der Tasks (Sekunden)
+# -------------------------------------------------------------
+# Das weiche Limit bricht den Task ab und startet das Aufräumen, das harte
+# beendet den Worker-Prozess, falls auch das hängt – der Slot wird immer frei.
+DEPLOY_SOFT_TIME_LIMIT = int(os.getenv('DEPLOY_SOFT_TIME_LIMIT', '900'))
+DEPLOY_TIME_LIMIT = int(os.getenv('DEPLOY_TIME_LIMIT', '1020'))
+TEARDOWN_SOFT_TIME_LIMIT = int(os.getenv('TEARDOWN_SOFT_TIME_LIMIT', '300'))
+TEARDOWN_TIME_LIMIT = int(os.getenv('TEARDOWN_TIME_LIMIT', '360'))
+BULK_TEARDOWN_SOFT_TIME_LIMIT = int(os.getenv('BULK_TEARDOWN_SOFT_TIME_LIMIT', '1800'))
+BULK_TEARDOWN_TIME_LIMIT = int(os.getenv('BULK_TEARDOWN_TIME_LIMIT', '1900'))
+LOADS_SOFT_TIME_LIMIT = int(os.getenv('LOADS_SOFT_TIME_LIMIT', '240'))
+LOADS_TIME_LIMIT = int(os.getenv('LOADS_TIME_LIMIT', '270'))
+USAGE_SOFT_TIME_LIMIT = int(os.getenv('USAGE_SOFT_TIME_LIMIT', '240'))
+USAGE_TIME_LIMIT = int(os.getenv('USAGE_TIME_LIMIT', '270'))
+
 # -------------------------------------------------------------
 # Celery Basic Settings – Redis TTL = 900 Sekunden (15 Minuten)
 # -------------------------------------------------------------
@@ -243,6 +343,46 @@ CELERY_BEAT_SCHEDULE = {
             'queue': 'celery',
         },
     },
+    'sample-host-metrics': {
+        'task': 'paas.tasks.sample_host_metrics',
+        'schedule': timedelta(seconds=15),
+        'options': {
+            'expires': 30,
+            'queue': 'celery',
+        },
+    },
+    'collect-container-usage': {
+        'task': 'paas.tasks.collect_container_usage',
+        'schedule': timedelta(minutes=5),
+        'options': {
+            'expires': 300,
+            'queue': 'celery',
+        },
+    },
+    'scale-idle-provisions': {
+        'task': 'paas.tasks.scale_idle_provisions',
+        'schedule': timedelta(minutes=15),
+        'options': {
+            'expires': 600,
+            'queue': 'celery',
+        },
+    },
+    'prune-provision-events-hourly': {
+        'task': 'paas.tasks.prune_provision_events',
+        'schedule': timedelta(hours=1),
+        'options': {
+            'expires': 1800,
+            'queue': 'celery',
+        },
+    },
+    'refill-captcha-pool': {
+        'task': 'authent.tasks.refill_captcha_pool',
+        'schedule': timedelta(seconds=30),
+        'options': {
+            'expires': 60,
+            'queue': 'celery',
+        },
+    },
 }
 
 CELERY_TIMEZONE = 'UTC'
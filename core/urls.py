@@ -16,11 +16,19 @@ urlpatterns = [
     path('register/', authent.views.register_view,name='register'),
     path('user-login/', authent.views.login_view,name='login'),
     path('logout/', authent.views.logout_view,name='logout'),
+    path('captcha/pool/<slug:captcha_id>/', authent.views.captcha_pool_image, name='captcha_pool_image'),
     path('captcha/', include('captcha.urls')),
     path('paas/',paas.views.my_apps, name="paas_my_apps"),
     path('paas/select_app',paas.views.select_app, name="paas_select_app"),
     path('paas/deploy_app',paas.views.deploy_app, name="paas_deploy_app"),
     path('paas/delete_app/<int:pk>/', paas.views.delete_app, name="paas_delete_app"),
+    path('paas/wake_app/<int:pk>/', paas.views.wake_app, name="paas_wake_app"),
+    path('paas/api/apps/', paas.views.my_apps_json, name="paas_my_apps_json"),
+    path('paas/status/<int:pk>/', paas.views.provision_status, name="paas_provision_status"),
+    path('paas/status/<int:pk>/progress/', paas.views.provision_progress, name="paas_provision_progress"),
+    path('paas/logs/<int:pk>/', paas.views.app_logs, name="paas_app_logs"),
+    path('paas/logs/<int:pk>/stream/', paas.views.stream_logs, name="paas_stream_logs"),
+    path('metrics', paas.views.metrics, name="metrics"),
 ]
 
 #this is only for development purpose
@@ -40,6 +40,12 @@ fi
 # 4. Startkonfiguration der Datenbank (siehe "paas/management/commands/db_start_config.py")
 python manage.py db_start_config
 
+# Prometheus-Multiprocess-Modus: Gunicorn- und Celery-Prozesse schreiben ihre
+# Metriken in dieses Verzeichnis, /metrics fasst sie zusammen. Beim Start leeren.
+: "${PROMETHEUS_MULTIPROC_DIR:=/tmp/prometheus}"
+export PROMETHEUS_MULTIPROC_DIR
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "Starte Celery Worker"
 celery -A core.celery worker \
        --beat \
@@ -54,7 +60,22 @@ celery -A core.celery flower \
        --loglevel info \
        --logfile /app/logs/flower.log &
 
-echo "Starte Gunicorn (foreground)"
-exec gunicorn core.wsgi:application \
-      --bind 0.0.0.0:8000 \
-      --workers 3
\ No newline at end of file
+# SERVER_MODE=asgi (Standard): Uvicorn‑Worker – asynchrone Views (Status‑Polling,
+# Log‑Streams) belegen keinen Worker. SERVER_MODE=wsgi: klassische Sync‑Worker.
+: "${SERVER_MODE:=asgi}"
+: "${GUNICORN_WORKERS:=3}"
+
+if [ "$SERVER_MODE" = "wsgi" ]; then
+  echo "Starte Gunicorn/WSGI (foreground)"
+  exec gunicorn core.wsgi:application \
+        --config gunicorn.conf.py \
+        --bind 0.0.0.0:8000 \
+        --workers "$GUNICORN_WORKERS"
+else
+  echo "Starte Gunicorn/ASGI mit Uvicorn‑Workern (foreground)"
+  exec gunicorn core.asgi:application \
+        --config gunicorn.conf.py \
+        --bind 0.0.0.0:8000 \
+        --workers "$GUNICORN_WORKERS" \
+        --worker-class uvicorn_worker.UvicornWorker
+fi
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+Gunicorn-Konfiguration (wird von ``entrypoint.sh`` geladen).
+
+Beendete Worker werden im Prometheus-Multiprocess-Verzeichnis abgemeldet,
+damit ihre Gauges nicht weiter in ``/metrics`` auftauchen (``paas/metrics.py``).
+"""
+
+import os
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
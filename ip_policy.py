@@ -0,0 +1,159 @@
+"""
+IP-Richtlinien für die Admin-Middleware.
+
+:class:`PrefixTrie` ist ein binärer Präfixbaum über die Adressbits (IPv4 und
+IPv6 getrennt). Ein Lookup folgt höchstens 32 bzw. 128 Bits – unabhängig
+davon, ob die Richtlinie aus 4 oder 40.000 Netzen besteht. Es gilt der
+längste passende Präfix („longest prefix match“), wie bei Routing-Tabellen:
+
+    allow 10.0.0.0/8
+    deny  10.1.2.0/24      → 10.1.2.7 wird abgelehnt, 10.9.9.9 erlaubt
+
+Bei identischem Präfix in Allow- und Deny-Liste gewinnt Deny.
+"""
+
+import ipaddress
+import logging
+import threading
+from pathlib import Path
+
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+ALLOW = True
+DENY = False
+
+
+class PrefixTrie:
+    """Binärer Trie; jeder Knoten ist ``[kind_0, kind_1, wert]``."""
+
+    __slots__ = ("_roots", "size")
+
+    def __init__(self):
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self.size = 0
+
+    def insert(self, network, value) -> None:
+        if not isinstance(network, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+            network = ipaddress.ip_network(network, strict=False)
+        node = self._roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+        for i in range(network.prefixlen):
+            bit = (bits >> (width - 1 - i)) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+            node = child
+        if node[2] is None:
+            self.size += 1
+        # Deny gewinnt bei identischem Präfix
+        node[2] = value if node[2] is None else (node[2] and value)
+
+    def lookup(self, address, default=None):
+        """Wert des längsten passenden Präfixes oder ``default``."""
+        if not isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+            address = ipaddress.ip_address(address)
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        node = self._roots[address.version]
+        bits = int(address)
+        width = address.max_prefixlen
+        result = node[2] if node[2] is not None else default
+        for i in range(width):
+            node = node[(bits >> (width - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                result = node[2]
+        return result
+
+    def __contains__(self, address) -> bool:
+        return bool(self.lookup(address, False))
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def parse_networks(entries, source: str = "") -> list:
+    """CIDR-Strings → Netze; ungültige Einträge werden geloggt und übersprungen."""
+    networks = []
+    for raw in entries:
+        entry = raw.split("#", 1)[0].strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            logger.warning("Ungültiges Netz %r in %s", entry, source or "IP-Richtlinie")
+    return networks
+
+
+def read_network_file(path) -> list:
+    """Eine CIDR pro Zeile, ``#`` leitet Kommentare ein."""
+    if not path:
+        return []
+    try:
+        with Path(path).open(encoding="utf-8") as fh:
+            return parse_networks(fh, source=str(path))
+    except OSError as exc:
+        logger.error("IP-Liste %s nicht lesbar: %s", path, exc)
+        return []
+
+
+class IPPolicy:
+    """Kompilierte Allow/Deny-Richtlinie mit LRU der letzten Entscheidungen."""
+
+    def __init__(self, allow=(), deny=(), cache_size: int = 4096):
+        self.trie = PrefixTrie()
+        for net in allow:
+            self.trie.insert(net, ALLOW)
+        for net in deny:
+            self.trie.insert(net, DENY)
+        self._decisions = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def is_allowed(self, ip: str) -> bool:
+        """``True``, wenn ``ip`` erlaubt ist. Ungültige Adressen → ``ValueError``."""
+        with self._lock:
+            decision = self._decisions.get(ip)
+        if decision is None:
+            decision = self.trie.lookup(ip, DENY)
+            with self._lock:
+                self._decisions[ip] = decision
+        return decision
+
+
+class TrustedProxies:
+    """Ermittelt die Client-IP unter Berücksichtigung vertrauenswürdiger Proxys."""
+
+    def __init__(self, networks=()):
+        self.trie = PrefixTrie()
+        for net in networks:
+            self.trie.insert(net, True)
+
+    def is_trusted(self, ip: str) -> bool:
+        try:
+            return ip in self.trie
+        except ValueError:
+            return False
+
+    def client_ip(self, remote_addr: str | None, forwarded_for: str | None) -> str | None:
+        """
+        ``X-Forwarded-For`` wird nur ausgewertet, wenn die direkte Gegenstelle
+        ein vertrauenswürdiger Proxy ist. Die Kette wird von rechts gelesen;
+        die erste nicht vertrauenswürdige Adresse ist der Client – weiter
+        links stehende Einträge kann der Client selbst gefälscht haben.
+
+        Sind alle Einträge vertrauenswürdig, ist nicht zu unterscheiden, wo die
+        Proxys enden: dann gilt der Eintrag der direkten Gegenstelle (ganz
+        rechts), nie der vom Client lieferbare Anfang der Kette.
+        """
+        if not forwarded_for or not remote_addr or not self.is_trusted(remote_addr):
+            return remote_addr
+        hops = [h.strip() for h in forwarded_for.split(",") if h.strip()]
+        for hop in reversed(hops):
+            if not self.is_trusted(hop):
+                return hop
+        return hops[-1] if hops else remote_addr
@@ -1,64 +1,192 @@
-import ipaddress
+import functools
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import HttpResponseForbidden
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django_otp.middleware import OTPMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware
 from core.settings import STRING_TO_ADMIN_PATH
+from ip_policy import IPPolicy, TrustedProxies, parse_networks, read_network_file
+from paas import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SyncAndAsyncMixin:
+    """
+    Macht eine Middleware sync- *und* async-fähig.
+    Unter ASGI muss Django sonst für jede reine Sync-Middleware in einen Thread
+    wechseln – auch bei den asynchronen Views (Status-Polling, Log-Streams).
+    Unterklassen implementieren ``_handle`` (sync) und ``_ahandle`` (async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def _setup_async(self, get_response):
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self._ahandle(request)
+        return self._handle(request)
+
+
+class RequestMetricsMiddleware(SyncAndAsyncMixin):
+    """Antwortzeit und Anzahl DB-Queries pro View (``paas/metrics.py``)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._setup_async(get_response)
+
+    def _handle(self, request):
+        counter, token = metrics.start_query_count()
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            metrics.observe_request(request, response, time.perf_counter() - start, counter[0], token)
+
+    async def _ahandle(self, request):
+        counter, token = metrics.start_query_count()
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            metrics.observe_request(request, response, time.perf_counter() - start, counter[0], token)
+
+
+class AsyncWhiteNoiseMiddleware(SyncAndAsyncMixin, WhiteNoiseMiddleware):
+    """WhiteNoise ohne Thread-Wechsel – der Datei-Lookup ist ein Dict-Zugriff."""
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self._setup_async(get_response)
 
-class AdminOnlyFromPrivateIPMiddleware:
+    def _handle(self, request):
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def _ahandle(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class AsyncOTPMiddleware(SyncAndAsyncMixin, OTPMiddleware):
+    """
+    ``django_otp.middleware.OTPMiddleware`` für Sync und Async.
+    ``request.user`` bleibt lazy; asynchrone Views nutzen ``await request.auser()``.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self._setup_async(get_response)
+
+    def _wrap_user(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None:
+            request.user = SimpleLazyObject(
+                functools.partial(self._verify_user, request, user)
+            )
+
+    def _handle(self, request):
+        self._wrap_user(request)
+        return self.get_response(request)
+
+    async def _ahandle(self, request):
+        self._wrap_user(request)
+        return await self.get_response(request)
+
+
+class AdminOnlyFromPrivateIPMiddleware(SyncAndAsyncMixin):
     """
     Blockiert Admin‑Zugriffe, wenn die IP nicht in einem der
     erlaubten privaten Netzwerke liegt.
     Das Ganze kann über die Umgebungsvariable
     ADMIN_IP_LIMITER_ENABLED (default: True) an‑ oder ausgeschaltet werden.
-    Der erlaubte Adressbereich wird über PRIVATE_IP_RANGES definiert.
+    Der erlaubte Adressbereich wird über PRIVATE_IP_RANGES definiert,
+    zusätzlich über ADMIN_IP_ALLOWLIST_FILE / ADMIN_IP_DENYLIST_FILE
+    (eine CIDR pro Zeile). Die Netze werden beim Start einmalig in einen
+    Präfixbaum kompiliert (siehe ``ip_policy.py``).
     """
 
+    # Fallback auf RFC‑1918 + Loopback
+    DEFAULT_RANGES = [
+        '10.0.0.0/8',
+        '172.16.0.0/12',
+        '192.168.0.0/16',
+        '127.0.0.0/8',
+        '::1/128',
+    ]
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self._setup_async(get_response)
+        self.admin_prefix = '/' + STRING_TO_ADMIN_PATH.strip('/') + '/'
 
         # 1) Prüfe, ob der Filter aktiv ist
         self.enabled = getattr(settings, 'ADMIN_IP_LIMITER_ENABLED', True)
         if not self.enabled:
             # Kein Parsing nötig – der Filter ist abgeschaltet
-            self.private_ranges = []
+            self.policy = None
             return
 
         # 2) Lade die erlaubten Netzwerke
         raw_ranges = getattr(settings, 'PRIVATE_IP_RANGES', [])
-        if not raw_ranges:
-            # Fallback auf RFC‑1918 + Loopback
-            raw_ranges = [
-                '10.0.0.0/8',
-                '172.16.0.0/12',
-                '192.168.0.0/16',
-                '127.0.0.0/8',
-            ]
-
         # Die Variable kann als Liste oder als CSV‑String kommen
         if isinstance(raw_ranges, str):
-            raw_ranges = [r.strip() for r in raw_ranges.split(',') if r.strip()]
-
-        # Parsen zu ip_network‑Objekten – ungültige Einträge werden ignoriert
-        self.private_ranges = []
-        for net_str in raw_ranges:
-            try:
-                self.private_ranges.append(ipaddress.ip_network(net_str))
-            except ValueError:
-                # Logge, falls du ein logging‑Setup hast
-                # logger.warning(f"Invalid CIDR in PRIVATE_IP_RANGES: {net_str}")
-                pass
+            raw_ranges = raw_ranges.split(',')
+        raw_ranges = [r for r in raw_ranges if r and r.strip()] or self.DEFAULT_RANGES
 
-    def __call__(self, request):
-        # 3) Nur für Admin‑Pfad prüfen
-        if not self.enabled or not request.path.startswith(f'/{STRING_TO_ADMIN_PATH}/'):
-            return self.get_response(request)
+        allow = parse_networks(raw_ranges, source='PRIVATE_IP_RANGES')
+        allow += read_network_file(getattr(settings, 'ADMIN_IP_ALLOWLIST_FILE', None))
+        deny = read_network_file(getattr(settings, 'ADMIN_IP_DENYLIST_FILE', None))
+
+        # 3) Kompilieren – Lookup danach unabhängig von der Anzahl der Netze
+        self.policy = IPPolicy(
+            allow, deny, cache_size=getattr(settings, 'ADMIN_IP_DECISION_CACHE_SIZE', 4096),
+        )
+        self.proxies = TrustedProxies(parse_networks(
+            getattr(settings, 'ADMIN_TRUSTED_PROXIES', []), source='ADMIN_TRUSTED_PROXIES',
+        ))
+        logger.info("Admin‑IP‑Richtlinie: %d Allow‑, %d Deny‑Netze", len(allow), len(deny))
 
-        # 4) Client‑IP ermitteln
+    def _handle(self, request):
+        forbidden = self._check(request)
+        if forbidden is not None:
+            return forbidden
+        return self.get_response(request)
+
+    async def _ahandle(self, request):
+        forbidden = self._check(request)
+        if forbidden is not None:
+            return forbidden
+        return await self.get_response(request)
+
+    def _check(self, request):
+        """Gibt eine 403-Antwort zurück oder ``None``, wenn der Request weiter darf."""
+        # 4) Nur für Admin‑Pfad prüfen
+        if not self.enabled or not request.path.startswith(self.admin_prefix):
+            return None
+
+        # 5) Client‑IP ermitteln
         client_ip = self._get_client_ip(request)
 
-        # 5) Prüfen, ob IP gültig und in erlaubtem Netzwerk liegt
+        # 6) Prüfen, ob IP gültig und in erlaubtem Netzwerk liegt
         try:
-            ip_obj = ipaddress.ip_address(client_ip)
-            if not any(ip_obj in net for net in self.private_ranges):
+            if not client_ip or not self.policy.is_allowed(client_ip):
                 return HttpResponseForbidden(
                     'Forbidden: Admin only accessible from private networks.'
                 )
@@ -66,18 +194,16 @@ class AdminOnlyFromPrivateIPMiddleware:
             # Ungültige IP‑Adresse
             return HttpResponseForbidden('Forbidden: Invalid IP address.')
 
-        # 6) Alles weiterreichen
-        return self.get_response(request)
+        # 7) Alles weiterreichen
+        return None
 
-    @staticmethod
-    def _get_client_ip(request):
+    def _get_client_ip(self, request):
         """
-        Ermittelt die Client‑IP aus X-Forwarded-For (wenn vorhanden) oder
-        REMOTE_ADDR. Für die meisten Setups hinter einem Reverse‑Proxy
-        ist X-Forwarded-For korrekt.
+        Ermittelt die Client‑IP. X-Forwarded-For zählt nur, wenn REMOTE_ADDR
+        ein vertrauenswürdiger Proxy ist (ADMIN_TRUSTED_PROXIES) – sonst
+        könnte jeder Client sich per Header eine private IP geben.
         """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            # Mehrere IPs möglich – die erste ist die ursprüngliche Client‑IP
-            return x_forwarded_for.split(',')[0].strip()
-        return request.META.get('REMOTE_ADDR')
\ No newline at end of file
+        return self.proxies.client_ip(
+            request.META.get('REMOTE_ADDR'),
+            request.META.get('HTTP_X_FORWARDED_FOR'),
+        )
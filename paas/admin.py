@@ -1,8 +1,23 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import health
+from .tasks import queue_bulk_teardown
+from .spans import SUMMARY_DAYS, stage_summary
 from .models import (
   AppDefinition,
+  ContainerUsageSample,
   RemoteHost,
   ProvisionedApp,
+  ProvisionEvent,
+  ProvisionSpan,
   AppEnvVarPerApp,
   AppVolumePerApp,
   ConfigPatch,
@@ -14,17 +29,188 @@ class AppDefinitionAdmin(admin.ModelAdmin):
   list_display = ('name', 'display_name', 'docker_image', 'default_duration', 'app_port_intern_web', 'app_port_intern_api', 'hiddenservice_port_web', 'hiddenservice_port_api', 'use_deploy_user')
   search_fields = ('name', 'display_name')
 
+class HostHealthChangeList(ChangeList):
+  """Lädt den Breaker-Zustand aller Hosts der Seite mit *einem* Redis-Roundtrip."""
+
+  def get_results(self, request):
+    super().get_results(request)
+    # result_list ist ein QuerySet – einmal ausgewertet, rendert die Liste dieselben Instanzen
+    states = health.get_health(host.pk for host in self.result_list)
+    for host in self.result_list:
+      host.health_state = states[host.pk]
+
 @admin.register(RemoteHost)
 class RemoteHostAdmin(admin.ModelAdmin):
-  list_display = ('hostname', 'ip_address', 'ssh_user', 'ssh_key_path', 'current_load', 'nur_superuser')
-  list_filter = ('current_load',)
+  list_display = ('hostname', 'ip_address', 'ssh_user', 'ssh_key_path', 'transport', 'current_load', 'breaker', 'nur_superuser')
+  list_filter = ('current_load', 'transport')
   search_fields = ('hostname', 'ip_address')
+  actions = ('reset_breaker',)
+
+  BREAKER_LABELS = {
+    health.STATE_CLOSED: "ok",
+    health.STATE_HALF_OPEN: "Probe",
+    health.STATE_OPEN: "offen",
+  }
+
+  def get_changelist(self, request, **kwargs):
+    return HostHealthChangeList
+
+  @admin.display(description="Breaker")
+  def breaker(self, obj):
+    state = getattr(obj, "health_state", None) or health.get_health([obj.pk])[obj.pk]
+    label = self.BREAKER_LABELS[state.state]
+    if state.failures:
+      label += f" ({state.failures} Fehler)"
+    if state.rtt is not None:
+      label += f", {state.rtt * 1000:.0f} ms"
+    return label
+
+  @admin.action(description="Breaker zurücksetzen (Host wieder auswählbar)")
+  def reset_breaker(self, request, queryset):
+    hosts = list(queryset)
+    for host in hosts:
+      health.reset(host)
+    self.message_user(request, f"Breaker von {len(hosts)} Host(s) zurückgesetzt.")
+
+class ProvisionEventInline(admin.TabularInline):
+    model = ProvisionEvent
+    extra = 0
+    can_delete = False
+    fields = ('created_at', 'stage', 'level', 'message', 'duration')
+    readonly_fields = fields
+    ordering = ('-created_at', '-id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class ProvisionSpanInline(admin.TabularInline):
+    model = ProvisionSpan
+    extra = 0
+    can_delete = False
+    fields = ('operation', 'stage', 'started_at', 'duration', 'ok')
+    readonly_fields = fields
+    ordering = ('started_at', 'id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator ohne ``COUNT(*)`` über die ganze Tabelle.
+    Ungefilterte Changelist auf PostgreSQL → Schätzwert aus ``pg_class.reltuples``
+    (ab ``ESTIMATE_THRESHOLD`` Zeilen); gefilterte Listen zählen exakt – dort
+    greifen die Indizes auf status/started_at/expires_at.
+    """
+    ESTIMATE_THRESHOLD = 10_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        query = getattr(qs, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[qs.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                        [qs.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= self.ESTIMATE_THRESHOLD:
+                    return int(row[0])
+        return super().count
+
 
 @admin.register(ProvisionedApp)
 class ProvisionedAppAdmin(admin.ModelAdmin):
-    list_display = ('user', 'app', 'host', 'status', 'expires_at')
-    list_filter = ('status', 'expires_at')
+    list_display = ('user', 'app', 'host', 'status', 'started_at', 'expires_at')
+    list_filter = ('status', 'expires_at', 'host')
+    list_select_related = ('user', 'app', 'host')
     search_fields = ('user__username', 'app__name', 'host__hostname')
+    autocomplete_fields = ('user', 'app', 'host')
+    date_hierarchy = 'started_at'
+    ordering = ('-started_at', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False   # kein zweites COUNT(*) für „x von y“
+    list_per_page = 100
+    inlines = (ProvisionSpanInline, ProvisionEventInline)
+    actions = ('expire_now', 'extend_24h', 'force_delete')
+
+    EXTEND_BY = timedelta(hours=24)
+
+    def get_queryset(self, request):
+        # Alt-Log (TextField) nicht in der Changelist mitladen
+        return super().get_queryset(request).defer('log')
+
+    # ------------------------------------------------------------------
+    # Massen‑Aktionen – keine SSH‑Arbeit im Request, nur gebündelte Tasks
+    # ------------------------------------------------------------------
+    @admin.action(description="Sofort ablaufen lassen (Container entfernen)")
+    def expire_now(self, request, queryset):
+        active = queryset.filter(status__in=('running', 'stopped', 'deleting'))
+        active.update(expires_at=timezone.now())
+        total, batches = queue_bulk_teardown(active)
+        self.message_user(request, f"{total} Bereitstellung(en) abgelaufen, {batches} Batch(es) eingeplant.")
+
+    @admin.action(description="Um 24 Stunden verlängern")
+    def extend_24h(self, request, queryset):
+        # ein UPDATE; „ohne Limit“ (NULL) bleibt unverändert
+        updated = queryset.filter(expires_at__isnull=False).exclude(
+            status__in=('deleting', 'deleted'),
+        ).update(expires_at=F('expires_at') + self.EXTEND_BY, last_modified=timezone.now())
+        self.message_user(request, f"{updated} Bereitstellung(en) um 24 h verlängert.")
+
+    @admin.action(description="Erzwungen löschen (auch bei unerreichbarem Host)")
+    def force_delete(self, request, queryset):
+        total, batches = queue_bulk_teardown(queryset, force=True)
+        self.message_user(request, f"{total} Bereitstellung(en) zum Löschen eingeplant ({batches} Batch(es)).")
+
+@admin.register(ProvisionSpan)
+class ProvisionSpanAdmin(admin.ModelAdmin):
+    """Einzelne Spans + p50/p95 pro App und Host über der Liste."""
+    change_list_template = 'admin/paas/provisionspan/change_list.html'
+    list_display = ('started_at', 'operation', 'stage', 'duration', 'ok', 'app', 'host', 'provision_id')
+    list_filter = ('operation', 'stage', 'ok', 'app', 'host')
+    list_select_related = ('app', 'host')
+    date_hierarchy = 'started_at'
+    ordering = ('-started_at', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'summary_days': SUMMARY_DAYS,
+            'summary_by_app': stage_summary('app'),
+            'summary_by_host': stage_summary('host'),
+        }
+        return super().changelist_view(request, extra_context)
+
+@admin.register(ContainerUsageSample)
+class ContainerUsageSampleAdmin(admin.ModelAdmin):
+    """Messwerte aus ``docker stats`` (``paas.usage``) – nur lesen."""
+    list_display = ('sampled_at', 'provision_id', 'host', 'cpu', 'memory', 'net_rx', 'net_tx',
+                    'block_read', 'block_write', 'pids')
+    list_filter = ('host',)
+    list_select_related = ('host',)
+    date_hierarchy = 'sampled_at'
+    ordering = ('-sampled_at', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 @admin.register(UserDeploymentLimit)
 class UserDeploymentLimitAdmin(admin.ModelAdmin):
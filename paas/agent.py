@@ -0,0 +1,247 @@
+"""
+Host-Agent: schiebt Last, Speicher, Swap, Platte, Container-Zahl und
+Heartbeat alle paar Sekunden in Redis.
+
+Bisher fragte ``update_remote_loads`` alle 5 Minuten ``uptime`` per SSH ab –
+langsam, und die Zielauswahl arbeitete mit Minuten alten Werten. Der Agent
+läuft auf dem RemoteHost selbst und braucht nur die Standardbibliothek und
+``redis`` (kein Django), die Datei kann also einzeln kopiert werden:
+
+    python3 agent.py --redis redis://agent:<passwort>@controller:6379/1 \\
+        --prefix privycloud --host-id 3 --interval 5
+
+Auf Hosts mit Projekt-Checkout geht auch ``python manage.py host_agent``.
+
+Ein Bericht ist ein ``struct`` von 53 Bytes (:data:`REPORT_FORMAT`) unter
+``<prefix>:host_agent:<host_id>`` – ``SET`` mit TTL, ein Schreibzugriff pro
+Intervall. Für den Agenten genügt ein eigener Redis-User mit minimalen Rechten:
+
+    ACL SETUSER agent on >passwort ~privycloud:host_agent:* +set
+
+Die Controller-Seite (``paas.health``) liest alle Berichte mit einem ``MGET``:
+frische Berichte ersetzen die SSH-Abfrage; ist der Heartbeat veraltet oder
+fehlt der Bericht, bleibt es beim SSH-Polling und beim Breaker. Dafür
+liefert :data:`METRICS_CMD` dieselben Werte in *einem* Kommando,
+:func:`parse_metrics` macht daraus ein :class:`HostSample` – beide Wege
+landen in derselben Zeitreihe (``paas.timeseries``).
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 2
+# Version, Zeitstempel, Load 1/5/15, Spitzen-Load (1 min), CPUs, RAM gesamt (MiB) und
+# belegt (Anteil 0–1), Swap gesamt (MiB) und belegt, Platte Home und Docker-Root, Container
+REPORT_FORMAT = struct.Struct("<BdffffHIfIfffH")
+# Bericht bleibt so lange lesbar – danach gilt der Host als „ohne Agent“
+REPORT_TTL = 600
+DEFAULT_INTERVAL = 5.0
+DEFAULT_DOCKER_ROOT = "/var/lib/docker"
+DOCKER_TIMEOUT = 5
+
+# Alles in einem Kommando per SSH für Hosts ohne Agent; Abschnitte durch „--“ getrennt.
+# Plattenbelegung: erste Zeile Home des Deploy-Users, zweite Zeile Docker-Root.
+METRICS_CMD = (
+    "cat /proc/loadavg; echo --; nproc; echo --; "
+    "grep -E '^(MemTotal|MemAvailable|SwapTotal|SwapFree):' /proc/meminfo; echo --; "
+    "df -Pk \"$HOME\" \"$(docker info -f '{{.DockerRootDir}}' 2>/dev/null || echo %s)\" 2>/dev/null"
+    " | tail -n +2; echo --; "
+    "docker ps -q 2>/dev/null | wc -l"
+) % DEFAULT_DOCKER_ROOT
+
+
+class HostSample(NamedTuple):
+    """
+    Messwerte eines Hosts zu einem Zeitpunkt. In verdichteten Zeitreihen sind
+    die Felder Mittelwerte des Intervalls, ``load1_peak`` ist dessen Maximum.
+    """
+    timestamp: float
+    load1: float
+    load5: float
+    load15: float
+    load1_peak: float
+    cpus: int
+    mem_total: int      # MiB
+    mem_used: float     # Anteil 0–1, ohne Page-Cache
+    swap_total: int     # MiB
+    swap_used: float
+    home_used: float
+    docker_used: float
+    containers: int
+
+    def age(self, now: float | None = None) -> float:
+        return (now if now is not None else time.time()) - self.timestamp
+
+
+def report_key(prefix: str, host_id: int) -> str:
+    return f"{prefix}:host_agent:{host_id}"
+
+
+def encode(sample: HostSample) -> bytes:
+    return REPORT_FORMAT.pack(REPORT_VERSION, *sample)
+
+
+def decode(raw: bytes | None) -> HostSample | None:
+    """Bericht aus Redis; ``None`` bei fehlendem Schlüssel oder fremdem Format."""
+    if not raw or len(raw) != REPORT_FORMAT.size or raw[0] != REPORT_VERSION:
+        return None
+    return HostSample(*REPORT_FORMAT.unpack(raw)[1:])
+
+
+# ----------------------------------------------------------------------
+# Messwerte (Linux)
+# ----------------------------------------------------------------------
+def _parse_loadavg(text: str) -> tuple[float, float, float]:
+    load1, load5, load15 = text.split()[:3]
+    return float(load1), float(load5), float(load15)
+
+
+def _parse_meminfo(text: str) -> tuple[int, float, int, float]:
+    """RAM und Swap: (gesamt MiB, belegt 0–1, Swap gesamt MiB, Swap belegt 0–1)."""
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        if rest.split():
+            values[name.strip()] = int(rest.split()[0])
+    mem_total = values.get("MemTotal", 0)
+    swap_total = values.get("SwapTotal", 0)
+    mem_used = 1 - values.get("MemAvailable", 0) / mem_total if mem_total else 0.0
+    swap_used = 1 - values.get("SwapFree", 0) / swap_total if swap_total else 0.0
+    return mem_total // 1024, mem_used, swap_total // 1024, swap_used
+
+
+def _parse_df(line: str) -> float:
+    # Filesystem 1024-blocks Used Available Capacity Mounted-on; Anteil wie bei df
+    # bezogen auf den für Nutzer verfügbaren Platz (ohne Root-Reserve)
+    fields = line.split()
+    used, available = int(fields[2]), int(fields[3])
+    return used / (used + available) if used + available else 0.0
+
+
+def parse_metrics(output: str, timestamp: float | None = None) -> HostSample:
+    """Ausgabe von :data:`METRICS_CMD`; ``ValueError`` bei unvollständiger Ausgabe."""
+    sections = [""]
+    for line in output.splitlines():
+        if line.strip() == "--":
+            sections.append("")
+        else:
+            sections[-1] += line + "\n"
+    if len(sections) != 5:
+        raise ValueError(f"Unvollständige Host-Metriken: {output!r}")
+    loadavg, nproc, meminfo, df, containers = sections
+    load1, load5, load15 = _parse_loadavg(loadavg)
+    mem_total, mem_used, swap_total, swap_used = _parse_meminfo(meminfo)
+    disks = [_parse_df(line) for line in df.splitlines() if line.strip()]
+    return HostSample(
+        timestamp=timestamp if timestamp is not None else time.time(),
+        load1=load1,
+        load5=load5,
+        load15=load15,
+        load1_peak=load1,
+        cpus=int(nproc.strip() or 1),
+        mem_total=mem_total,
+        mem_used=mem_used,
+        swap_total=swap_total,
+        swap_used=swap_used,
+        home_used=disks[0] if disks else 0.0,
+        docker_used=disks[1] if len(disks) > 1 else 0.0,
+        containers=int(containers.strip() or 0),
+    )
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="ascii") as fh:
+        return fh.read()
+
+
+def _disk_used(path: str) -> float:
+    try:
+        usage = shutil.disk_usage(path)
+    except OSError:
+        return 0.0
+    return usage.used / (usage.used + usage.free) if usage.used + usage.free else 0.0
+
+
+def _containers(docker: bool) -> int:
+    if not docker:
+        return 0
+    try:
+        out = subprocess.run(
+            ["docker", "ps", "-q"], capture_output=True, text=True, timeout=DOCKER_TIMEOUT, check=True,
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as exc:
+        logger.debug("docker ps fehlgeschlagen: %s", exc)
+        return 0
+    return len(out.split())
+
+
+def collect(home: str | None = None, docker_root: str = DEFAULT_DOCKER_ROOT,
+            docker: bool = True) -> HostSample:
+    load1, load5, load15 = _parse_loadavg(_read("/proc/loadavg"))
+    mem_total, mem_used, swap_total, swap_used = _parse_meminfo(_read("/proc/meminfo"))
+    return HostSample(
+        timestamp=time.time(),
+        load1=load1,
+        load5=load5,
+        load15=load15,
+        load1_peak=load1,
+        cpus=os.cpu_count() or 1,
+        mem_total=mem_total,
+        mem_used=mem_used,
+        swap_total=swap_total,
+        swap_used=swap_used,
+        home_used=_disk_used(home or os.path.expanduser("~")),
+        docker_used=_disk_used(docker_root),
+        containers=_containers(docker),
+    )
+
+
+# ----------------------------------------------------------------------
+# Schleife
+# ----------------------------------------------------------------------
+def run(client, key: str, interval: float = DEFAULT_INTERVAL, home: str | None = None,
+        docker_root: str = DEFAULT_DOCKER_ROOT, docker: bool = True, once: bool = False) -> None:
+    """Berichtet alle ``interval`` Sekunden; Redis-Fehler werden geloggt, die Schleife läuft weiter."""
+    import redis
+
+    while True:
+        started = time.monotonic()
+        try:
+            client.set(key, encode(collect(home, docker_root, docker)), ex=REPORT_TTL)
+        except redis.RedisError as exc:
+            logger.warning("Bericht nicht gesendet: %s", exc)
+        if once:
+            return
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main(argv=None) -> None:
+    import redis
+
+    parser = argparse.ArgumentParser(description="PrivyCloud Host-Agent")
+    parser.add_argument("--redis", required=True, help="Redis-URL des Controllers")
+    parser.add_argument("--prefix", default="privycloud", help="CACHE_KEY_PREFIX des Controllers")
+    parser.add_argument("--host-id", type=int, required=True, help="ID des RemoteHost")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument("--home", help="Home des Deploy-Users (Standard: eigenes Home)")
+    parser.add_argument("--docker-root", default=DEFAULT_DOCKER_ROOT, help="Data-Root des Docker-Daemons")
+    parser.add_argument("--no-docker", action="store_true", help="Container nicht zählen")
+    parser.add_argument("--once", action="store_true", help="Einen Bericht senden und beenden")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    client = redis.Redis.from_url(args.redis, socket_connect_timeout=5, socket_timeout=5)
+    run(client, report_key(args.prefix, args.host_id), args.interval, args.home,
+        args.docker_root, not args.no_docker, args.once)
+
+
+if __name__ == "__main__":
+    main()
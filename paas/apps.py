@@ -10,3 +10,7 @@ class PaasConfig(AppConfig):
       # Importiere Signals hier, damit sie beim App‑Start registriert werden.
       import paas.signals  # noqa
       logger.debug("Paas signals loaded.")
+
+      # Celery-Signale für Prometheus (Web: Einreihen, Worker: Start/Ende)
+      from paas.metrics import connect_celery_signals
+      connect_celery_signals()
@@ -0,0 +1,72 @@
+"""
+Gemeinsame Helfer der Benchmark-Kommandos (``bench_controller``, ``bench_web``).
+
+Beide laufen auf einer frischen Test-Datenbank (:func:`isolated_database`)
+und geben JSON mit denselben Kennzahlen (:func:`summarize`) und Metadaten
+(:func:`run_meta`) aus, damit Ergebnisse zwischen Commits vergleichbar sind.
+"""
+
+import contextlib
+import platform
+import statistics
+import subprocess
+
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+
+def summarize(durations: list[float], errors: int = 0) -> dict:
+    """Kennzahlen einer Messreihe (Sekunden)."""
+    total = sum(durations)
+    ordered = sorted(durations)
+
+    def pct(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else None
+
+    return {
+        "count": len(durations),
+        "errors": errors,
+        "total_s": round(total, 4),
+        "ops_per_s": round(len(durations) / total, 2) if total else None,
+        "mean_s": round(statistics.fmean(durations), 4) if durations else None,
+        "p50_s": pct(0.5),
+        "p95_s": pct(0.95),
+        "max_s": ordered[-1] if ordered else None,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_meta(**extra) -> dict:
+    """Metadaten eines Laufs (Commit, Zeitpunkt, Python, DB)."""
+    return {
+        "commit": git_commit(),
+        "timestamp": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "db_vendor": connection.vendor,
+        **extra,
+    }
+
+
+@contextlib.contextmanager
+def isolated_database():
+    """Test-Datenbank wie bei ``manage.py test`` anlegen und danach verwerfen."""
+    from .catalog import invalidate_catalog
+    from .specs import invalidate_specs
+
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        # Specs/Katalog der Test-DB nicht im gemeinsamen Cache stehen lassen
+        invalidate_specs()
+        invalidate_catalog()
@@ -0,0 +1,110 @@
+"""
+Gecachter App-/Host-Katalog für Formulare und Templates.
+
+Der Katalog (``AppDefinition``, ``RemoteHost``) ändert sich selten, wird aber
+bei jedem Aufruf von ``select_app``/``deploy_app`` gebraucht. Die Zeilen
+liegen deshalb versioniert im gemeinsamen Cache; jede Änderung erhöht
+``CATALOG_VERSION_KEY`` (siehe ``paas/signals.py``). Dieselbe Versionsnummer
+dient als Schlüssel für die ``{% cache %}``-Fragmente in den Templates.
+
+Prozess-lokal werden die Zeilen der aktuellen Version zusätzlich gehalten –
+bei warmem Cache bleibt pro Aufruf ein Redis-``GET``, keine DB-Query.
+"""
+
+import logging
+import threading
+
+import redis
+from django.core.cache import cache
+
+from config.cache import get_or_compute, incr
+from .models import AppDefinition, RemoteHost
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_KEY = "catalog:{version}:{name}"
+CATALOG_TIMEOUT = 60 * 60 * 24
+# Lebensdauer der Template-Fragmente (der Schlüssel enthält die Version)
+FRAGMENT_TIMEOUT = CATALOG_TIMEOUT
+
+# Felder des RemoteHost, die für den Katalog keine Rolle spielen –
+# Saves nur dieser Felder (z.B. update_remote_loads) erhöhen die Version nicht.
+HOST_VOLATILE_FIELDS = frozenset({"current_load"})
+
+
+def _rows(model, order_by):
+    """Alle Zeilen als ``(feldnamen, werte-tupel)`` – picklebar und kompakt."""
+    names = tuple(f.attname for f in model._meta.concrete_fields)
+    return names, tuple(model.objects.order_by(*order_by).values_list(*names))
+
+
+_LOADERS = {
+    "apps": lambda: _rows(AppDefinition, ("display_name", "pk")),
+    "hosts": lambda: _rows(RemoteHost, ("pk",)),
+}
+
+
+class _Catalog:
+    """Prozess-lokale Katalogzeilen der aktuellen Version."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.rows: dict[str, tuple] = {}
+
+    def current_version(self):
+        try:
+            version = cache.get(CATALOG_VERSION_KEY)
+            if version is None:
+                cache.add(CATALOG_VERSION_KEY, 1, None)
+                version = cache.get(CATALOG_VERSION_KEY, 1)
+        except redis.RedisError as exc:
+            logger.warning("Katalog-Version nicht lesbar (%s)", exc)
+            return self.version
+        if version != self.version:
+            with self._lock:
+                self.version, self.rows = version, {}
+        return version
+
+    def get(self, name: str):
+        version = self.current_version()
+        if name not in self.rows:
+            self.rows[name] = get_or_compute(
+                CATALOG_KEY.format(version=version, name=name), _LOADERS[name], CATALOG_TIMEOUT,
+            )
+        return self.rows[name]
+
+
+_catalog = _Catalog()
+
+
+def _instances(model, name: str) -> list:
+    # from_db → Instanzen wie aus einer Query (kein „adding“, alle Felder geladen)
+    names, values = _catalog.get(name)
+    return [model.from_db("default", names, row) for row in values]
+
+
+def catalog_version():
+    """Aktuelle Katalog-Version (Schlüsselbestandteil für Template-Fragmente)."""
+    return _catalog.current_version()
+
+
+def get_apps() -> list[AppDefinition]:
+    """Alle ``AppDefinition``-Einträge (sortiert nach ``display_name``)."""
+    return _instances(AppDefinition, "apps")
+
+
+def get_hosts() -> list[RemoteHost]:
+    """Alle ``RemoteHost``-Einträge. ``current_load`` kann veraltet sein."""
+    return _instances(RemoteHost, "hosts")
+
+
+def invalidate_catalog() -> None:
+    """Katalog verwerfen (neue Version in Redis + lokal)."""
+    try:
+        incr(CATALOG_VERSION_KEY)
+    except redis.RedisError as exc:
+        logger.warning("Katalog-Version konnte nicht erhöht werden (%s)", exc)
+    with _catalog._lock:
+        _catalog.version, _catalog.rows = None, {}
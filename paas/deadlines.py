@@ -0,0 +1,97 @@
+"""
+Zeitbudgets für Tasks, Abschnitte und Remote-Kommandos.
+
+Ein Budget gilt für den ``with``-Block und alles, was darin läuft. Verschachtelte
+Budgets können die Frist nur verkürzen, nie verlängern:
+
+    with budget(900, "deploy"):
+        with budget(120, "onion_wait"):
+            _run_cmd(ssh, "...")   # Timeout = min(SSH_COMMAND_TIMEOUT, Restbudget)
+
+:func:`command_timeout` liefert das Timeout für das nächste Kommando und wirft
+:class:`DeadlineExceeded`, sobald das Budget aufgebraucht ist.
+:func:`remote_command` gibt das Timeout zusätzlich an den Host weiter
+(``timeout -k``): dort wird das Kommando auch dann beendet, wenn die Verbindung
+hängt oder der Controller aufgegeben hat. Das braucht nur ein Transport, der
+das Kommando nicht selbst beenden kann (``Transport.kills_on_timeout``) – die
+Shell-Sitzungen aus ``paas.shell`` beenden die Prozessgruppe auf dem Host.
+"""
+
+import contextlib
+import contextvars
+import math
+import shlex
+import time
+
+from django.conf import settings
+
+# Exit-Codes von coreutils ``timeout``: 124 nach TERM, 137 nach KILL
+TIMEOUT_EXIT_CODES = (124, 137)
+# Sekunden zwischen TERM und KILL auf dem Host
+KILL_GRACE = 5
+
+
+class DeadlineExceeded(TimeoutError):
+    """Das Zeitbudget eines Tasks, Abschnitts oder Kommandos ist aufgebraucht."""
+
+
+# (Ende als time.monotonic(), Name des Budgets) – pro Thread/Task getrennt
+_deadline: contextvars.ContextVar[tuple[float, str] | None] = contextvars.ContextVar(
+    "paas_deadline", default=None,
+)
+
+
+@contextlib.contextmanager
+def budget(seconds: float | None, label: str):
+    """Frist von ``seconds`` für den Block (``None`` = nur die äußere Frist)."""
+    current = _deadline.get()
+    ends = time.monotonic() + seconds if seconds is not None else None
+    if ends is None or (current is not None and current[0] <= ends):
+        yield
+        return
+    token = _deadline.set((ends, label))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Restzeit der engsten Frist in Sekunden (``None`` = keine Frist)."""
+    current = _deadline.get()
+    return None if current is None else current[0] - time.monotonic()
+
+
+def current_label() -> str | None:
+    current = _deadline.get()
+    return None if current is None else current[1]
+
+
+def check() -> None:
+    """Wirft :class:`DeadlineExceeded`, wenn die Frist abgelaufen ist."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Zeitbudget „{current_label()}“ aufgebraucht")
+
+
+def command_timeout(timeout: float | None = None) -> float:
+    """Timeout für ein Kommando: ``timeout`` bzw. ``SSH_COMMAND_TIMEOUT``, höchstens die Restzeit."""
+    check()
+    limit = timeout if timeout is not None else settings.SSH_COMMAND_TIMEOUT
+    left = remaining()
+    return limit if left is None else min(limit, left)
+
+
+def client_timeout(seconds: float) -> float:
+    """Wartezeit des Controllers: etwas länger als der Host, der das Kommando zuerst beendet."""
+    return seconds + KILL_GRACE + 5 if settings.SSH_REMOTE_KILL else seconds
+
+
+def remote_command(cmd: str, seconds: float) -> str:
+    """
+    ``cmd`` so verpacken, dass der Host es nach ``seconds`` selbst beendet
+    (TERM, nach ``KILL_GRACE`` Sekunden KILL – für die ganze Prozessgruppe).
+    """
+    if not settings.SSH_REMOTE_KILL:
+        return cmd
+    return f"timeout -k {KILL_GRACE} {max(1, math.ceil(seconds))} sh -c {shlex.quote(cmd)}"
@@ -0,0 +1,42 @@
+"""
+Decorators für asynchrone Views.
+
+``django_smart_ratelimit.rate_limit`` kann nur synchrone Views umhüllen;
+:func:`async_rate_limit` bildet dessen ``key='user'``-Variante für
+``async def``-Views nach (festes Stundenfenster im gemeinsamen Cache).
+"""
+
+import logging
+import time
+from functools import wraps
+
+import redis
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+
+from config.cache import incr
+
+logger = logging.getLogger(__name__)
+
+
+def async_rate_limit(per_hour: int):
+    """Begrenzt eine async View auf ``per_hour`` Aufrufe pro User und Stunde."""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            window = int(time.time() // 3600)
+            key = f"ratelimit:{view.__module__}.{view.__name__}:{user.pk}:{window}"
+            try:
+                count = await sync_to_async(incr, thread_sensitive=False)(key, 3600)
+            except redis.RedisError as exc:
+                logger.warning("Rate-Limit nicht prüfbar (%s)", exc)
+                count = 0
+            if count > per_hour:
+                return HttpResponse("Rate limit exceeded", status=429)
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,113 @@
+"""
+Gepuffertes Schreiben von :class:`~paas.models.ProvisionEvent`-Einträgen.
+
+Statt ``provision.log += ...`` und ``save()`` (der komplette Text wird jedes
+Mal neu geschrieben) sammelt :class:`EventLog` die Einträge im Speicher und
+schreibt sie per ``bulk_create`` – spätestens alle ``batch_size`` Einträge
+bzw. beim Verlassen des ``with``-Blocks.
+
+    with EventLog(provision, stage="deploy") as events:
+        events.add("Container gestartet")
+        events.add("Port belegt", level=ProvisionEvent.LEVEL_WARNING)
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from config.registry import registry
+from .models import ProvisionEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20
+# Fallback-Werte, überschreibbar per PlatformSetting
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_MAX_PER_PROVISION = 200
+
+
+class EventLog:
+    """Puffer für die Ereignisse *einer* Bereitstellung."""
+
+    def __init__(self, provision, stage: str = "", batch_size: int = DEFAULT_BATCH_SIZE):
+        self.provision = provision
+        self.stage = stage
+        self.batch_size = batch_size
+        self._buffer: list[ProvisionEvent] = []
+
+    def add(self, message: str, stage: str | None = None,
+            level: str = ProvisionEvent.LEVEL_INFO, duration: float | None = None) -> None:
+        """Eintrag anhängen (wird erst bei ``flush()`` geschrieben)."""
+        self._buffer.append(ProvisionEvent(
+            provision_id=self.provision.pk,
+            created_at=timezone.now(),
+            stage=(stage if stage is not None else self.stage)[:32],
+            level=level,
+            message=message,
+            duration=duration,
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def error(self, message: str, stage: str | None = None) -> None:
+        self.add(message, stage=stage, level=ProvisionEvent.LEVEL_ERROR)
+
+    def flush(self) -> None:
+        """Gepufferte Einträge mit einem INSERT schreiben."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        ProvisionEvent.objects.bulk_create(batch)
+
+    def discard(self) -> None:
+        """Puffer verwerfen (z.B. wenn die Provision ohnehin gelöscht wird)."""
+        self._buffer = []
+
+    # ---- Kontext-Manager-API ------------------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+
+def prune_events(now=None) -> tuple[int, int]:
+    """
+    Aufbewahrungsregel durchsetzen:
+    1. Einträge älter als ``provision_events_retention_days`` löschen.
+    2. Pro Provision nur die neuesten ``provision_events_max_per_provision`` behalten.
+    Gibt ``(gelöscht_nach_alter, gelöscht_nach_anzahl)`` zurück.
+    """
+    now = now or timezone.now()
+    retention_days = registry.get_int("provision_events_retention_days", DEFAULT_RETENTION_DAYS)
+    max_per_provision = max(
+        1, registry.get_int("provision_events_max_per_provision", DEFAULT_MAX_PER_PROVISION)
+    )
+
+    by_age, _ = ProvisionEvent.objects.filter(
+        created_at__lt=now - timedelta(days=retention_days)
+    ).delete()
+
+    by_count = 0
+    overfull = list(
+        ProvisionEvent.objects.values("provision_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=max_per_provision)
+        .values_list("provision_id", flat=True)
+    )
+    for provision_id in overfull:
+        cutoff = (
+            ProvisionEvent.objects.filter(provision_id=provision_id)
+            .order_by("-created_at", "-id")
+            .values_list("created_at", flat=True)[max_per_provision - 1]
+        )
+        deleted, _ = ProvisionEvent.objects.filter(
+            provision_id=provision_id, created_at__lt=cutoff
+        ).delete()
+        by_count += deleted
+
+    logger.info("ProvisionEvents bereinigt: %d nach Alter, %d nach Anzahl", by_age, by_count)
+    return by_age, by_count
@@ -0,0 +1,331 @@
+"""
+Simulierter RemoteHost für Benchmarks (``manage.py bench_controller``).
+
+:class:`FakeTransport` implementiert :class:`~paas.transport.Transport`
+(``exec``, ``put``/``get``, ``exists``, ``stream``), führt aber nichts aus: die Kommandos, die der Controller
+schickt (``docker``, ``systemctl``/Tor, ``ss``, ``id``, ``test``, ``cat`` …),
+werden gegen einen Zustand im Speicher emuliert – mit einstellbarer Latenz,
+Jitter und Fehlerquote (:class:`FakeHostProfile`).
+
+Tor wird nachgebildet, indem ``systemctl --user start tor-hidden-service@…``
+die Unit und die torrc liest und nach ``tor_bootstrap`` Sekunden eine
+``hostname``-Datei im ``HiddenServiceDir`` anlegt.
+
+    with fake_hosts(FakeHostProfile(latency=0.002)):
+        deploy_app_task(provision.pk)
+"""
+
+import contextlib
+import hashlib
+import json
+import random
+import re
+import shlex
+import threading
+import time
+from dataclasses import dataclass
+
+import paramiko
+
+from .agent import METRICS_CMD
+from .transport import CommandResult, Transport
+
+TOR_UNIT_RE = re.compile(r"--torrc-file\s+(\S+)")
+HIDDEN_DIR_RE = re.compile(r"^HiddenServiceDir\s+(\S+)", re.MULTILINE)
+# Verpackung aus paas.deadlines.remote_command
+REMOTE_TIMEOUT_RE = re.compile(r"^timeout -k \d+ \d+ sh -c ")
+
+
+@dataclass
+class FakeHostProfile:
+    """Verhalten der simulierten Hosts (Zeiten in Sekunden)."""
+    latency: float = 0.001          # pro Kommando
+    jitter: float = 0.0             # gleichverteilt ± jitter
+    failure_rate: float = 0.0       # Anteil fehlschlagender Kommandos
+    connect_latency: float = 0.005  # SSH-Handshake
+    connect_failure_rate: float = 0.0
+    tor_bootstrap: float = 0.0      # bis die Onion-Adresse existiert
+    load: float = 0.5               # 1-Minuten-Load für die Host-Metriken
+    seed: int | None = None
+
+
+class _HostState:
+    """Dateien, Container und Units eines simulierten Hosts."""
+
+    def __init__(self, user: str):
+        self.user = user
+        self.lock = threading.Lock()
+        self.files: dict[str, str] = {}
+        self.pending_files: dict[str, tuple[float, str]] = {}  # Pfad → (ab, Inhalt)
+        self.containers: dict[str, str] = {}                    # Name → ID
+        self.stopped: set[str] = set()                          # angehaltene Container
+        self.units: set[str] = set()
+        self.ports: set[int] = set()
+
+
+class _FakeStream:
+    """:class:`~paas.transport.Stream` über eine fertige Ausgabe."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def settimeout(self, timeout):
+        pass
+
+    def recv(self, size):
+        chunk, self._data = self._data[:size], self._data[size:]
+        return chunk
+
+    def close(self):
+        self._data = b""
+
+
+class FakeTransport(Transport):
+    """Transport zu einem simulierten Host."""
+
+    def __init__(self, host, profile: FakeHostProfile, state: _HostState, rng: random.Random):
+        super().__init__(host)
+        self.profile = profile
+        self.state = state
+        self.rng = rng
+
+    @property
+    def username(self) -> str:
+        return self.state.user
+
+    def exec(self, cmd: str, timeout: float | None = None) -> CommandResult:
+        self._sleep(self.profile.latency)
+        if self.profile.failure_rate and self.rng.random() < self.profile.failure_rate:
+            return CommandResult(1, "", "simulated failure")
+        with self.state.lock:
+            return CommandResult(*self._dispatch(cmd.strip()))
+
+    def put(self, path: str, content: str) -> None:
+        self._sleep(self.profile.latency)
+        with self.state.lock:
+            self.state.files[self.expand(path)] = content
+
+    def get(self, path: str) -> str:
+        self._sleep(self.profile.latency)
+        with self.state.lock:
+            path = self.expand(path)
+            if not self._exists_locked(path) or path not in self.state.files:
+                raise FileNotFoundError(path)
+            return self.state.files[path]
+
+    def stream(self, cmd: str) -> "_FakeStream":
+        # Kein Nachlaufen wie bei "docker logs -f": die emulierte Ausgabe, dann Ende
+        result = self.exec(cmd)
+        return _FakeStream((result.stdout + result.stderr).encode())
+
+    # ---- Dateisystem ----------------------------------------------------
+    def expand(self, path: str) -> str:
+        path = str(path)
+        if path.startswith("~"):
+            path = f"/home/{self.state.user}" + path[1:]
+        return path.rstrip("/") or "/"
+
+    def exists(self, path: str) -> bool:
+        self._sleep(self.profile.latency)
+        with self.state.lock:
+            return self._exists_locked(self.expand(path))
+
+    def _materialize(self) -> None:
+        now = time.monotonic()
+        for path, (ready_at, content) in list(self.state.pending_files.items()):
+            if ready_at <= now:
+                self.state.files[path] = content
+                del self.state.pending_files[path]
+
+    def _sleep(self, base: float) -> None:
+        delay = base + (self.rng.uniform(-self.profile.jitter, self.profile.jitter) if self.profile.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    # ---- Kommandos ------------------------------------------------------
+    def _dispatch(self, cmd: str):
+        state = self.state
+        if REMOTE_TIMEOUT_RE.match(cmd):
+            cmd = shlex.split(cmd)[-1].strip()
+        if cmd.startswith("python3 - <<'PY'"):
+            port = self.rng.randint(20000, 60000)
+            while port in state.ports:
+                port = self.rng.randint(20000, 60000)
+            return 0, str(port), ""
+        if cmd.startswith("ss "):
+            port = int(cmd.rsplit(":", 1)[1])
+            return 0, "1" if port in state.ports else "0", ""
+        if cmd == METRICS_CMD:
+            load = self.profile.load
+            return 0, "\n".join((
+                f"{load:.2f} {load:.2f} {load:.2f} 1/100 1234", "--", "4", "--",
+                "MemTotal:        8000000 kB", "MemAvailable:    6000000 kB",
+                "SwapTotal:       1000000 kB", "SwapFree:        1000000 kB", "--",
+                "/dev/vda1  100000000 40000000 60000000  40% /",
+                "/dev/vda1  100000000 40000000 60000000  40% /", "--",
+                str(len(state.containers)),
+            )), ""
+
+        # Einfache Kommandoketten („a && b“, „a || true“)
+        if " && " in cmd:
+            result = (0, "", "")
+            for part in cmd.split(" && "):
+                result = self._dispatch(part.strip())
+                if result[0]:
+                    return result
+            return result
+        tolerant = cmd.endswith("|| true")
+        if tolerant:
+            cmd = cmd[: -len("|| true")].strip()
+
+        try:
+            argv = shlex.split(cmd)
+        except ValueError:
+            return 2, "", f"parse error: {cmd}"
+        result = self._run(argv)
+        return (0, result[1], result[2]) if tolerant else result
+
+    def _run(self, argv: list[str]):
+        state = self.state
+        prog, args = argv[0], argv[1:]
+
+        if prog in ("mkdir", "chmod", "sed"):
+            return 0, "", ""
+        if prog == "id" and args[:1] in (["-u"], ["-g"]):
+            return 0, "1000", ""
+        if prog == "test" and args[:1] == ["-f"]:
+            return (0 if self._exists_locked(self.expand(args[1])) else 1), "", ""
+        if prog == "cat":
+            path = self.expand(args[0])
+            if path == "/proc/loadavg":
+                load = self.profile.load
+                return 0, f"{load:.2f} {load:.2f} {load:.2f} 1/100 1234", ""
+            if self._exists_locked(path) and path in state.files:
+                return 0, state.files[path].strip(), ""
+            return 1, "", f"cat: {path}: No such file or directory"
+        if prog == "rm":
+            paths = [self.expand(a) for a in args if not a.startswith("-")]
+            for path in paths:
+                for existing in list(state.files):
+                    if existing == path or existing.startswith(path + "/"):
+                        del state.files[existing]
+            return 0, "", ""
+        if prog == "systemctl":
+            return self._systemctl([a for a in args if a != "--user"])
+        if prog == "docker":
+            return self._docker(args)
+        return 127, "", f"{prog}: command not found (fakehost)"
+
+    def _exists_locked(self, path: str) -> bool:
+        self._materialize()
+        # Dateien in den Volumes eines laufenden Containers „existieren“
+        return path in self.state.files or any(
+            path.startswith(f"/home/{self.state.user}/{name}/") for name in self.state.containers
+        )
+
+    def _systemctl(self, args: list[str]):
+        state = self.state
+        action, unit = args[0], (args[1] if len(args) > 1 else "")
+        if action == "start":
+            unit_file = state.files.get(f"/home/{state.user}/.config/systemd/user/{unit}", "")
+            torrc_match = TOR_UNIT_RE.search(unit_file)
+            torrc = state.files.get(self.expand(torrc_match.group(1)), "") if torrc_match else ""
+            hidden_match = HIDDEN_DIR_RE.search(torrc)
+            if hidden_match:
+                onion = hashlib.sha256(f"{unit}{self.rng.random()}".encode()).hexdigest()[:56] + ".onion"
+                ready_at = time.monotonic() + self.profile.tor_bootstrap
+                state.pending_files[self.expand(hidden_match.group(1)) + "/hostname"] = (ready_at, onion + "\n")
+            state.units.add(unit)
+        elif action == "stop":
+            state.units.discard(unit)
+        return 0, "", ""
+
+    def _docker(self, args: list[str]):
+        state = self.state
+        sub = args[0] if args else ""
+        if sub == "run":
+            name = args[args.index("--name") + 1]
+            if name in state.containers:
+                return 125, "", f"Conflict. The container name \"/{name}\" is already in use"
+            for i, arg in enumerate(args):
+                if arg == "-p":
+                    state.ports.add(int(args[i + 1].split(":")[0]))
+            container_id = hashlib.sha256(f"{name}{self.rng.random()}".encode()).hexdigest()[:12]
+            state.containers[name] = container_id
+            return 0, container_id, ""
+        if sub == "ps":
+            name = next((a.split("=", 1)[1] for a in args if a.startswith("name=")), None)
+            return 0, state.containers.get(name, ""), ""
+        if sub == "rm":
+            target = args[-1]
+            for name, container_id in list(state.containers.items()):
+                if target in (name, container_id):
+                    del state.containers[name]
+                    state.stopped.discard(name)
+            return 0, "", ""
+        if sub == "stats":
+            return 0, "\n".join(
+                json.dumps({
+                    "BlockIO": "1.2MB / 40kB", "CPUPerc": f"{self.profile.load * 10:.2f}%",
+                    "Container": container_id, "ID": container_id, "MemPerc": "0.40%",
+                    "MemUsage": "32.5MiB / 7.6GiB", "Name": name, "NetIO": "15.3kB / 4.1kB", "PIDs": "4",
+                })
+                for name, container_id in state.containers.items()
+                if name not in state.stopped
+            ), ""
+        if sub in ("stop", "start"):
+            names = [a for a in args[1:] if not a.startswith("-")]
+            missing = [n for n in names if n not in state.containers]
+            if missing:
+                return 1, "", f"Error response from daemon: No such container: {missing[0]}"
+            if sub == "stop":
+                state.stopped.update(names)
+            else:
+                state.stopped.difference_update(names)
+            return 0, "\n".join(names), ""
+        if sub == "volume":
+            return 0, "", ""
+        return 1, "", f"docker {sub}: not emulated"
+
+
+class FakeHostFarm:
+    """Zustand aller simulierten Hosts + Ersatz für ``open_transport``."""
+
+    def __init__(self, profile: FakeHostProfile):
+        self.profile = profile
+        self.rng = random.Random(profile.seed)
+        self._rng_lock = threading.Lock()
+        self._states: dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def state(self, host) -> _HostState:
+        with self._lock:
+            if host.hostname not in self._states:
+                self._states[host.hostname] = _HostState(host.ssh_user)
+            return self._states[host.hostname]
+
+    def open_transport(self, host) -> FakeTransport:
+        with self._rng_lock:
+            rng = random.Random(self.rng.random())
+        delay = self.profile.connect_latency
+        if self.profile.jitter:
+            delay += rng.uniform(-self.profile.jitter, self.profile.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.profile.connect_failure_rate and rng.random() < self.profile.connect_failure_rate:
+            raise paramiko.SSHException(f"simulated connect failure to {host.hostname}")
+        return FakeTransport(host, self.profile, self.state(host), rng)
+
+
+@contextlib.contextmanager
+def fake_hosts(profile: FakeHostProfile | None = None):
+    """Leitet alle SSH-Verbindungen von ``paas.tasks`` auf simulierte Hosts um."""
+    from . import tasks
+
+    farm = FakeHostFarm(profile or FakeHostProfile())
+    original = tasks.open_transport
+    tasks.open_transport = farm.open_transport
+    try:
+        yield farm
+    finally:
+        tasks.open_transport = original
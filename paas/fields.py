@@ -2,6 +2,7 @@ import re
 from datetime import timedelta
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils.choices import BaseChoiceIterator
 from django.utils.translation import gettext_lazy as _
 
 DURATION_RE = re.compile(r'^(?P<value>\d+)(?P<unit>[hdwm])$')
@@ -61,4 +62,50 @@ class DurationField(forms.ChoiceField):
         value = super().clean(value)   # value ist jetzt ein String
 
         # Umwandlung in timedelta
-        return parse_duration(value)
\ No newline at end of file
+        return parse_duration(value)
+
+class _CachedChoiceIterator(BaseChoiceIterator):
+    """Lazy Choices – der Katalog wird erst beim Rendern gelesen."""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.loader():
+            yield (self.field.prepare_value(obj), self.field.label_from_instance(obj))
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    ``ModelChoiceField``, das Choices und Validierung aus einem gecachten
+    Katalog (``paas.catalog``) bedient statt aus einem QuerySet –
+    bei warmem Cache ohne DB-Query.
+
+    ``loader``: Callable, das die aktuellen Modell-Instanzen liefert.
+    """
+
+    def __init__(self, model, loader, **kwargs):
+        self.loader = loader
+        super().__init__(queryset=model.objects.none(), **kwargs)
+        self.model = model
+
+    def _get_choices(self):
+        return _CachedChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.model):
+            value = value.pk
+        for obj in self.loader():
+            if str(obj.pk) == str(value):
+                return obj
+        raise ValidationError(
+            self.error_messages['invalid_choice'],
+            code='invalid_choice',
+            params={'value': value},
+        )
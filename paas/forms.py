@@ -1,7 +1,8 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from .models import AppDefinition, RemoteHost
-from .fields import DurationField
+from .fields import DurationField, CachedModelChoiceField
+from .catalog import get_apps, get_hosts
 
 # Hilfsklasse für die Optionen
 DURATION_CHOICES = [
@@ -14,8 +15,8 @@ DURATION_CHOICES = [
 ]
 
 class DeployForm(forms.Form):
-  app = forms.ModelChoiceField(
-      queryset=AppDefinition.objects.all(),
+  app = CachedModelChoiceField(
+      AppDefinition, get_apps,
       widget=forms.Select(attrs={'class': 'form-control'})
   )
   '''
@@ -31,7 +32,7 @@ class DeployForm(forms.Form):
   )
 
 class DeployFormAdmin(DeployForm):
-    target_host = forms.ModelChoiceField(
-        queryset=RemoteHost.objects.all(),
+    target_host = CachedModelChoiceField(
+        RemoteHost, get_hosts,
         widget=forms.Select(attrs={'class': 'form-control'}),
     )
@@ -0,0 +1,213 @@
+"""
+Erreichbarkeit der RemoteHosts mit Circuit Breaker.
+
+Pro Host liegt in Redis ein Hash (``host_health:<id>``) mit den Fehlern in
+Folge, dem letzten Erfolg bzw. Fehler, der Round-Trip-Zeit (gleitender
+Mittelwert) und dem Zeitpunkt, zu dem der Breaker geöffnet wurde:
+
+* ``closed`` – Normalbetrieb; jeder Verbindungsfehler erhöht ``failures``.
+* ``open`` – ab ``host_breaker_threshold`` Fehlern in Folge. Die Strategien
+  wählen den Host nicht mehr, ``paas.tasks._ssh_client`` lehnt sofort mit
+  :class:`HostUnavailable` ab, statt den Connect-Timeout abzuwarten.
+* ``half_open`` – nach ``host_breaker_cooldown`` Sekunden darf genau *ein*
+  Aufrufer (Probe-Token per ``SET NX``) eine Verbindung versuchen. Erfolg
+  schließt den Breaker, ein Fehler öffnet ihn für eine weitere Cooldown-Phase.
+
+Den regelmäßigen Probe übernimmt ``update_remote_loads``. Ist Redis nicht
+erreichbar, gelten alle Hosts als erreichbar – wie vor dem Breaker.
+
+Läuft auf dem Host der Agent (``paas.agent``), wird sein letzter Bericht im
+selben Roundtrip mitgelesen: ein frischer Bericht liefert die aktuelle Last
+(:attr:`HostHealth.live_load`). Ist der Heartbeat älter als
+``host_agent_stale_after`` Sekunden, zählt der Bericht nicht mehr: es gilt
+wieder der Breaker und die per SSH abgefragte Last (``current_load``) – ein
+abgestürzter Agent nimmt einen erreichbaren Host nicht aus der Zielauswahl.
+"""
+
+import logging
+import time
+from typing import Iterable, NamedTuple
+
+import redis
+from django.conf import settings
+
+from config.cache import get_redis, make_key
+from config.registry import registry
+from .agent import HostSample, decode as decode_report, report_key
+
+logger = logging.getLogger(__name__)
+
+# Fallback-Werte, überschreibbar per PlatformSetting
+DEFAULT_THRESHOLD = 3
+DEFAULT_COOLDOWN = 60
+DEFAULT_AGENT_STALE_AFTER = 30
+# Gewicht einer neuen Messung im gleitenden RTT-Mittel
+RTT_ALPHA = 0.3
+# Hash verfällt, wenn ein Host lange nicht angesprochen wurde
+HEALTH_TTL = 7 * 24 * 60 * 60
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+
+
+class HostUnavailable(ConnectionError):
+    """Der Breaker des Hosts ist offen – keine Verbindung versucht."""
+
+
+class HostHealth(NamedTuple):
+    state: str
+    failures: int
+    last_success: float | None
+    last_failure: float | None
+    rtt: float | None
+    opened_at: float | None
+    agent: HostSample | None = None
+    agent_fresh: bool = False
+
+    @property
+    def available(self) -> bool:
+        """Breaker geschlossen; ein veralteter Agent-Bericht ändert daran nichts (SSH-Fallback)."""
+        return self.state == STATE_CLOSED
+
+    @property
+    def live_load(self) -> float | None:
+        """1-Minuten-Last aus einem frischen Agent-Bericht (0–10 wie ``current_load``)."""
+        if not self.agent_fresh:
+            return None
+        return min(max(self.agent.load1, 0.0), 10.0)
+
+
+HEALTHY = HostHealth(STATE_CLOSED, 0, None, None, None, None)
+
+_FIELDS = ("failures", "last_success", "last_failure", "rtt", "opened_at")
+
+
+def _key(host_id: int) -> str:
+    return make_key("host_health", host_id)
+
+
+def _probe_key(host_id: int) -> str:
+    return make_key("host_health", host_id, "probe")
+
+
+def _agent_key(host_id: int) -> str:
+    return report_key(settings.CACHE_KEY_PREFIX, host_id)
+
+
+def _float(raw) -> float | None:
+    return float(raw) if raw is not None else None
+
+
+def _parse(values: list, raw_report: bytes | None, now: float) -> HostHealth:
+    failures, last_success, last_failure, rtt, opened_at = values
+    opened_at = _float(opened_at)
+    if opened_at is None:
+        state = STATE_CLOSED
+    elif now - opened_at < registry.get_int("host_breaker_cooldown", DEFAULT_COOLDOWN):
+        state = STATE_OPEN
+    else:
+        state = STATE_HALF_OPEN
+    report = decode_report(raw_report)
+    fresh = report is not None and report.age(now) <= registry.get_int(
+        "host_agent_stale_after", DEFAULT_AGENT_STALE_AFTER
+    )
+    return HostHealth(
+        state, int(failures or 0), _float(last_success), _float(last_failure), _float(rtt), opened_at,
+        report, fresh,
+    )
+
+
+# ----------------------------------------------------------------------
+# Abfragen
+# ----------------------------------------------------------------------
+def get_health(host_ids: Iterable[int]) -> dict[int, HostHealth]:
+    """Zustand und Agent-Bericht mehrerer Hosts mit *einem* Redis-Roundtrip."""
+    host_ids = list(host_ids)
+    if not host_ids:
+        return {}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for host_id in host_ids:
+            pipe.hmget(_key(host_id), _FIELDS)
+        pipe.mget([_agent_key(host_id) for host_id in host_ids])
+        *rows, reports = pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Host-Zustand nicht lesbar (%s) – alle Hosts gelten als erreichbar", exc)
+        return {host_id: HEALTHY for host_id in host_ids}
+    now = time.time()
+    return {
+        host_id: _parse(row, report, now)
+        for host_id, row, report in zip(host_ids, rows, reports)
+    }
+
+
+def guard(host) -> None:
+    """
+    Vor einem Verbindungsaufbau: wirft :class:`HostUnavailable`, wenn der
+    Breaker offen ist oder ein anderer Aufrufer gerade den Probe macht.
+    """
+    health = get_health([host.pk])[host.pk]
+    if health.state == STATE_CLOSED:
+        return
+    if health.state == STATE_HALF_OPEN:
+        try:
+            cooldown = registry.get_int("host_breaker_cooldown", DEFAULT_COOLDOWN)
+            if get_redis().set(_probe_key(host.pk), 1, nx=True, ex=max(1, cooldown)):
+                logger.info("Host %s: Breaker halb offen – Probe-Verbindung", host.hostname)
+                return
+        except redis.RedisError:
+            return
+    raise HostUnavailable(
+        f"Host {host.hostname} nicht erreichbar ({health.failures} Fehler in Folge) – Breaker offen"
+    )
+
+
+# ----------------------------------------------------------------------
+# Ergebnisse melden
+# ----------------------------------------------------------------------
+def record_success(host, rtt: float | None = None) -> None:
+    """Erfolgreiche Verbindung bzw. Antwort – schließt den Breaker."""
+    key = _key(host.pk)
+    try:
+        r = get_redis()
+        mapping = {"failures": 0, "last_success": time.time()}
+        if rtt is not None:
+            previous = _float(r.hget(key, "rtt"))
+            mapping["rtt"] = rtt if previous is None else (1 - RTT_ALPHA) * previous + RTT_ALPHA * rtt
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        pipe.hdel(key, "opened_at")
+        pipe.expire(key, HEALTH_TTL)
+        pipe.delete(_probe_key(host.pk))
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.debug("Host-Zustand für %s nicht gespeichert: %s", host.hostname, exc)
+
+
+def record_failure(host, exc: BaseException | None = None) -> None:
+    """Verbindungsfehler – öffnet den Breaker ab ``host_breaker_threshold`` in Folge."""
+    key = _key(host.pk)
+    now = time.time()
+    try:
+        r = get_redis()
+        pipe = r.pipeline(transaction=False)
+        pipe.hincrby(key, "failures", 1)
+        pipe.hset(key, "last_failure", now)
+        pipe.expire(key, HEALTH_TTL)
+        pipe.delete(_probe_key(host.pk))
+        failures = pipe.execute()[0]
+        if failures >= registry.get_int("host_breaker_threshold", DEFAULT_THRESHOLD):
+            # auch ein gescheiterter Probe beginnt eine neue Cooldown-Phase
+            if r.hset(key, "opened_at", now):
+                logger.warning("Host %s: Breaker geöffnet nach %d Fehlern (%s)", host.hostname, failures, exc)
+    except redis.RedisError as err:
+        logger.debug("Host-Zustand für %s nicht gespeichert: %s", host.hostname, err)
+
+
+def reset(host) -> None:
+    """Zustand verwerfen (Admin-Aktion) – der Host gilt wieder als erreichbar."""
+    try:
+        get_redis().delete(_key(host.pk), _probe_key(host.pk))
+    except redis.RedisError as exc:
+        logger.warning("Host-Zustand für %s nicht zurückgesetzt: %s", host.hostname, exc)
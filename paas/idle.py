@@ -0,0 +1,85 @@
+"""
+Scale-to-Zero: Provisionen im Leerlauf anhalten.
+
+Lang laufende Provisionen (``expires_at`` leer oder Wochen entfernt) belegen
+RAM auf dem Host, auch wenn niemand sie benutzt. :func:`find_idle` wertet die
+``docker stats``-Messungen (:class:`~paas.models.ContainerUsageSample`) der
+letzten ``scale_to_zero_idle_minutes`` aus: eine Provision gilt als untätig,
+wenn die CPU nie über ``scale_to_zero_cpu_percent`` lag und der Netzverkehr
+des Containers unter ``scale_to_zero_net_bytes`` blieb. Verbindungen über den
+Hidden Service laufen von Tor auf dem Host zum veröffentlichten Port – sie
+zählen also im Netzverkehr des Containers mit.
+
+``scale_idle_provisions`` (``paas.tasks``) hält solche Container mit
+``docker stop`` an (Status ``stopped``). Tor-Dienst, Onion-Adresse, Volumes
+und der Container selbst bleiben erhalten; ``wake_provision_task`` startet ihn
+wieder – aus ``my_apps`` per Knopf. Abgelaufene angehaltene Provisionen
+räumt der Sweep wie laufende ab.
+
+Ausgeschaltet, bis ``scale_to_zero_enabled`` gesetzt ist.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from config.registry import registry
+from .models import ContainerUsageSample
+from .specs import PORT_UNUSED
+
+logger = logging.getLogger(__name__)
+
+# Fallback-Werte, überschreibbar per PlatformSetting
+DEFAULT_IDLE_MINUTES = 120
+DEFAULT_CPU_PERCENT = 1.0
+DEFAULT_NET_BYTES = 256 * 1024
+# Mindestzahl Messungen im Zeitraum – ohne Daten wird nichts angehalten
+DEFAULT_MIN_SAMPLES = 6
+# Provisionen, die ohnehin bald ablaufen, lohnen das Anhalten nicht
+DEFAULT_MIN_REMAINING_HOURS = 24
+
+
+def enabled() -> bool:
+    return bool(registry.get_bool("scale_to_zero_enabled", False))
+
+
+def find_idle(now=None, provision_ids=None) -> list[int]:
+    """
+    IDs laufender Provisionen, die im ganzen Zeitraum untätig waren –
+    optional nur unter ``provision_ids`` (erneute Prüfung direkt vor dem Anhalten).
+    """
+    now = now or timezone.now()
+    since = now - timedelta(minutes=registry.get_int("scale_to_zero_idle_minutes", DEFAULT_IDLE_MINUTES))
+    min_expiry = now + timedelta(
+        hours=registry.get_int("scale_to_zero_min_remaining_hours", DEFAULT_MIN_REMAINING_HOURS)
+    )
+    # Zählerstände: Verkehr im Zeitraum = Max − Min. Ein Neustart des Containers
+    # setzt die Zähler zurück – das ergibt einen großen Wert, also „aktiv“.
+    # last_modified statt started_at: nach dem Wecken (oder einer Verlängerung)
+    # beginnt der Zeitraum neu, alte Messungen halten die App nicht sofort wieder an
+    samples = ContainerUsageSample.objects.all()
+    if provision_ids is not None:
+        samples = samples.filter(provision_id__in=provision_ids)
+    rows = (
+        samples
+        .filter(sampled_at__gte=since, provision__status='running', provision__last_modified__lte=since)
+        .filter(Q(provision__expires_at__isnull=True) | Q(provision__expires_at__gt=min_expiry))
+        # Deploys vor dem Feld api_port: der API-Port ist unbekannt und könnte nach
+        # dem Anhalten neu vergeben werden – docker start scheiterte dann
+        .exclude(Q(provision__api_port__isnull=True) & ~Q(provision__app__app_port_intern_api=PORT_UNUSED))
+        .values('provision_id')
+        .annotate(
+            samples=Count('id'),
+            cpu_max=Max('cpu'),
+            traffic=Max('net_rx') - Min('net_rx') + Max('net_tx') - Min('net_tx'),
+        )
+        .filter(
+            samples__gte=registry.get_int("scale_to_zero_min_samples", DEFAULT_MIN_SAMPLES),
+            cpu_max__lt=registry.get_float("scale_to_zero_cpu_percent", DEFAULT_CPU_PERCENT),
+            traffic__lt=registry.get_int("scale_to_zero_net_bytes", DEFAULT_NET_BYTES),
+        )
+        .order_by()
+    )
+    return [row['provision_id'] for row in rows]
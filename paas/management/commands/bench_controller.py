@@ -0,0 +1,184 @@
+"""
+Benchmark des Controllers gegen simulierte Hosts (``paas/fakehost.py``).
+
+Misst auf einer frischen Test-Datenbank (wie ``manage.py test``):
+
+* Deploy- und Teardown-Durchsatz (``deploy_app_task`` / ``delete_container_task``)
+* ``sweep_expired_containers`` bei 1.000 bzw. 10.000 abgelaufenen Zeilen
+* ``update_remote_loads`` über N Hosts
+
+Das Ergebnis ist JSON (stdout oder ``--output``) und lässt sich zwischen
+Commits vergleichen:
+
+    python manage.py bench_controller --deploys 50 --output bench.json
+"""
+
+import contextlib
+import io
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paas.benchmarks import isolated_database, run_meta, summarize
+from paas.fakehost import FakeHostProfile, fake_hosts
+from paas.models import AppDefinition, AppVolumePerApp, ConfigPatch, ProvisionedApp, RemoteHost
+from paas.specs import invalidate_specs
+from paas.tasks import (
+    delete_container_task, deploy_app_task, sweep_expired_containers, update_remote_loads,
+)
+
+SCENARIOS = ("deploy", "sweep", "loads")
+
+
+class Command(BaseCommand):
+    help = "Benchmark für Deploy, Teardown, Sweep und Lastabfrage gegen simulierte Hosts (JSON-Ausgabe)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=SCENARIOS, action="append",
+                            help="Nur diese Szenarien (mehrfach möglich).")
+        parser.add_argument("--deploys", type=int, default=20, help="Anzahl Deploys (und Teardowns).")
+        parser.add_argument("--sweep-sizes", default="1000,10000",
+                            help="Abgelaufene Zeilen pro Sweep-Lauf, kommagetrennt.")
+        parser.add_argument("--hosts", type=int, default=10, help="Hosts für update_remote_loads.")
+        parser.add_argument("--latency-ms", type=float, default=1.0, help="Latenz pro Remote-Kommando.")
+        parser.add_argument("--jitter-ms", type=float, default=0.0)
+        parser.add_argument("--connect-ms", type=float, default=5.0, help="Latenz des SSH-Handshakes.")
+        parser.add_argument("--failure-rate", type=float, default=0.0,
+                            help="Anteil fehlschlagender Remote-Kommandos (0–1).")
+        parser.add_argument("--tor-bootstrap-ms", type=float, default=0.0,
+                            help="Zeit bis zur Onion-Adresse.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="JSON in diese Datei statt auf stdout.")
+
+    def handle(self, *args, **options):
+        profile = FakeHostProfile(
+            latency=options["latency_ms"] / 1000,
+            jitter=options["jitter_ms"] / 1000,
+            connect_latency=options["connect_ms"] / 1000,
+            failure_rate=options["failure_rate"],
+            tor_bootstrap=options["tor_bootstrap_ms"] / 1000,
+            seed=options["seed"],
+        )
+        scenarios = options["only"] or SCENARIOS
+
+        results = {}
+        # print()-Ausgaben der Tasks nicht ins JSON mischen
+        with isolated_database(), fake_hosts(profile), contextlib.redirect_stdout(io.StringIO()):
+            app = self._seed_app()
+            if "deploy" in scenarios:
+                results["deploy"], results["teardown"] = self._bench_deploy(app, options["deploys"])
+            if "sweep" in scenarios:
+                sizes = [int(s) for s in options["sweep_sizes"].split(",") if s.strip()]
+                results["sweep"] = {str(n): self._bench_sweep(app, n) for n in sizes}
+            if "loads" in scenarios:
+                results["update_remote_loads"] = self._bench_loads(options["hosts"])
+
+        report = {"meta": run_meta(profile=vars(profile)), "results": results}
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Ergebnis in {options['output']} geschrieben."))
+        else:
+            self.stdout.write(payload)
+
+    # ------------------------------------------------------------------
+    # Daten
+    # ------------------------------------------------------------------
+    def _seed_app(self) -> AppDefinition:
+        app = AppDefinition.objects.create(
+            name="bench", display_name="Bench", docker_image="bench/app:latest",
+            app_port_intern_web=8080, app_port_intern_api=9090,
+            hiddenservice_port_web=80, hiddenservice_port_api=443,
+        )
+        volume = AppVolumePerApp.objects.create(app=app, host_path="data", container_path="/data")
+        ConfigPatch.objects.create(
+            app=app, volume=volume, target_file="data/config.ini",
+            pattern="^https:", action=ConfigPatch.ACTION_COMMENT,
+        )
+        invalidate_specs(app.pk)
+        return app
+
+    def _hosts(self, count: int) -> list[RemoteHost]:
+        existing = list(RemoteHost.objects.order_by("pk")[:count])
+        missing = [
+            RemoteHost(hostname=f"bench-{i}.invalid", ip_address=f"10.99.{i // 250}.{i % 250 + 1}",
+                       ssh_user="deploy", ssh_key_path="/dev/null")
+            for i in range(len(existing), count)
+        ]
+        return existing + RemoteHost.objects.bulk_create(missing)
+
+    def _user(self) -> User:
+        user, _ = User.objects.get_or_create(username="bench")
+        return user
+
+    # ------------------------------------------------------------------
+    # Szenarien
+    # ------------------------------------------------------------------
+    def _bench_deploy(self, app, count: int) -> tuple[dict, dict]:
+        hosts = self._hosts(max(1, min(count, 10)))
+        user = self._user()
+        deploy_times, deploy_errors, deployed = [], 0, []
+        for i in range(count):
+            provision = ProvisionedApp.objects.create(
+                user=user, app=app, host=hosts[i % len(hosts)],
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+            start = time.perf_counter()
+            try:
+                deploy_app_task(provision.pk)
+                deployed.append(provision.pk)
+            except Exception:
+                deploy_errors += 1
+            deploy_times.append(time.perf_counter() - start)
+
+        teardown_times, teardown_errors = [], 0
+        for pk in deployed:
+            start = time.perf_counter()
+            try:
+                delete_container_task(pk)
+            except Exception:
+                teardown_errors += 1
+            teardown_times.append(time.perf_counter() - start)
+        ProvisionedApp.objects.all().delete()
+        return summarize(deploy_times, deploy_errors), summarize(teardown_times, teardown_errors)
+
+    def _bench_sweep(self, app, rows: int) -> dict:
+        hosts = self._hosts(10)
+        user = self._user()
+        expired = timezone.now() - timedelta(minutes=5)
+        ProvisionedApp.objects.bulk_create(
+            [
+                ProvisionedApp(
+                    user=user, app=app, host=hosts[i % len(hosts)], status="running",
+                    started_at=expired - timedelta(hours=1), expires_at=expired,
+                    container_id=f"{i:012x}", container_name=f"bench-sweep-{i}",
+                )
+                for i in range(rows)
+            ],
+            batch_size=1000,
+        )
+        start = time.perf_counter()
+        sweep_expired_containers()
+        duration = time.perf_counter() - start
+        remaining = ProvisionedApp.objects.count()
+        ProvisionedApp.objects.all().delete()
+        return {
+            "rows": rows,
+            "duration_s": round(duration, 4),
+            "rows_per_s": round(rows / duration, 2) if duration else None,
+            "remaining": remaining,
+        }
+
+    def _bench_loads(self, host_count: int) -> dict:
+        self._hosts(host_count)
+        runs = []
+        for _ in range(3):
+            start = time.perf_counter()
+            update_remote_loads()
+            runs.append(time.perf_counter() - start)
+        return {"hosts": host_count, **summarize(runs)}
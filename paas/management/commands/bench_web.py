@@ -0,0 +1,299 @@
+"""
+Last- und Regressionstest der Web-Views mit Query- und Latenzbudgets.
+
+Legt auf einer frischen Test-Datenbank Tausende Benutzer und Provisionen an
+und ruft ``login``, ``select_app``, die Vorschau von ``deploy_app``,
+``my_apps`` und beide Schritte von ``delete_app`` über den Django-Testclient
+auf – optional aus mehreren Threads gleichzeitig (``--threads``). Jeder
+Request wird gemessen (Dauer, DB-Queries).
+
+Überschreitet eine View ihr Budget (maximale Queries pro Request, p95 in ms),
+endet das Kommando mit Exit-Code 1 – ein N+1 wie die früheren
+``p.app``/``p.host``-Zugriffe in ``my_apps.html`` fällt damit in der CI auf:
+
+    python manage.py bench_web --users 2000 --requests 200
+    python manage.py bench_web --budget my_apps=4:150 --output web.json
+
+Das SSH-Löschen im zweiten ``delete_app``-Schritt läuft gegen simulierte
+Hosts (``paas/fakehost.py``).
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from paas.benchmarks import isolated_database, run_meta, summarize
+from paas.fakehost import FakeHostProfile, fake_hosts
+from paas.models import AppDefinition, AppEnvVarPerApp, ProvisionedApp, RemoteHost, UserDeploymentLimit
+from paas.views import MY_APPS_PAGE_SIZE
+
+PASSWORD = "bench-password"
+
+# View → (max. Queries pro Request, p95 in ms)
+DEFAULT_BUDGETS = {
+    "login": (14, 1500),             # enthält bewusst den Passwort-Hash
+    "select_app": (4, 150),
+    "deploy_preview": (7, 150),      # Katalog/Spec beim ersten Aufruf aus der DB
+    "my_apps": (4, 150),             # unabhängig von der Seitengröße (select_related)
+    "delete_confirm": (4, 100),
+    "delete_app": (16, 500),         # inkl. Teardown gegen den simulierten Host
+}
+SCENARIOS = tuple(DEFAULT_BUDGETS)
+
+
+def _parse_budget(value: str) -> tuple[str, tuple[int, float]]:
+    """``view=queries:ms`` → ``(view, (queries, ms))``."""
+    try:
+        view, limits = value.split("=", 1)
+        queries, ms = limits.split(":", 1)
+        if view not in DEFAULT_BUDGETS:
+            raise ValueError(view)
+        return view, (int(queries), float(ms))
+    except ValueError:
+        raise CommandError(f"Ungültiges Budget '{value}' (erwartet view=queries:ms, view aus {', '.join(SCENARIOS)})")
+
+
+class Command(BaseCommand):
+    help = "Lasttest der Web-Views mit Query- und Latenzbudgets (JSON-Ausgabe, Exit-Code 1 bei Verstoß)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=SCENARIOS, action="append",
+                            help="Nur diese Views (mehrfach möglich).")
+        parser.add_argument("--users", type=int, default=2000, help="Anzahl angelegter Benutzer.")
+        parser.add_argument("--provisions", type=int, default=MY_APPS_PAGE_SIZE + 5,
+                            help="Provisionen pro Benutzer (Standard: mehr als eine my_apps-Seite).")
+        parser.add_argument("--apps", type=int, default=20, help="Anzahl App-Definitionen im Katalog.")
+        parser.add_argument("--hosts", type=int, default=10)
+        parser.add_argument("--requests", type=int, default=200, help="Requests pro View.")
+        parser.add_argument("--threads", type=int, default=1, help="Gleichzeitige Clients.")
+        parser.add_argument("--budget", action="append", default=[], metavar="VIEW=QUERIES:MS",
+                            help="Budget überschreiben, z.B. my_apps=4:150 (mehrfach möglich).")
+        parser.add_argument("--no-latency-budget", action="store_true",
+                            help="Nur Query-Budgets prüfen (z.B. auf lauten CI-Runnern).")
+        parser.add_argument("--output", help="JSON in diese Datei statt auf stdout.")
+
+    def handle(self, *args, **options):
+        budgets = dict(DEFAULT_BUDGETS)
+        budgets.update(_parse_budget(b) for b in options["budget"])
+        scenarios = options["only"] or SCENARIOS
+        self.threads = max(1, options["threads"])
+        if self.threads > 1 and connection.vendor == "sqlite":
+            # Die In-Memory-Test-DB von SQLite sperrt bei parallelen Schreibzugriffen
+            raise CommandError("--threads > 1 erfordert PostgreSQL.")
+
+        results = {}
+        setup_test_environment()
+        try:
+            # print()-Ausgaben der Views/Tasks nicht ins JSON mischen
+            with isolated_database(), fake_hosts(FakeHostProfile(latency=0, connect_latency=0)), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                seeded = self._seed(options)
+                for name in scenarios:
+                    results[name] = getattr(self, f"_bench_{name}")(seeded, options["requests"])
+        finally:
+            teardown_test_environment()
+
+        violations = []
+        for name, result in results.items():
+            max_queries, p95_ms = budgets[name]
+            result["budget"] = {"queries": max_queries, "p95_ms": p95_ms}
+            if result["errors"]:
+                violations.append(f"{name}: {result['errors']} fehlgeschlagene Requests")
+            if result["queries_max"] is not None and result["queries_max"] > max_queries:
+                violations.append(f"{name}: {result['queries_max']} Queries > Budget {max_queries}")
+            p95 = (result["p95_s"] or 0) * 1000
+            if not options["no_latency_budget"] and p95 > p95_ms:
+                violations.append(f"{name}: p95 {p95:.0f} ms > Budget {p95_ms:.0f} ms")
+            result["ok"] = not any(v.startswith(f"{name}:") for v in violations)
+
+        report = {
+            "meta": run_meta(
+                users=options["users"], provisions_per_user=options["provisions"],
+                requests=options["requests"], threads=self.threads,
+            ),
+            "results": results,
+            "violations": violations,
+        }
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+        for name, result in results.items():
+            line = (f"{name:15} p95 {(result['p95_s'] or 0) * 1000:8.1f} ms   "
+                    f"Queries {result['queries_min']}–{result['queries_max']}")
+            self.stderr.write(self.style.SUCCESS(line) if result["ok"] else self.style.ERROR(line))
+        if violations:
+            raise CommandError("Budget überschritten:\n  " + "\n  ".join(violations))
+
+    # ------------------------------------------------------------------
+    # Daten
+    # ------------------------------------------------------------------
+    def _seed(self, options) -> dict:
+        hosts = RemoteHost.objects.bulk_create([
+            RemoteHost(hostname=f"bench-{i}.invalid", ip_address=f"10.99.0.{i + 1}",
+                       ssh_user="deploy", ssh_key_path="/dev/null")
+            for i in range(options["hosts"])
+        ])
+        apps = AppDefinition.objects.bulk_create([
+            AppDefinition(name=f"bench-{i}", display_name=f"Bench {i}", docker_image=f"bench/app{i}:latest",
+                          description="Benchmark-App", app_port_intern_web=8080)
+            for i in range(options["apps"])
+        ])
+        AppEnvVarPerApp.objects.bulk_create([
+            AppEnvVarPerApp(app=app, key=key, value="x", editable=editable)
+            for app in apps
+            for key, editable in (("LANG", False), ("ADMIN_EMAIL", True), ("TZ", True))
+        ])
+
+        # Ein Hash für alle – make_password pro Benutzer würde das Seeding dominieren
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            [User(username=f"bench{i:05d}", password=password) for i in range(options["users"])],
+            batch_size=1000,
+        )
+        UserDeploymentLimit.objects.bulk_create(
+            [UserDeploymentLimit(user=u) for u in users], batch_size=1000,
+        )
+
+        now = timezone.now()
+        rows = (
+            ProvisionedApp(
+                user=user, app=apps[(u + n) % len(apps)], host=hosts[(u + n) % len(hosts)],
+                status="running", started_at=now - timedelta(minutes=n),
+                expires_at=now + timedelta(hours=1),
+                container_id=f"{u:06x}{n:06x}", container_name=f"bench-{u}-{n}",
+                port=20000 + n, onion_address=f"{u:028x}{n:028x}.onion",
+            )
+            for u, user in enumerate(users)
+            for n in range(options["provisions"])
+        )
+        while batch := list(itertools.islice(rows, 5000)):
+            ProvisionedApp.objects.bulk_create(batch)
+        return {"users": users, "apps": apps}
+
+    # ------------------------------------------------------------------
+    # Messung
+    # ------------------------------------------------------------------
+    def _measure(self, count: int, request, users) -> dict:
+        """
+        Führt ``request(client, i)`` ``count``-mal aus – reihum für die
+        Benutzer, verteilt auf ``self.threads`` Clients – und misst Dauer
+        und DB-Queries jedes Aufrufs.
+        """
+        durations, queries, lock = [], [], threading.Lock()
+        errors = [0]
+
+        def worker(indices):
+            try:
+                for i in indices:
+                    user = users[i % len(users)]
+                    # 500er zählen als Fehler statt den Lauf abzubrechen
+                    client = Client(
+                        raise_request_exception=False,
+                        REMOTE_ADDR=f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+                    )
+                    prepared = request(client, user, i, prepare=True)
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        ok = request(client, user, i, prepared=prepared)
+                        duration = time.perf_counter() - start
+                    with lock:
+                        durations.append(duration)
+                        queries.append(len(ctx.captured_queries))
+                        errors[0] += not ok
+            finally:
+                connections.close_all()
+
+        if self.threads == 1:
+            worker(range(count))
+        else:
+            with ThreadPoolExecutor(self.threads) as pool:
+                list(pool.map(worker, [range(t, count, self.threads) for t in range(self.threads)]))
+        return {
+            **summarize(durations, errors[0]),
+            "queries_min": min(queries, default=None),
+            "queries_max": max(queries, default=None),
+        }
+
+    def _logged_in(self, request):
+        """Request-Funktion, die vorher (ungemessen) den Benutzer anmeldet."""
+        def wrapped(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                client.force_login(user)
+                return request(client, user, i, prepare=True)
+            return request(client, user, i, prepared=prepared)
+        return wrapped
+
+    def _bench_login(self, seeded, count):
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                session = client.session
+                session["captcha_solved"] = "YES"
+                session.save()
+                return None
+            response = client.post(reverse("login"), {"username": user.username, "password": PASSWORD})
+            return response.status_code == 302
+        return self._measure(count, request, seeded["users"])
+
+    def _bench_select_app(self, seeded, count):
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                return None
+            return client.get(reverse("paas_select_app")).status_code == 200
+        return self._measure(count, self._logged_in(request), seeded["users"])
+
+    def _bench_deploy_preview(self, seeded, count):
+        apps = seeded["apps"]
+
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                return None
+            response = client.post(reverse("paas_deploy_app"), {"app": apps[i % len(apps)].pk, "duration": "1h"})
+            return response.status_code == 200
+        return self._measure(count, self._logged_in(request), seeded["users"])
+
+    def _bench_my_apps(self, seeded, count):
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                return None
+            return client.get(reverse("paas_my_apps")).status_code == 200
+        return self._measure(count, self._logged_in(request), seeded["users"])
+
+    def _next_running(self, user) -> int | None:
+        return (
+            ProvisionedApp.objects.filter(user=user, status="running")
+            .order_by("-pk").values_list("pk", flat=True).first()
+        )
+
+    def _bench_delete_confirm(self, seeded, count):
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                return self._next_running(user)
+            response = client.post(reverse("paas_delete_app", args=[prepared]))
+            return prepared is not None and response.status_code == 200
+        return self._measure(count, self._logged_in(request), seeded["users"])
+
+    def _bench_delete_app(self, seeded, count):
+        def request(client, user, i, prepare=False, prepared=None):
+            if prepare:
+                return self._next_running(user)
+            response = client.post(reverse("paas_delete_app", args=[prepared]), {"confirmed": "1"})
+            return prepared is not None and response.status_code == 302
+        return self._measure(count, self._logged_in(request), seeded["users"])
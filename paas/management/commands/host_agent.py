@@ -0,0 +1,42 @@
+"""
+Host-Agent (``paas/agent.py``) mit den Redis-Einstellungen des Projekts.
+
+Für Hosts mit Projekt-Checkout; ohne Checkout genügt die Datei
+``paas/agent.py`` allein (``python3 agent.py --help``).
+
+    python manage.py host_agent node-1.example.org --interval 5
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config.cache import get_redis
+from paas import agent
+from paas.models import RemoteHost
+
+
+class Command(BaseCommand):
+    help = "Schiebt Last, Speicher, Swap, Platte und Container-Zahl dieses Hosts regelmäßig nach Redis."
+
+    def add_arguments(self, parser):
+        parser.add_argument("host", help="Hostname oder ID des RemoteHost, auf dem der Agent läuft.")
+        parser.add_argument("--interval", type=float, default=agent.DEFAULT_INTERVAL,
+                            help="Sekunden zwischen zwei Berichten.")
+        parser.add_argument("--home", help="Home des Deploy-Users (Standard: eigenes Home).")
+        parser.add_argument("--docker-root", default=agent.DEFAULT_DOCKER_ROOT,
+                            help="Data-Root des Docker-Daemons.")
+        parser.add_argument("--no-docker", action="store_true", help="Container nicht zählen.")
+        parser.add_argument("--once", action="store_true", help="Einen Bericht senden und beenden.")
+
+    def handle(self, *args, **options):
+        ref = options["host"]
+        lookup = {"pk": int(ref)} if ref.isdigit() else {"hostname": ref}
+        try:
+            host = RemoteHost.objects.get(**lookup)
+        except RemoteHost.DoesNotExist:
+            raise CommandError(f"RemoteHost {ref!r} nicht gefunden.")
+
+        key = agent.report_key(settings.CACHE_KEY_PREFIX, host.pk)
+        self.stderr.write(f"Agent für {host.hostname} (ID {host.pk}) → {key}, alle {options['interval']:g}s")
+        agent.run(get_redis(), key, options["interval"], options["home"], options["docker_root"],
+                  not options["no_docker"], options["once"])
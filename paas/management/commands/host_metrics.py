@@ -0,0 +1,65 @@
+"""
+Kapazitätsübersicht aus den Host-Zeitreihen (``paas/timeseries.py``).
+
+Pro Host Mittel und Spitze von Last und RAM über die letzte Stunde
+(Minutenwerte), den letzten Tag und die letzten 30 Tage (Stundenwerte):
+
+    python manage.py host_metrics
+    python manage.py host_metrics node-1.example.org --json
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from paas import timeseries
+from paas.models import RemoteHost
+
+# Name → (Auflösung, Einträge)
+WINDOWS = {
+    "1h": (timeseries.MINUTE, 60),
+    "24h": (timeseries.HOUR, 24),
+    "30d": (timeseries.HOUR, 30 * 24),
+}
+
+
+class Command(BaseCommand):
+    help = "Mittel- und Spitzenwerte von Last, RAM und Platte pro Host für die Kapazitätsplanung."
+
+    def add_arguments(self, parser):
+        parser.add_argument("hosts", nargs="*", help="Hostnamen (Standard: alle).")
+        parser.add_argument("--json", action="store_true", help="Ausgabe als JSON.")
+
+    def handle(self, *args, **options):
+        hosts = RemoteHost.objects.order_by("hostname")
+        if options["hosts"]:
+            hosts = hosts.filter(hostname__in=options["hosts"])
+
+        report = {}
+        for host in hosts:
+            report[host.hostname] = {
+                window: timeseries.summarize(timeseries.series(host.pk, resolution, limit))
+                for window, (resolution, limit) in WINDOWS.items()
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        now = time.time()
+        for hostname, windows in report.items():
+            self.stdout.write(hostname)
+            for window, summary in windows.items():
+                if summary is None:
+                    self.stdout.write(f"  {window:>4}  keine Daten")
+                    continue
+                self.stdout.write(
+                    f"  {window:>4}  Last Ø {summary['load_avg']:5.2f} max {summary['load_peak']:5.2f}"
+                    f" ({summary['load_per_cpu']:.0%} je CPU)"
+                    f"  RAM Ø {summary['mem_avg']:.0%} max {summary['mem_peak']:.0%}"
+                    f"  Swap max {summary['swap_peak']:.0%}"
+                    f"  Platte {summary['home_used']:.0%}/{summary['docker_used']:.0%}"
+                    f"  Container {summary['containers']}"
+                    f"  ({summary['samples']} Werte, ab {(now - summary['since']) / 3600:.1f}h)"
+                )
@@ -0,0 +1,302 @@
+"""
+Prometheus-Metriken des Controllers.
+
+Gunicorn-Worker und Celery-Kindprozesse sind getrennte Prozesse; damit
+``/metrics`` alle Werte zeigt, läuft ``prometheus_client`` im
+Multiprocess-Modus: ist ``PROMETHEUS_MULTIPROC_DIR`` gesetzt (siehe
+``entrypoint.sh``), schreibt jeder Prozess seine Werte in eine mmap-Datei
+in diesem Verzeichnis, und :func:`render` fasst beim Scrape alles zusammen.
+Beendete Prozesse werden über ``gunicorn.conf.py`` bzw. das Celery-Signal
+``worker_process_shutdown`` abgemeldet.
+
+Host-Last, Provisionen pro Host und die Queue-Länge werden nicht
+mitgeschrieben, sondern beim Scrape abgefragt (:class:`ControllerCollector`).
+"""
+
+import contextvars
+import hmac
+import logging
+import os
+import time
+
+import redis
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client import multiprocess
+
+from ip_policy import IPPolicy, TrustedProxies, parse_networks
+
+logger = logging.getLogger(__name__)
+
+# Deploy-Stufen dauern Sekunden bis Minuten (Tor-Hostname, Docker-Pull)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SSH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+VIEW_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+STAGE_DURATION = Histogram(
+    "privycloud_stage_duration_seconds",
+    "Dauer der Deploy- und Teardown-Stufen (geschrieben von paas.spans)",
+    ["operation", "stage", "outcome"], buckets=STAGE_BUCKETS,
+)
+SSH_CONNECT = Histogram(
+    "privycloud_ssh_connect_seconds",
+    "Aufbau einer SSH-Verbindung pro Host",
+    ["host", "outcome"], buckets=SSH_BUCKETS,
+)
+SSH_COMMAND = Histogram(
+    "privycloud_ssh_command_seconds",
+    "Laufzeit eines Remote-Kommandos pro Host",
+    ["host"], buckets=SSH_BUCKETS,
+)
+SSH_COMMAND_TIMEOUTS = Counter(
+    "privycloud_ssh_command_timeouts_total",
+    "Remote-Kommandos, die ihr Zeitbudget überschritten haben",
+    ["host"],
+)
+TASK_WAIT = Histogram(
+    "privycloud_task_wait_seconds",
+    "Zeit zwischen Einreihen und Start eines Celery-Tasks",
+    ["task"], buckets=SSH_BUCKETS + (60, 300),
+)
+TASK_RUNTIME = Histogram(
+    "privycloud_task_runtime_seconds",
+    "Laufzeit eines Celery-Tasks",
+    ["task", "state"], buckets=STAGE_BUCKETS,
+)
+SWEEP_DURATION = Histogram(
+    "privycloud_sweep_duration_seconds",
+    "Dauer eines Laufs von sweep_expired_containers",
+    buckets=STAGE_BUCKETS,
+)
+SWEEP_BACKLOG = Gauge(
+    "privycloud_sweep_backlog",
+    "Abgelaufene Provisionen zu Beginn des letzten Sweeps",
+    multiprocess_mode="mostrecent",
+)
+SWEEP_RESULTS = Counter(
+    "privycloud_sweep_results_total",
+    "Vom Sweep bearbeitete Provisionen",
+    ["result"],
+)
+VIEW_LATENCY = Histogram(
+    "privycloud_view_duration_seconds",
+    "Antwortzeit pro View",
+    ["view", "method", "status"], buckets=VIEW_BUCKETS,
+)
+VIEW_QUERIES = Histogram(
+    "privycloud_view_db_queries",
+    "DB-Queries pro Request",
+    ["view"], buckets=QUERY_BUCKETS,
+)
+
+
+def host_label(ssh) -> str:
+    """Host-Label für eine offene Verbindung bzw. einen Transport (``paas.transport``)."""
+    if getattr(ssh, "metrics_host", None):
+        return ssh.metrics_host
+    host = getattr(ssh, "host", None)  # Transport
+    return getattr(host, "hostname", None) or "local"
+
+
+# ----------------------------------------------------------------------
+# DB-Queries pro Request
+# ----------------------------------------------------------------------
+# ContextVar statt Thread-Local: asgiref kopiert den Kontext in die Threads
+# von sync_to_async – auch ORM-Aufrufe asynchroner Views werden gezählt.
+_query_count = contextvars.ContextVar("privycloud_query_count", default=None)
+
+
+def query_counter(execute, sql, params, many, context):
+    """``execute_wrapper`` für jede DB-Verbindung (siehe ``paas/signals.py``)."""
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def start_query_count():
+    """Neuen Zähler für den laufenden Request setzen → ``(zähler, token)``."""
+    counter = [0]
+    return counter, _query_count.set(counter)
+
+
+def observe_request(request, response, duration: float, queries: int, token) -> None:
+    _query_count.reset(token)
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match else "unmatched"
+    status = f"{response.status_code // 100}xx" if response is not None else "5xx"
+    VIEW_LATENCY.labels(view, request.method, status).observe(duration)
+    VIEW_QUERIES.labels(view).observe(queries)
+
+
+# ----------------------------------------------------------------------
+# Celery: Wartezeit und Laufzeit
+# ----------------------------------------------------------------------
+SENT_AT_HEADER = "privycloud_sent_at"
+_task_started: dict[str, float] = {}
+
+
+def connect_celery_signals() -> None:
+    from celery import signals
+
+    @signals.before_task_publish.connect(weak=False)
+    def _stamp(headers=None, **_):
+        if headers is not None:
+            headers[SENT_AT_HEADER] = time.time()
+
+    @signals.task_prerun.connect(weak=False)
+    def _prerun(task_id=None, task=None, **_):
+        _task_started[task_id] = time.perf_counter()
+        sent_at = task.request.get(SENT_AT_HEADER) if task is not None else None
+        if sent_at:
+            TASK_WAIT.labels(task.name).observe(max(0.0, time.time() - float(sent_at)))
+
+    @signals.task_postrun.connect(weak=False)
+    def _postrun(task_id=None, task=None, state=None, **_):
+        start = _task_started.pop(task_id, None)
+        if start is not None and task is not None:
+            TASK_RUNTIME.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _process_dead(pid=None, **_):
+        mark_process_dead(pid or os.getpid())
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# ----------------------------------------------------------------------
+# Werte beim Scrape
+# ----------------------------------------------------------------------
+_broker = None
+
+
+def _queue_depth(queue: str) -> int:
+    """Länge einer Celery-Queue im Redis-Broker (inkl. Prioritäts-Listen)."""
+    global _broker
+    if _broker is None:
+        _broker = redis.Redis.from_url(
+            settings.CELERY_BROKER_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    # Kombu legt Prioritäten 3/6/9 als eigene Listen "<queue>\x06\x16<prio>" an
+    names = [queue] + [f"{queue}\x06\x16{prio}" for prio in (3, 6, 9)]
+    pipe = _broker.pipeline()
+    for name in names:
+        pipe.llen(name)
+    return sum(pipe.execute())
+
+
+class ControllerCollector:
+    """Host- und Queue-Zustand, abgefragt beim Scrape."""
+
+    def collect(self):
+        from django.db.models import Count
+        from . import health
+        from .models import ProvisionedApp, RemoteHost
+
+        load = GaugeMetricFamily("privycloud_host_load", "Letzte gemessene Last (0–10)", labels=["host"])
+        provisions = GaugeMetricFamily(
+            "privycloud_host_provisions", "Provisionen pro Host und Status", labels=["host", "status"],
+        )
+        hosts = {}
+        for host_id, hostname, current_load in RemoteHost.objects.values_list("id", "hostname", "current_load"):
+            hosts[host_id] = hostname
+            load.add_metric([hostname], current_load or 0.0)
+        counts = (
+            ProvisionedApp.objects.order_by().values("host_id", "status").annotate(n=Count("id"))
+        )
+        for row in counts:
+            provisions.add_metric([hosts.get(row["host_id"], str(row["host_id"])), row["status"]], row["n"])
+        yield load
+        yield provisions
+
+        breaker = GaugeMetricFamily(
+            "privycloud_host_breaker_open", "Circuit Breaker offen (1) bzw. halb offen (0.5)", labels=["host"],
+        )
+        rtt = GaugeMetricFamily("privycloud_host_rtt_seconds", "Gleitende Round-Trip-Zeit", labels=["host"])
+        agent_age = GaugeMetricFamily(
+            "privycloud_host_agent_age_seconds", "Alter des letzten Agent-Berichts", labels=["host"],
+        )
+        mem = GaugeMetricFamily("privycloud_host_memory_used_ratio", "Belegter RAM laut Agent", labels=["host"])
+        swap = GaugeMetricFamily("privycloud_host_swap_used_ratio", "Belegter Swap laut Agent", labels=["host"])
+        disk = GaugeMetricFamily(
+            "privycloud_host_disk_used_ratio", "Belegte Platte laut Agent", labels=["host", "mount"],
+        )
+        containers = GaugeMetricFamily("privycloud_host_containers", "Laufende Container laut Agent", labels=["host"])
+        for host_id, state in health.get_health(hosts).items():
+            label = [hosts[host_id]]
+            level = {health.STATE_OPEN: 1.0, health.STATE_HALF_OPEN: 0.5}.get(state.state, 0.0)
+            breaker.add_metric(label, level)
+            if state.rtt is not None:
+                rtt.add_metric(label, state.rtt)
+            if state.agent is not None:
+                agent_age.add_metric(label, max(0.0, state.agent.age()))
+                mem.add_metric(label, state.agent.mem_used)
+                swap.add_metric(label, state.agent.swap_used)
+                disk.add_metric(label + ["home"], state.agent.home_used)
+                disk.add_metric(label + ["docker"], state.agent.docker_used)
+                containers.add_metric(label, state.agent.containers)
+        yield from (breaker, rtt, agent_age, mem, swap, disk, containers)
+
+        depth = GaugeMetricFamily("privycloud_queue_depth", "Wartende Celery-Tasks", labels=["queue"])
+        for queue in settings.CELERY_TASK_QUEUES:
+            try:
+                depth.add_metric([queue], _queue_depth(queue))
+            except redis.RedisError as exc:
+                logger.warning("Queue-Länge von %s nicht lesbar (%s)", queue, exc)
+        yield depth
+
+
+class _ProcessCollector:
+    """Ohne Multiprocess-Verzeichnis: Werte des eigenen Prozesses (Entwicklung)."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition aller Metriken: ``(body, content_type)``."""
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessCollector())
+    registry.register(ControllerCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# ----------------------------------------------------------------------
+# Zugriff auf /metrics
+# ----------------------------------------------------------------------
+_scrape_policy = None
+
+
+def scrape_allowed(request) -> bool:
+    """
+    Nur aus ``METRICS_ALLOWED_NETWORKS``; ist ``METRICS_TOKEN`` gesetzt,
+    zusätzlich nur mit ``Authorization: Bearer <token>``.
+    """
+    global _scrape_policy
+    if _scrape_policy is None:
+        _scrape_policy = (
+            IPPolicy(parse_networks(settings.METRICS_ALLOWED_NETWORKS, source="METRICS_ALLOWED_NETWORKS")),
+            TrustedProxies(parse_networks(settings.ADMIN_TRUSTED_PROXIES)),
+        )
+    policy, proxies = _scrape_policy
+    ip = proxies.client_ip(request.META.get("REMOTE_ADDR"), request.META.get("HTTP_X_FORWARDED_FOR"))
+    try:
+        if not ip or not policy.is_allowed(ip):
+            return False
+    except ValueError:
+        return False
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied, token)
+    return True
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='remotehost',
+            options={'verbose_name': 'Target-Host', 'verbose_name_plural': 'Target-Hosts'},
+        ),
+        migrations.AddField(
+            model_name='remotehost',
+            name='nur_superuser',
+            field=models.BooleanField(default=False, help_text='Nur Superuser dürfen auf diesem Host deployen.'),
+        ),
+        migrations.AlterField(
+            model_name='remotehost',
+            name='ssh_key_path',
+            field=models.CharField(blank=True, max_length=256, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProvisionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('stage', models.CharField(blank=True, max_length=32)),
+                ('level', models.CharField(choices=[('debug', 'Debug'), ('info', 'Info'), ('warning', 'Warnung'), ('error', 'Fehler')], default='info', max_length=8)),
+                ('message', models.TextField()),
+                ('duration', models.FloatField(blank=True, help_text='Dauer des Schritts in Sekunden (optional).', null=True)),
+                ('provision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='paas.provisionedapp')),
+            ],
+            options={
+                'verbose_name': 'Provision Event',
+                'verbose_name_plural': 'Provision Events',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['provision', 'created_at'], name='paas_event_prov_created_idx'), models.Index(fields=['created_at'], name='paas_event_created_idx')],
+            },
+        ),
+    ]
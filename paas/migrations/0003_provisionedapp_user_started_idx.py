@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0002_provisionevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='provisionedapp',
+            index=models.Index(fields=['user', '-started_at', '-id'], name='paas_prov_user_started_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0003_provisionedapp_user_started_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='provisionedapp',
+            index=models.Index(fields=['started_at'], name='paas_prov_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provisionedapp',
+            index=models.Index(fields=['expires_at'], name='paas_prov_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provisionedapp',
+            index=models.Index(fields=['status', 'expires_at'], name='paas_prov_status_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0004_provisionedapp_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProvisionSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('deploy', 'Deploy'), ('teardown', 'Teardown')], max_length=16)),
+                ('stage', models.CharField(max_length=32)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration', models.FloatField(help_text='Dauer in Sekunden.')),
+                ('ok', models.BooleanField(default=True)),
+                ('app', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='paas.appdefinition')),
+                ('host', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='paas.remotehost')),
+                ('provision', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='spans', to='paas.provisionedapp')),
+            ],
+            options={
+                'verbose_name': 'Provision Span',
+                'verbose_name_plural': 'Provision Spans',
+                'ordering': ['started_at', 'id'],
+                'indexes': [models.Index(fields=['started_at'], name='paas_span_started_idx'), models.Index(fields=['provision', 'started_at'], name='paas_span_prov_started_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0005_provisionspan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotehost',
+            name='transport',
+            field=models.CharField(choices=[('paramiko', 'Paramiko'), ('openssh', 'OpenSSH (ControlMaster)'), ('local', 'Lokal (Controller-Host)')], default='paramiko', help_text='Verbindungsart für Kommandos und Dateien. OpenSSH bündelt alle Verbindungen zum Host über einen ControlMaster.', max_length=16),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0006_remotehost_transport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContainerUsageSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sampled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cpu', models.FloatField(help_text='CPU in Prozent eines Kerns (wie docker stats).')),
+                ('memory', models.PositiveBigIntegerField(help_text='Belegter Speicher in Bytes.')),
+                ('net_rx', models.PositiveBigIntegerField(default=0)),
+                ('net_tx', models.PositiveBigIntegerField(default=0)),
+                ('block_read', models.PositiveBigIntegerField(default=0)),
+                ('block_write', models.PositiveBigIntegerField(default=0)),
+                ('pids', models.PositiveIntegerField(default=0)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='paas.remotehost')),
+                ('provision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_samples', to='paas.provisionedapp')),
+            ],
+            options={
+                'verbose_name': 'Container Usage Sample',
+                'verbose_name_plural': 'Container Usage Samples',
+                'ordering': ['sampled_at', 'id'],
+                'indexes': [models.Index(fields=['sampled_at'], name='paas_usage_sampled_idx'), models.Index(fields=['provision', 'sampled_at'], name='paas_usage_prov_sampled_idx'), models.Index(fields=['host', 'sampled_at'], name='paas_usage_host_sampled_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paas', '0007_containerusagesample'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provisionedapp',
+            name='api_port',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -50,6 +50,23 @@ class RemoteHost(models.Model):
         help_text="Aktuelle CPU‑Last des Hosts (0.0 – 10.0)."
     )
 
+    # ----------   Verbindungsart (paas/transport.py)  -------------
+    TRANSPORT_PARAMIKO = 'paramiko'
+    TRANSPORT_OPENSSH  = 'openssh'
+    TRANSPORT_LOCAL    = 'local'
+    TRANSPORT_CHOICES  = [
+        (TRANSPORT_PARAMIKO, 'Paramiko'),
+        (TRANSPORT_OPENSSH, 'OpenSSH (ControlMaster)'),
+        (TRANSPORT_LOCAL, 'Lokal (Controller-Host)'),
+    ]
+    transport       = models.CharField(
+        max_length=16,
+        choices=TRANSPORT_CHOICES,
+        default=TRANSPORT_PARAMIKO,
+        help_text="Verbindungsart für Kommandos und Dateien. OpenSSH bündelt alle "
+                  "Verbindungen zum Host über einen ControlMaster.",
+    )
+
     class Meta:
         verbose_name        = "Target-Host"
         verbose_name_plural = "Target-Hosts"
@@ -75,8 +92,12 @@ class ProvisionedApp(models.Model):
       help_text=_('Zeitpunkt, zu dem die Bereitstellung endet. `None` = kein Limit.'),
   )
   port = models.PositiveIntegerField(blank=True, null=True)
+  # API-Port auf dem Host (nur bei Apps mit API) – bleibt für angehaltene Container reserviert
+  api_port = models.PositiveIntegerField(blank=True, null=True)
   # Status: pending, running, finished, error, deleted
   status = models.CharField(max_length=32, default='pending')
+  # Altbestand – neue Einträge landen in ProvisionEvent (siehe unten).
+  # In Listen‑Queries immer per .defer('log') ausschließen.
   log = models.TextField(blank=True, null=True)
   onion_address = models.CharField(
       max_length=100, blank=True, null=True,
@@ -86,6 +107,14 @@ class ProvisionedApp(models.Model):
 
   class Meta:
   #   unique_together = ('user', 'app', 'host')   # keine Duplikate
+      indexes = [
+          # Keyset‑Pagination in my_apps: WHERE user = … ORDER BY started_at DESC, id DESC
+          models.Index(fields=['user', '-started_at', '-id'], name='paas_prov_user_started_idx'),
+          # Admin (date_hierarchy, Filter) und Sweep (status IN … AND expires_at < now)
+          models.Index(fields=['started_at'], name='paas_prov_started_idx'),
+          models.Index(fields=['expires_at'], name='paas_prov_expires_idx'),
+          models.Index(fields=['status', 'expires_at'], name='paas_prov_status_expires_idx'),
+      ]
       verbose_name = "Provisioned App"
       verbose_name_plural = "Provisioned Apps"
 
@@ -96,6 +125,125 @@ class ProvisionedApp(models.Model):
       return f"{self.user} – {self.app} on {self.host}"
 
 
+class ProvisionEvent(models.Model):
+  """
+  Append‑only Ereignis‑Log einer Bereitstellung.
+
+  Ersetzt das Aufaddieren von Text in ``ProvisionedApp.log``: jeder Eintrag
+  ist eine eigene Zeile (O(1)‑Insert, gepuffert über ``paas.events.EventLog``).
+  Alte Einträge werden von ``prune_provision_events`` entfernt.
+  """
+  LEVEL_DEBUG = 'debug'
+  LEVEL_INFO = 'info'
+  LEVEL_WARNING = 'warning'
+  LEVEL_ERROR = 'error'
+
+  LEVEL_CHOICES = [
+      (LEVEL_DEBUG, 'Debug'),
+      (LEVEL_INFO, 'Info'),
+      (LEVEL_WARNING, 'Warnung'),
+      (LEVEL_ERROR, 'Fehler'),
+  ]
+
+  provision = models.ForeignKey(
+      ProvisionedApp, on_delete=models.CASCADE,
+      related_name='events',
+  )
+  created_at = models.DateTimeField(default=timezone.now)
+  stage = models.CharField(max_length=32, blank=True)
+  level = models.CharField(max_length=8, choices=LEVEL_CHOICES, default=LEVEL_INFO)
+  message = models.TextField()
+  duration = models.FloatField(
+      null=True, blank=True,
+      help_text="Dauer des Schritts in Sekunden (optional).",
+  )
+
+  class Meta:
+      ordering = ['created_at', 'id']
+      indexes = [
+          models.Index(fields=['provision', 'created_at'], name='paas_event_prov_created_idx'),
+          models.Index(fields=['created_at'], name='paas_event_created_idx'),
+      ]
+      verbose_name = "Provision Event"
+      verbose_name_plural = "Provision Events"
+
+  def __str__(self):
+      return f"[{self.level}] {self.stage}: {self.message[:60]}"
+
+
+class ProvisionSpan(models.Model):
+  """
+  Dauer eines Abschnitts von Deploy oder Teardown (``paas.spans.SpanRecorder``).
+
+  App und Host werden direkt gespeichert und die Provision per ``SET_NULL``
+  referenziert – so bleiben die Zeiten für die p50/p95-Auswertung im Admin
+  erhalten, auch wenn die Provision längst gelöscht ist.
+  """
+  OPERATION_DEPLOY = 'deploy'
+  OPERATION_TEARDOWN = 'teardown'
+
+  OPERATION_CHOICES = [
+      (OPERATION_DEPLOY, 'Deploy'),
+      (OPERATION_TEARDOWN, 'Teardown'),
+  ]
+
+  provision = models.ForeignKey(
+      ProvisionedApp, on_delete=models.SET_NULL,
+      null=True, blank=True, related_name='spans',
+  )
+  app = models.ForeignKey(AppDefinition, on_delete=models.SET_NULL, null=True, blank=True)
+  host = models.ForeignKey(RemoteHost, on_delete=models.SET_NULL, null=True, blank=True)
+  operation = models.CharField(max_length=16, choices=OPERATION_CHOICES)
+  stage = models.CharField(max_length=32)
+  started_at = models.DateTimeField(default=timezone.now)
+  duration = models.FloatField(help_text="Dauer in Sekunden.")
+  ok = models.BooleanField(default=True)
+
+  class Meta:
+      ordering = ['started_at', 'id']
+      indexes = [
+          models.Index(fields=['started_at'], name='paas_span_started_idx'),
+          models.Index(fields=['provision', 'started_at'], name='paas_span_prov_started_idx'),
+      ]
+      verbose_name = "Provision Span"
+      verbose_name_plural = "Provision Spans"
+
+  def __str__(self):
+      return f"{self.operation}/{self.stage}: {self.duration:.2f}s"
+
+
+class ContainerUsageSample(models.Model):
+  """
+  Ressourcenverbrauch eines Containers zu einem Zeitpunkt (``docker stats``, ``paas.usage``).
+
+  Netz- und Block-I/O sind Zählerstände seit dem Containerstart – die Rate
+  ergibt sich aus der Differenz zweier Messungen derselben Provision.
+  """
+  provision = models.ForeignKey(ProvisionedApp, on_delete=models.CASCADE, related_name='usage_samples')
+  host = models.ForeignKey(RemoteHost, on_delete=models.CASCADE, related_name='+')
+  sampled_at = models.DateTimeField(default=timezone.now)
+  cpu = models.FloatField(help_text="CPU in Prozent eines Kerns (wie docker stats).")
+  memory = models.PositiveBigIntegerField(help_text="Belegter Speicher in Bytes.")
+  net_rx = models.PositiveBigIntegerField(default=0)
+  net_tx = models.PositiveBigIntegerField(default=0)
+  block_read = models.PositiveBigIntegerField(default=0)
+  block_write = models.PositiveBigIntegerField(default=0)
+  pids = models.PositiveIntegerField(default=0)
+
+  class Meta:
+      ordering = ['sampled_at', 'id']
+      indexes = [
+          models.Index(fields=['sampled_at'], name='paas_usage_sampled_idx'),
+          models.Index(fields=['provision', 'sampled_at'], name='paas_usage_prov_sampled_idx'),
+          models.Index(fields=['host', 'sampled_at'], name='paas_usage_host_sampled_idx'),
+      ]
+      verbose_name = "Container Usage Sample"
+      verbose_name_plural = "Container Usage Samples"
+
+  def __str__(self):
+      return f"{self.provision_id} @ {self.sampled_at:%Y-%m-%d %H:%M}: {self.cpu:.1f}% CPU"
+
+
 '''
 > 1. **max_concurrent_apps** – verhindert, dass ein User zu viele Apps gleichzeitig laufen hat.  
 > 2. **max_total_hours_per_day** – verhindert, dass ein User die Systemkapazität überstrapaziert.  
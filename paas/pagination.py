@@ -0,0 +1,75 @@
+"""
+Keyset-Pagination („Seek-Methode“) für Listen, die nach
+``(started_at, id)`` absteigend sortiert sind.
+
+Statt ``OFFSET n`` (die DB muss n Zeilen lesen und verwerfen) merkt sich der
+Cursor den Schlüssel der letzten Zeile; die nächste Seite beginnt per
+``WHERE (started_at, id) < (…)`` direkt an der richtigen Stelle im Index.
+Der Cursor ist ein URL-sicherer Base64-String und für den Client opak.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+@dataclass(frozen=True)
+class Page:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj) -> str:
+    raw = json.dumps([obj.started_at.isoformat(), obj.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    """Gibt ``(started_at, id)`` zurück oder ``None`` bei fehlendem/ungültigem Cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        started_at, pk = json.loads(raw)
+        started_at = parse_datetime(started_at)
+        if started_at is None:
+            return None
+        return started_at, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def _seek(queryset, cursor: str | None):
+    queryset = queryset.order_by("-started_at", "-id")
+    key = decode_cursor(cursor)
+    if key is not None:
+        started_at, pk = key
+        queryset = queryset.filter(
+            Q(started_at__lt=started_at) | Q(started_at=started_at, id__lt=pk)
+        )
+    return queryset
+
+
+def _page(rows: list, page_size: int) -> Page:
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return Page(rows, encode_cursor(rows[-1]))
+    return Page(rows, None)
+
+
+def keyset_page(queryset, cursor: str | None, page_size: int) -> Page:
+    """Eine Seite laden (eine Query, ``page_size + 1`` Zeilen)."""
+    return _page(list(_seek(queryset, cursor)[:page_size + 1]), page_size)
+
+
+async def akeyset_page(queryset, cursor: str | None, page_size: int) -> Page:
+    """Async-Variante von :func:`keyset_page`."""
+    rows = [obj async for obj in _seek(queryset, cursor)[:page_size + 1]]
+    return _page(rows, page_size)
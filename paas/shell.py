@@ -0,0 +1,301 @@
+"""
+Langlebige Shell-Sitzungen für Remote-Kommandos.
+
+Bisher startete jedes ``_run_cmd`` einen eigenen Prozess: lokal ein neues
+``/bin/sh`` per ``subprocess.run(shell=True)``, über SSH einen neuen Kanal mit
+eigener Login-Shell auf dem Host. Ein Deploy schickt Dutzende kleiner
+Kommandos – jedes zahlt Prozessstart bzw. Kanalaufbau.
+
+Eine :class:`ShellSession` hält stattdessen *eine* ``/bin/sh`` pro Verbindung
+offen und schreibt die Kommandos nacheinander auf deren stdin. Jedes
+Kommando läuft in einer eigenen Shell mit eigener Prozessgruppe (``exit`` oder
+``cd`` beenden/verändern die Sitzung nicht). Die Sitzung meldet zuerst deren
+PID und schließt mit einer Sentinel-Zeile auf stdout *und* stderr ab; die
+stdout-Zeile trägt den Exit-Code:
+
+    setsid /bin/sh -c '<kommando>' </dev/null &
+    printf '\\n%s %d\\n' __privycloud_<token>_<n>___pid $!
+    wait $!
+    printf '\\n%s %d\\n' __privycloud_<token>_<n>__ $?
+    printf '\\n%s\\n' __privycloud_<token>_<n>__ >&2
+
+Läuft ein Kommando länger als sein Timeout, beendet die Sitzung seine
+Prozessgruppe auf dem Host (:meth:`ShellSession._kill`), schließt sich und
+wirft :class:`ShellTimeout` – das nächste Kommando öffnet eine neue. Ein
+``timeout -k`` um jedes Kommando (zwei Prozesse mehr) ist damit nicht nötig.
+Lässt sich das Kommando nicht beenden, hängt die Verbindung: :class:`ShellError`.
+
+Die Transports in ``paas.transport`` nutzen :class:`RemoteShell` (ein Kanal
+der Paramiko-Verbindung) bzw. :class:`ProcessShell` (lokales ``/bin/sh`` oder
+``ssh … /bin/sh`` über einen OpenSSH-ControlMaster).
+"""
+
+import logging
+import os
+import secrets
+import select
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import paramiko
+
+from .ssh_pool import CONNECT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+
+
+class ShellError(RuntimeError):
+    """Die Shell-Sitzung ist beendet oder nicht nutzbar."""
+
+
+class ShellTimeout(ShellError, TimeoutError):
+    """Ein Kommando hat sein Timeout überschritten (auf dem Host beendet, Sitzung geschlossen)."""
+
+
+class ShellSession(ABC):
+    """
+    Basisklasse: Framing, Exit-Codes und Timeouts. Unterklassen liefern
+    :meth:`_write`, :meth:`_read`, :meth:`_kill` und :meth:`_close`.
+    """
+
+    def __init__(self, default_timeout: float | None = None):
+        self.default_timeout = default_timeout
+        self.closed = False
+        self._token = secrets.token_hex(8)
+        self._seq = 0
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    # ---- Transport (Unterklassen) -----------------------------------------
+    @abstractmethod
+    def _write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _read(self, timeout: float | None) -> tuple[bytes, bytes, bool]:
+        """Verfügbare Daten ``(stdout, stderr, eof)``; wartet höchstens ``timeout``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _kill(self, pid: int) -> None:
+        """Prozessgruppe ``pid`` auf dem Host beenden; wirft, wenn der Host nicht antwortet."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _close(self) -> None:
+        raise NotImplementedError
+
+    # ---- API --------------------------------------------------------------
+    def run(self, cmd: str, timeout: float | None = None) -> tuple[int, str, str]:
+        """Führt ``cmd`` aus → ``(exit_code, stdout, stderr)`` (beide ``strip()``-t)."""
+        with self._lock:
+            if self.closed:
+                raise ShellError("Shell-Sitzung ist geschlossen")
+            self._seq += 1
+            self._pid = None
+            marker = f"__privycloud_{self._token}_{self._seq}__"
+            try:
+                self._write(self._frame(cmd, marker).encode())
+                return self._collect(marker, timeout if timeout is not None else self.default_timeout)
+            except ShellTimeout:
+                self._stop_running()
+                raise
+            except ShellError:
+                self.close()
+                raise
+            except (OSError, paramiko.SSHException) as exc:
+                self.close()
+                raise ShellError(f"Shell-Sitzung abgebrochen: {exc}") from exc
+
+    def _stop_running(self) -> None:
+        """Nach einem Timeout: Kommando auf dem Host beenden, Sitzung schließen."""
+        pid = self._pid
+        try:
+            if pid is None:
+                raise ShellError("keine PID gemeldet")
+            self._kill(pid)
+        except Exception as exc:
+            self.close()
+            raise ShellError(f"Kommando nach Timeout nicht beendbar – Verbindung hängt ({exc})") from exc
+        self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._close()
+        except Exception as exc:
+            logger.debug("Shell-Sitzung nicht sauber geschlossen: %s", exc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ---- Framing ----------------------------------------------------------
+    @staticmethod
+    def _frame(cmd: str, marker: str) -> str:
+        # setsid: eigene Prozessgruppe, die _kill samt Kindprozessen beenden kann
+        return (
+            f"setsid /bin/sh -c {shlex.quote(cmd)} </dev/null &\n"
+            f"printf '\\n%s %d\\n' {marker}_pid $!\n"
+            f"wait $!\n"
+            f"printf '\\n%s %d\\n' {marker} $?\n"
+            f"printf '\\n%s\\n' {marker} >&2\n"
+        )
+
+    def _collect(self, marker: str, timeout: float | None) -> tuple[int, str, str]:
+        out, err = bytearray(), bytearray()
+        out_tag = f"\n{marker} ".encode()
+        err_tag = f"\n{marker}\n".encode()
+        pid_tag = f"\n{marker}_pid ".encode()
+        deadline = time.monotonic() + timeout if timeout else None
+        exit_code = stdout = stderr = None
+
+        while exit_code is None or stderr is None:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ShellTimeout(f"Kommando nach {timeout:g}s abgebrochen")
+            chunk_out, chunk_err, eof = self._read(remaining)
+            out += chunk_out
+            err += chunk_err
+
+            # PID-Zeile kann mitten in der Ausgabe stehen – herausschneiden
+            if self._pid is None and (pos := out.find(pid_tag)) >= 0:
+                end = out.find(b"\n", pos + len(pid_tag))
+                if end >= 0:
+                    self._pid = int(out[pos + len(pid_tag):end])
+                    del out[pos:end + 1]
+            if exit_code is None and (pos := out.find(out_tag)) >= 0:
+                end = out.find(b"\n", pos + len(out_tag))
+                if end >= 0:
+                    exit_code = int(out[pos + len(out_tag):end])
+                    stdout = bytes(out[:pos])
+            if stderr is None and (pos := err.find(err_tag)) >= 0:
+                stderr = bytes(err[:pos])
+            if eof and (exit_code is None or stderr is None):
+                raise ShellError("Shell-Sitzung unerwartet beendet")
+
+        return (
+            exit_code,
+            stdout.decode(errors="replace").strip(),
+            stderr.decode(errors="replace").strip(),
+        )
+
+    def _handshake(self) -> None:
+        """Erstes Kommando verwirft eventuelle Ausgaben beim Shell-Start."""
+        exit_code, _, _ = self.run("true", timeout=CONNECT_TIMEOUT)
+        if exit_code != 0:
+            raise ShellError("Shell-Sitzung antwortet nicht")
+
+
+class ProcessShell(ShellSession):
+    """Sitzung über stdin/stdout/stderr eines Prozesses (``/bin/sh`` oder ``ssh … /bin/sh``)."""
+
+    def __init__(self, argv=("/bin/sh",), default_timeout: float | None = None, kill_argv=None):
+        """
+        ``kill_argv(cmd)`` liefert das argv, das ``cmd`` auf dem Host ausführt
+        (``ssh … -- cmd``); ohne läuft die Shell lokal und :meth:`_kill` nutzt ``os.killpg``.
+        """
+        super().__init__(default_timeout)
+        self._kill_argv = kill_argv
+        self._proc = subprocess.Popen(
+            list(argv), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            bufsize=0, start_new_session=True,
+        )
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._proc.stdout, selectors.EVENT_READ, "out")
+        self._selector.register(self._proc.stderr, selectors.EVENT_READ, "err")
+        self._handshake()
+
+    def _write(self, data: bytes) -> None:
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+
+    def _read(self, timeout):
+        out = err = b""
+        eof = False
+        for key, _ in self._selector.select(timeout):
+            data = os.read(key.fileobj.fileno(), READ_SIZE)
+            if not data:
+                eof = True
+                self._selector.unregister(key.fileobj)
+            elif key.data == "out":
+                out += data
+            else:
+                err += data
+        return out, err, eof or not self._selector.get_map()
+
+    def _kill(self, pid: int) -> None:
+        if self._kill_argv is None:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            return
+        res = subprocess.run(
+            self._kill_argv(f"kill -KILL -{pid}"), stdin=subprocess.DEVNULL,
+            capture_output=True, timeout=CONNECT_TIMEOUT, start_new_session=True,
+        )
+        # 255 = ssh selbst gescheitert; "kill" ohne Prozess (schon beendet) ist in Ordnung
+        if res.returncode == 255:
+            raise ShellError(res.stderr.decode(errors="replace").strip() or "ssh fehlgeschlagen")
+
+    def _close(self) -> None:
+        self._selector.close()
+        try:
+            # Ganze Prozessgruppe – auch ein noch laufendes Kommando
+            os.killpg(self._proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._proc.wait(timeout=5)
+        for stream in (self._proc.stdin, self._proc.stdout, self._proc.stderr):
+            stream.close()
+
+
+class RemoteShell(ShellSession):
+    """Sitzung mit einem ``/bin/sh`` in *einem* SSH-Kanal."""
+
+    def __init__(self, client: paramiko.SSHClient, default_timeout: float | None = None):
+        super().__init__(default_timeout)
+        self._client = client
+        self._channel = client.get_transport().open_session(timeout=CONNECT_TIMEOUT)
+        self._channel.exec_command("/bin/sh")
+        self._handshake()
+
+    def _write(self, data: bytes) -> None:
+        self._channel.sendall(data)
+
+    def _read(self, timeout):
+        channel = self._channel
+        if not (channel.recv_ready() or channel.recv_stderr_ready()):
+            select.select([channel], [], [], timeout)
+        out = channel.recv(READ_SIZE) if channel.recv_ready() else b""
+        err = channel.recv_stderr(READ_SIZE) if channel.recv_stderr_ready() else b""
+        eof = not out and not err and (channel.eof_received or channel.closed)
+        return out, err, eof
+
+    def _kill(self, pid: int) -> None:
+        # eigener Kanal derselben Verbindung – der Sitzungskanal wartet noch auf das Kommando
+        channel = self._client.get_transport().open_session(timeout=CONNECT_TIMEOUT)
+        try:
+            channel.exec_command(f"kill -KILL -{pid}")
+            if not channel.status_event.wait(CONNECT_TIMEOUT):
+                raise ShellError(f"kill ohne Antwort nach {CONNECT_TIMEOUT}s")
+        finally:
+            channel.close()
+
+    def _close(self) -> None:
+        self._channel.close()
@@ -22,4 +22,58 @@ def schedule_auto_delete(sender, instance: ProvisionedApp, created: bool, **kwar
       delta = (instance.expires_at - now).total_seconds()
       delete_container_by_id.apply_async(args=[instance.id], countdown=delta)
       logger.info(f"[auto-delete] {instance} geplant in {delta:.0f}s.")
-'''
\ No newline at end of file
+'''
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AppDefinition, AppEnvVarPerApp, AppVolumePerApp, ConfigPatch, RemoteHost
+from .specs import invalidate_specs
+from .catalog import HOST_VOLATILE_FIELDS, invalidate_catalog
+from .metrics import query_counter
+
+
+# ----------------------------------------------------------------------
+# Deployment-Specs (paas/specs.py) der geänderten App verwerfen
+# ----------------------------------------------------------------------
+@receiver(post_save, sender=AppDefinition)
+@receiver(post_delete, sender=AppDefinition)
+def invalidate_app_spec(sender, instance, **kwargs):
+  # Name kann sich geändert haben → auch die Zuordnung Name → ID
+  transaction.on_commit(lambda: invalidate_specs(instance.pk))
+
+
+@receiver(post_save, sender=AppEnvVarPerApp)
+@receiver(post_delete, sender=AppEnvVarPerApp)
+@receiver(post_save, sender=AppVolumePerApp)
+@receiver(post_delete, sender=AppVolumePerApp)
+@receiver(post_save, sender=ConfigPatch)
+@receiver(post_delete, sender=ConfigPatch)
+def invalidate_related_spec(sender, instance, **kwargs):
+  app_id = instance.app_id
+  if app_id is None:
+      return
+  transaction.on_commit(lambda: invalidate_specs(app_id, names=False))
+
+
+# ----------------------------------------------------------------------
+# Katalog (paas/catalog.py) + Template-Fragmente bei Änderungen verwerfen
+# ----------------------------------------------------------------------
+@receiver(post_save, sender=AppDefinition)
+@receiver(post_delete, sender=AppDefinition)
+@receiver(post_save, sender=RemoteHost)
+@receiver(post_delete, sender=RemoteHost)
+def invalidate_catalog_cache(sender, update_fields=None, **kwargs):
+  # Last-Updates (update_remote_loads) ändern nichts am Katalog
+  if update_fields and set(update_fields) <= HOST_VOLATILE_FIELDS:
+      return
+  transaction.on_commit(invalidate_catalog)
+
+
+# ----------------------------------------------------------------------
+# DB-Queries pro Request zählen (paas/metrics.py)
+# ----------------------------------------------------------------------
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+  if query_counter not in connection.execute_wrappers:
+      connection.execute_wrappers.append(query_counter)
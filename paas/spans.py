@@ -0,0 +1,194 @@
+"""
+Zeitmessung der Deploy- und Teardown-Abschnitte.
+
+:class:`SpanRecorder` misst jeden Abschnitt, puffert die Ergebnisse wie
+:class:`~paas.events.EventLog` und schreibt sie per ``bulk_create`` als
+:class:`~paas.models.ProvisionSpan`. Jede Messung geht zusätzlich in das
+Prometheus-Histogramm ``privycloud_stage_duration_seconds``.
+
+    spans = SpanRecorder(provision, "deploy")
+    with spans.stage("docker_run"):
+        ...
+    spans.flush()
+
+Mit ``budgets`` erhält jeder Abschnitt zusätzlich ein Zeitbudget
+(:func:`paas.deadlines.budget`); :attr:`SpanRecorder.started` hält fest, welche
+Abschnitte begonnen wurden – danach richtet sich das Aufräumen nach einem Abbruch.
+Mit ``events`` (:class:`~paas.events.EventLog`) erhält jeder abgeschlossene
+Abschnitt einen Eintrag, und Ereignisse wie Spans werden an jeder
+Abschnittsgrenze geschrieben – ``provision_progress`` zeigt den Fortschritt
+also schon während des Deploys.
+
+:func:`stage_summary` verdichtet die Spans für den Admin zu p50/p95 pro App
+bzw. Host und Abschnitt.
+"""
+
+import contextlib
+import logging
+import time
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import Aggregate, Count, FloatField, Max
+from django.utils import timezone
+
+from config.registry import registry
+from .deadlines import budget
+from .metrics import STAGE_DURATION
+from .models import ProvisionSpan
+
+logger = logging.getLogger(__name__)
+
+# Fallback-Werte, überschreibbar per PlatformSetting
+DEFAULT_RETENTION_DAYS = 90
+# Zeitraum der Admin-Auswertung
+SUMMARY_DAYS = 30
+# Abschnitt über die gesamte Operation (wird bei „langsamster Abschnitt“ ignoriert)
+TOTAL = "total"
+
+
+class SpanRecorder:
+    """Puffer für die Spans *einer* Operation einer Bereitstellung."""
+
+    def __init__(self, provision, operation: str, budgets: dict[str, float] | None = None,
+                 events=None):
+        self.provision_id = provision.pk
+        self.app_id = provision.app_id
+        self.host_id = provision.host_id
+        self.operation = operation
+        self.budgets = budgets or {}
+        self.events = events
+        self.started: list[str] = []
+        self._buffer: list[ProvisionSpan] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Misst den ``with``-Block (im Zeitbudget ``budgets[name]``, falls gesetzt);
+        eine Exception markiert den Span als fehlgeschlagen.
+        """
+        self.started.append(name)
+        started_at = timezone.now()
+        start = time.perf_counter()
+        ok = False
+        try:
+            with budget(self.budgets.get(name), f"{self.operation}:{name}"):
+                yield
+            ok = True
+        finally:
+            duration = time.perf_counter() - start
+            self.record(name, duration, ok, started_at)
+            if self.events is not None:
+                # Abschnittsgrenze: Fortschritt sofort sichtbar machen
+                if ok and name != TOTAL:
+                    self.events.add(f"Abschnitt {name} abgeschlossen", stage=name, duration=duration)
+                self.events.flush()
+                self.flush()
+
+    def record(self, name: str, duration: float, ok: bool = True, started_at=None) -> None:
+        STAGE_DURATION.labels(self.operation, name, "ok" if ok else "error").observe(duration)
+        self._buffer.append(ProvisionSpan(
+            provision_id=self.provision_id,
+            app_id=self.app_id,
+            host_id=self.host_id,
+            operation=self.operation,
+            stage=name[:32],
+            started_at=started_at or timezone.now(),
+            duration=duration,
+            ok=ok,
+        ))
+
+    def flush(self) -> None:
+        """Gepufferte Spans mit einem INSERT schreiben (Fehler nur loggen)."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            ProvisionSpan.objects.bulk_create(batch)
+        except Exception as exc:
+            # Messwerte dürfen keinen Deploy/Teardown scheitern lassen
+            logger.warning("Spans für Provision %s nicht gespeichert: %s", self.provision_id, exc)
+
+
+# ----------------------------------------------------------------------
+# Auswertung
+# ----------------------------------------------------------------------
+class Percentile(Aggregate):
+    """``percentile_cont`` (nur PostgreSQL)."""
+    function = "percentile_cont"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Lineare Interpolation wie ``percentile_cont``."""
+    pos = (len(sorted_values) - 1) * fraction
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def stage_summary(group_by: str, days: int = SUMMARY_DAYS) -> list[dict]:
+    """
+    p50/p95/max pro Gruppe (``"app"`` oder ``"host"``), Operation und Abschnitt
+    der letzten ``days`` Tage. Pro Gruppe und Operation ist der Abschnitt mit
+    dem höchsten p95 (ohne ``total``) als ``slowest`` markiert.
+    """
+    label = {"app": "app__display_name", "host": "host__hostname"}[group_by]
+    qs = (
+        ProvisionSpan.objects
+        .filter(started_at__gte=timezone.now() - timedelta(days=days), ok=True)
+        .order_by()
+    )
+    keys = (label, "operation", "stage")
+
+    if connections[qs.db].vendor == "postgresql":
+        rows = list(qs.values(*keys).annotate(
+            count=Count("id"),
+            p50=Percentile("duration", 0.5),
+            p95=Percentile("duration", 0.95),
+            max=Max("duration"),
+        ))
+    else:
+        grouped: dict[tuple, list[float]] = {}
+        for *key, duration in qs.values_list(*keys, "duration").iterator():
+            grouped.setdefault(tuple(key), []).append(duration)
+        rows = []
+        for key, values in grouped.items():
+            values.sort()
+            rows.append({
+                **dict(zip(keys, key)),
+                "count": len(values),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+            })
+
+    slowest: dict[tuple, dict] = {}
+    for row in rows:
+        row["group"] = row.pop(label) or "–"
+        row["slowest"] = False
+        if row["stage"] != TOTAL:
+            current = slowest.get((row["group"], row["operation"]))
+            if current is None or row["p95"] > current["p95"]:
+                slowest[(row["group"], row["operation"])] = row
+    for row in slowest.values():
+        row["slowest"] = True
+
+    # total zuerst, danach nach p95 absteigend
+    rows.sort(key=lambda r: (r["group"], r["operation"], r["stage"] != TOTAL, -r["p95"]))
+    return rows
+
+
+def prune_spans(now=None) -> int:
+    """Spans älter als ``provision_spans_retention_days`` löschen."""
+    now = now or timezone.now()
+    retention_days = registry.get_int("provision_spans_retention_days", DEFAULT_RETENTION_DAYS)
+    deleted, _ = ProvisionSpan.objects.filter(
+        started_at__lt=now - timedelta(days=retention_days)
+    ).delete()
+    logger.info("ProvisionSpans bereinigt: %d", deleted)
+    return deleted
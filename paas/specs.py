@@ -0,0 +1,273 @@
+"""
+Vorkompilierte Deployment-Spezifikation pro :class:`~paas.models.AppDefinition`.
+
+Ein Deploy braucht Env-Defaults, editierbare/erforderliche Variablen,
+Volumes, Config-Patches und die Port-Flags einer App. Statt diese bei jedem
+Request/Task erneut aus fünf Tabellen zu lesen, wird pro App einmalig ein
+unveränderliches :class:`DeploymentSpec` gebaut und im gemeinsamen Cache
+abgelegt.
+
+* Versionierung pro App: Eine Änderung an ``AppDefinition``,
+  ``AppEnvVarPerApp``, ``AppVolumePerApp`` oder ``ConfigPatch`` erhöht nur
+  ``deploy_spec:<app_id>:version`` der betroffenen App (siehe
+  ``paas/signals.py``) – die Specs aller anderen Apps bleiben gültig. Die
+  Zuordnung Name → ID hat eine eigene Version, die nur Änderungen an
+  ``AppDefinition`` erhöhen.
+* ``content_hash`` identifiziert den Inhalt einer Spec eindeutig (z.B. fürs Log).
+* Prozess-lokal werden die Specs zusätzlich gehalten; die Version einer App
+  wird höchstens alle :data:`LOCAL_TTL` Sekunden in Redis nachgesehen (wie bei
+  ``config.registry``) – in dieser Zeit kostet ``get_spec`` weder Redis noch DB.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, fields
+
+import redis
+from django.core.cache import cache
+
+from config.cache import get_or_compute, incr
+from .models import AppDefinition
+
+logger = logging.getLogger(__name__)
+
+SPEC_VERSION_KEY = "deploy_spec:{app_id}:version"
+SPEC_KEY = "deploy_spec:{app_id}:{version}"
+SPEC_NAMES_VERSION_KEY = "deploy_spec:names:version"
+SPEC_NAMES_KEY = "deploy_spec:names:{version}"
+SPEC_TIMEOUT = 60 * 60 * 24
+# Sekunden, die ein Prozess seine Specs ohne Blick auf die Versionen nutzt
+LOCAL_TTL = 5
+
+# Port-Wert 1 bedeutet in AppDefinition „nicht vorhanden“
+PORT_UNUSED = 1
+
+
+@dataclass(frozen=True)
+class EnvVarSpec:
+    key: str
+    value: str
+    optional: bool
+    editable: bool
+
+
+@dataclass(frozen=True)
+class VolumeSpec:
+    host_path: str
+    container_path: str
+
+
+@dataclass(frozen=True)
+class PatchSpec:
+    target_file: str
+    pattern: str
+    action: str
+    replacement: str | None
+
+
+@dataclass(frozen=True)
+class DeploymentSpec:
+    """Unveränderliche Momentaufnahme aller Deploy-Daten einer App."""
+    app_id: int
+    name: str
+    display_name: str
+    docker_image: str
+    description: str
+    use_deploy_user: bool
+    app_port_intern_web: int
+    app_port_intern_api: int
+    hiddenservice_port_web: int
+    hiddenservice_port_api: int
+    env_vars: tuple[EnvVarSpec, ...] = ()
+    volumes: tuple[VolumeSpec, ...] = ()
+    # (target_file, (PatchSpec, …)) – Reihenfolge der Patches bleibt erhalten
+    patches_by_file: tuple[tuple[str, tuple[PatchSpec, ...]], ...] = ()
+
+    # abgeleitete Felder – werden in __post_init__ berechnet
+    defined_keys: frozenset = field(init=False, repr=False, compare=False)
+    required_keys: frozenset = field(init=False, repr=False, compare=False)
+    content_hash: str = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "defined_keys", frozenset(e.key for e in self.env_vars))
+        object.__setattr__(
+            self, "required_keys", frozenset(e.key for e in self.env_vars if not e.optional)
+        )
+        payload = {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        object.__setattr__(self, "content_hash", digest)
+
+    # ------------------------------------------------------------------
+    # Komfort-Zugriffe
+    # ------------------------------------------------------------------
+    @property
+    def env_defaults(self) -> dict[str, str]:
+        return {e.key: e.value for e in self.env_vars}
+
+    @property
+    def editable_env_vars(self) -> tuple[EnvVarSpec, ...]:
+        return tuple(e for e in self.env_vars if e.editable)
+
+    @property
+    def non_editable_env_vars(self) -> tuple[EnvVarSpec, ...]:
+        return tuple(e for e in self.env_vars if not e.editable)
+
+    @property
+    def has_web_port(self) -> bool:
+        return self.app_port_intern_web != PORT_UNUSED
+
+    @property
+    def has_api_port(self) -> bool:
+        return self.app_port_intern_api != PORT_UNUSED
+
+    def __str__(self):
+        return self.display_name
+
+
+# ----------------------------------------------------------------------
+# Aufbau aus der Datenbank
+# ----------------------------------------------------------------------
+def build_spec(app_def: AppDefinition) -> DeploymentSpec:
+    """Baut die Spec aus der DB (ein Prefetch pro Relation)."""
+    env_vars = tuple(
+        EnvVarSpec(e.key, e.value, e.optional, e.editable)
+        for e in sorted(app_def.env_vars.all(), key=lambda e: e.pk)
+    )
+    volumes = tuple(
+        VolumeSpec(v.host_path, v.container_path)
+        for v in sorted(app_def.volumes.all(), key=lambda v: v.pk)
+    )
+
+    grouped: dict[str, list[PatchSpec]] = {}
+    for p in sorted(app_def.config_patches.all(), key=lambda p: p.pk):
+        grouped.setdefault(p.target_file, []).append(
+            PatchSpec(p.target_file, p.pattern, p.action, p.replacement)
+        )
+
+    return DeploymentSpec(
+        app_id=app_def.pk,
+        name=app_def.name,
+        display_name=app_def.display_name,
+        docker_image=app_def.docker_image,
+        description=app_def.description,
+        use_deploy_user=app_def.use_deploy_user,
+        app_port_intern_web=app_def.app_port_intern_web,
+        app_port_intern_api=app_def.app_port_intern_api,
+        hiddenservice_port_web=app_def.hiddenservice_port_web,
+        hiddenservice_port_api=app_def.hiddenservice_port_api,
+        env_vars=env_vars,
+        volumes=volumes,
+        patches_by_file=tuple((f, tuple(ps)) for f, ps in grouped.items()),
+    )
+
+
+def _load_spec(app_id: int) -> DeploymentSpec | None:
+    app_def = (
+        AppDefinition.objects
+        .prefetch_related("env_vars", "volumes", "config_patches")
+        .filter(pk=app_id)
+        .first()
+    )
+    return build_spec(app_def) if app_def else None
+
+
+def _load_names() -> dict[str, int]:
+    return dict(AppDefinition.objects.values_list("name", "pk"))
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+class _SpecCache:
+    """Prozess-lokale Specs mit ihrer Version und dem Zeitpunkt der letzten Prüfung."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # app_id → (Version, Spec, geprüft um)
+        self.specs: dict[int, tuple] = {}
+        self.names: tuple | None = None
+
+    @staticmethod
+    def _version(key: str, known):
+        try:
+            version = cache.get(key)
+            if version is None:
+                cache.add(key, 1, None)
+                version = cache.get(key, 1)
+        except redis.RedisError as exc:
+            logger.warning("Spec-Version nicht lesbar (%s)", exc)
+            return known
+        return version
+
+    def get(self, app_id: int) -> DeploymentSpec | None:
+        now = time.monotonic()
+        entry = self.specs.get(app_id)
+        if entry is not None and now - entry[2] < LOCAL_TTL:
+            return entry[1]
+        version = self._version(SPEC_VERSION_KEY.format(app_id=app_id), entry and entry[0])
+        if entry is not None and version is not None and entry[0] == version:
+            spec = entry[1]
+        else:
+            spec = get_or_compute(
+                SPEC_KEY.format(app_id=app_id, version=version),
+                lambda: _load_spec(app_id),
+                SPEC_TIMEOUT,
+            )
+        with self._lock:
+            self.specs[app_id] = (version, spec, now)
+        return spec
+
+    def id_for_name(self, name: str) -> int | None:
+        now = time.monotonic()
+        entry = self.names
+        if entry is None or now - entry[2] >= LOCAL_TTL:
+            version = self._version(SPEC_NAMES_VERSION_KEY, entry and entry[0])
+            if entry is None or version is None or entry[0] != version:
+                names = get_or_compute(SPEC_NAMES_KEY.format(version=version), _load_names, SPEC_TIMEOUT)
+            else:
+                names = entry[1]
+            entry = self.names = (version, names, now)
+        return entry[1].get(name)
+
+
+_specs = _SpecCache()
+
+
+def get_spec(app_id: int) -> DeploymentSpec | None:
+    """Spec einer App per ID (``None``, falls die App nicht existiert)."""
+    if app_id is None:
+        return None
+    return _specs.get(int(app_id))
+
+
+def get_spec_by_name(name: str) -> DeploymentSpec | None:
+    """Spec einer App per ``AppDefinition.name``."""
+    app_id = _specs.id_for_name(name) if name else None
+    return get_spec(app_id) if app_id is not None else None
+
+
+def invalidate_specs(app_id: int | None = None, names: bool = True) -> None:
+    """
+    Spec einer App verwerfen (neue Version in Redis + lokal), mit ``names``
+    auch die Zuordnung Name → ID. Ohne ``app_id``: alle Specs, die dieser
+    Prozess kennt (z.B. nach einer Benchmark-Datenbank).
+    """
+    with _specs._lock:
+        app_ids = [app_id] if app_id is not None else list(_specs.specs)
+        for pk in app_ids:
+            _specs.specs.pop(pk, None)
+        if names:
+            _specs.names = None
+    keys = [SPEC_VERSION_KEY.format(app_id=pk) for pk in app_ids]
+    if names:
+        keys.append(SPEC_NAMES_VERSION_KEY)
+    for key in keys:
+        try:
+            incr(key)
+        except redis.RedisError as exc:
+            logger.warning("Spec-Version konnte nicht erhöht werden (%s)", exc)
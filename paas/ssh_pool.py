@@ -0,0 +1,149 @@
+"""
+Langlebige Paramiko-Verbindungen pro RemoteHost.
+
+Kurzlebige Operationen (Deploy, Löschen) öffnen weiterhin eine eigene
+Verbindung über ``paas.tasks._ssh_client``. Für lang laufende Kanäle – z.B.
+``docker logs -f`` für das Log-Streaming – wäre ein Handshake pro Zuschauer
+zu teuer; hier wird pro Host *eine* Transport-Verbindung gehalten und für
+jeden Stream nur ein neuer Kanal (``open_session``) geöffnet.
+
+Der Verbindungsaufbau (bis ``CONNECT_TIMEOUT``) läuft außerhalb des
+Pool-Locks unter einem Lock pro Host: ein hängender Host blockiert die
+Streams zu anderen Hosts nicht, und pro Host verbindet nur ein Thread.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+
+import paramiko
+
+from .metrics import SSH_CONNECT
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 15
+KEEPALIVE_INTERVAL = 30
+IDLE_TIMEOUT = 300
+
+
+def open_ssh_client(host, timeout: int = CONNECT_TIMEOUT) -> paramiko.SSHClient:
+    """Neue Paramiko-Verbindung zu ``host`` aufbauen."""
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        ssh.connect(
+            hostname=host.hostname,
+            username=host.ssh_user,
+            key_filename=str(Path(host.ssh_key_path).expanduser()),
+            timeout=timeout,
+        )
+        outcome = "ok"
+    finally:
+        SSH_CONNECT.labels(host.hostname, outcome).observe(time.perf_counter() - started)
+    # Label für SSH_COMMAND in paas.tasks._run_cmd
+    ssh.metrics_host = host.hostname
+    return ssh
+
+
+class SSHPool:
+    """Thread-sicherer Pool mit einer Verbindung pro Host."""
+
+    def __init__(self, idle_timeout: int = IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._connect_locks: dict[int, threading.Lock] = {}
+        self._clients: dict[int, paramiko.SSHClient] = {}
+        self._last_used: dict[int, float] = {}
+        self._open_channels: dict[int, int] = {}
+
+    def _live_client(self, host_id: int) -> paramiko.SSHClient | None:
+        """Aktive Verbindung aus dem Pool; tote werden verworfen (Lock gehalten)."""
+        client = self._clients.get(host_id)
+        if client is None:
+            return None
+        transport = client.get_transport()
+        if transport is not None and transport.is_active():
+            return client
+        client.close()
+        del self._clients[host_id]
+        return None
+
+    def _claim(self, host_id: int) -> None:
+        """Einen Kanal auf der Verbindung anmelden (Lock gehalten)."""
+        self._last_used[host_id] = time.monotonic()
+        self._open_channels[host_id] = self._open_channels.get(host_id, 0) + 1
+
+    def _acquire(self, host) -> paramiko.SSHClient:
+        """Verbindung aus dem Pool holen bzw. neu aufbauen und einen Kanal darauf anmelden."""
+        with self._lock:
+            self._evict_idle()
+            client = self._live_client(host.pk)
+            if client is not None:
+                self._claim(host.pk)
+                return client
+            connect_lock = self._connect_locks.setdefault(host.pk, threading.Lock())
+
+        with connect_lock:
+            # Ein anderer Thread hat inzwischen verbunden?
+            with self._lock:
+                client = self._live_client(host.pk)
+                if client is not None:
+                    self._claim(host.pk)
+                    return client
+            client = open_ssh_client(host)
+            client.get_transport().set_keepalive(KEEPALIVE_INTERVAL)
+            with self._lock:
+                self._clients[host.pk] = client
+                self._claim(host.pk)
+        logger.debug("SSHPool: neue Verbindung zu %s", host.hostname)
+        return client
+
+    def _evict_idle(self) -> None:
+        """Verbindungen ohne offene Kanäle und ohne Nutzung seit ``idle_timeout`` schließen."""
+        now = time.monotonic()
+        for host_id, client in list(self._clients.items()):
+            idle = now - self._last_used.get(host_id, 0.0) > self.idle_timeout
+            if idle and not self._open_channels.get(host_id):
+                client.close()
+                del self._clients[host_id]
+
+    def open_channel(self, host, cmd: str, timeout: float | None = None) -> paramiko.Channel:
+        """
+        Öffnet einen neuen Kanal auf der gepoolten Verbindung und startet ``cmd``.
+        stdout und stderr werden zusammengeführt. Der Kanal muss mit
+        :meth:`close_channel` wieder freigegeben werden.
+        """
+        client = self._acquire(host)
+        try:
+            channel = client.get_transport().open_session(timeout=timeout)
+            channel.set_combine_stderr(True)
+            channel.exec_command(cmd)
+        except Exception:
+            self._release(host.pk)
+            raise
+        return channel
+
+    def close_channel(self, host, channel: paramiko.Channel) -> None:
+        try:
+            channel.close()
+        finally:
+            self._release(host.pk)
+
+    def _release(self, host_id: int) -> None:
+        with self._lock:
+            self._open_channels[host_id] = max(0, self._open_channels.get(host_id, 1) - 1)
+            self._last_used[host_id] = time.monotonic()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._open_channels.clear()
+
+
+pool = SSHPool()
@@ -12,11 +12,13 @@ from abc import ABC, abstractmethod
 from typing import Iterable, List
 
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.db import models
 from django.http import HttpRequest
 
+from config.cache import incr as cache_incr
+
 # Make sure the import path is correct for your RemoteHost model
+from .health import get_health
 from .models import RemoteHost
 
 log = logging.getLogger(__name__)
@@ -24,12 +26,28 @@ log = logging.getLogger(__name__)
 
 def _allowed_hosts(hosts: Iterable[RemoteHost]) -> List[RemoteHost]:
     """
-    Gibt nur Hosts zurück, die *nicht* mit `nur_superuser=True` gekennzeichnet sind.
+    Gibt nur Hosts zurück, die *nicht* mit `nur_superuser=True` gekennzeichnet sind
+    und laut ``paas.health`` verfügbar sind (Breaker geschlossen – ein
+    Redis-Roundtrip). Hat der Agent eines Hosts frisch berichtet, wird
+    ``current_load`` der Instanz durch diesen Wert ersetzt; sonst bleibt die
+    per SSH abgefragte Last.
     Arbeitet sowohl mit QuerySets als auch mit Listen/iterables.
     """
     if isinstance(hosts, models.QuerySet):
-        return list(hosts.filter(nur_superuser=False))
-    return [h for h in hosts if not getattr(h, "nur_superuser", False)]
+        candidates = list(hosts.filter(nur_superuser=False))
+    else:
+        candidates = [h for h in hosts if not getattr(h, "nur_superuser", False)]
+    states = get_health(h.pk for h in candidates)
+    allowed = []
+    for host in candidates:
+        state = states[host.pk]
+        if not state.available:
+            log.debug("Host %s übersprungen (Breaker %s)", host.hostname, state.state)
+            continue
+        if state.live_load is not None:
+            host.current_load = state.live_load
+        allowed.append(host)
+    return allowed
 
 
 # ------------------------------------------------------------------
@@ -77,29 +95,24 @@ class RoundRobinStrategy(TargetSelectionStrategy):
     """
     Round‑robin selection.
 
-    A simple counter stored in Django’s cache is used to remember the last
-    host that was selected.  The counter is advanced modulo ``len(hosts)``.
-    If the counter is missing or hosts changed (e.g. a host was deleted),
-    the counter is reset to 0.
+    A counter in the shared Redis cache is advanced atomically via
+    ``INCR`` on every call, so all gunicorn workers (and Celery) share one
+    rotation instead of each process keeping its own.  The chosen host is
+    ``hosts[(counter - 1) % len(hosts)]`` – if hosts are added or removed
+    the rotation simply continues on the new list.
 
     The cache key is deterministic per “cluster” – you can extend it to
     support multiple clusters by adding a ``cluster_name`` argument if needed.
     """
 
     CACHE_KEY = "paas_rr_selection_index"
-    CACHE_TIMEOUT = 60 * 60  # 1 hour – you can keep it forever too
+    CACHE_TIMEOUT = None  # Zähler nie verfallen lassen
 
-    def _get_current_index(self, num_hosts: int) -> int:
+    def _next_index(self, num_hosts: int) -> int:
         """
-        Retrieve the current round‑robin index from cache, reset if out of range.
+        Atomically advance the shared counter and map it onto ``num_hosts``.
         """
-        idx = cache.get(self.CACHE_KEY)
-        if idx is None or not isinstance(idx, int) or idx >= num_hosts:
-            idx = 0
-        return idx
-
-    def _set_current_index(self, idx: int) -> None:
-        cache.set(self.CACHE_KEY, idx, timeout=self.CACHE_TIMEOUT)
+        return (cache_incr(self.CACHE_KEY, self.CACHE_TIMEOUT) - 1) % num_hosts
 
     def select_target(
         self,
@@ -113,10 +126,8 @@ class RoundRobinStrategy(TargetSelectionStrategy):
             log.warning("RoundRobinStrategy: Keine erlaubten Hosts vorhanden")
             return None
 
-        idx = self._get_current_index(len(host_list))
+        idx = self._next_index(len(host_list))
         chosen = host_list[idx]
-        next_idx = (idx + 1) % len(host_list)
-        self._set_current_index(next_idx)
 
         log.debug(
             "RoundRobinStrategy: user=%s selected host=%s (index=%d)",
@@ -158,7 +169,7 @@ class LeastLoadStrategy(TargetSelectionStrategy):
         else:
             # List / iterable
             try:
-                chosen = min(allowed, key=lambda h: getattr(h, "current_load", float("inf")))
+                chosen = min(allowed, key=lambda h: getattr(h, "current_load", float("inf")), default=None)
             except Exception as exc:
                 log.exception("LeastLoadStrategy: Fehler bei min(): %s", exc)
 
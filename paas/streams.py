@@ -0,0 +1,184 @@
+"""
+Live-Logs eines Containers als Server-Sent Events.
+
+``docker logs -f`` läuft über ``paas.transport.open_stream`` – bei
+Paramiko-Hosts in einem Kanal der gepoolten SSH-Verbindung
+(``paas.ssh_pool``), bei OpenSSH-Hosts über den ControlMaster. Ein
+Hintergrund-Thread liest den Stream zeilenweise und legt die Zeilen in eine
+begrenzte ``asyncio.Queue``:
+
+* Backpressure – ist die Queue voll (langsamer Browser), blockiert der
+  Thread und liest nicht weiter; das SSH-Flusskontrollfenster läuft voll und
+  ``docker logs`` auf dem Host wartet ebenfalls.
+* Idle-Timeout – kommt ``LOG_STREAM_IDLE_TIMEOUT`` Sekunden keine Zeile,
+  wird der Stream beendet; dazwischen halten Kommentare die Verbindung offen.
+* Pro User sind höchstens ``LOG_STREAM_MAX_PER_USER`` Streams gleichzeitig
+  offen (Redis-ZSET, Einträge verfallen automatisch, falls ein Prozess stirbt).
+
+Der Generator ist asynchron – unter ASGI (``core/asgi.py``) belegt ein
+Zuschauer damit keinen Worker, sondern nur eine Coroutine.
+"""
+
+import asyncio
+import logging
+import shlex
+import socket
+import threading
+import time
+import uuid
+
+import redis
+from django.conf import settings
+
+from config.cache import get_redis, make_key
+from .transport import open_stream
+
+logger = logging.getLogger(__name__)
+
+RECV_TIMEOUT = 1.0
+READ_CHUNK = 4096
+
+
+# ----------------------------------------------------------------------
+# Gleichzeitige Streams pro User begrenzen
+# ----------------------------------------------------------------------
+def _slots_key(user_id: int) -> str:
+    return make_key("log_streams", user_id)
+
+
+def acquire_stream_slot(user_id: int) -> str | None:
+    """
+    Reserviert einen Stream-Platz für ``user_id``.
+    Gibt eine Stream-ID zurück oder ``None``, wenn das Limit erreicht ist.
+    """
+    key = _slots_key(user_id)
+    stream_id = uuid.uuid4().hex
+    now = time.time()
+    stale_before = now - 2 * settings.LOG_STREAM_HEARTBEAT - settings.LOG_STREAM_IDLE_TIMEOUT
+    try:
+        r = get_redis()
+        pipe = r.pipeline()
+        pipe.zremrangebyscore(key, 0, stale_before)
+        pipe.zadd(key, {stream_id: now})
+        pipe.zcard(key)
+        pipe.expire(key, int(settings.LOG_STREAM_IDLE_TIMEOUT) * 2)
+        _, _, count, _ = pipe.execute()
+        if count > settings.LOG_STREAM_MAX_PER_USER:
+            r.zrem(key, stream_id)
+            return None
+    except redis.RedisError as exc:
+        # Ohne Redis kein Limit – lieber streamen als den User aussperren
+        logger.warning("Stream-Limit nicht prüfbar (%s)", exc)
+    return stream_id
+
+
+def refresh_stream_slot(user_id: int, stream_id: str) -> None:
+    try:
+        get_redis().zadd(_slots_key(user_id), {stream_id: time.time()}, xx=True)
+    except redis.RedisError:
+        pass
+
+
+def release_stream_slot(user_id: int, stream_id: str) -> None:
+    try:
+        get_redis().zrem(_slots_key(user_id), stream_id)
+    except redis.RedisError:
+        pass
+
+
+# ----------------------------------------------------------------------
+# Kanal → Queue (Thread)
+# ----------------------------------------------------------------------
+def _pump(channel, queue: asyncio.Queue, loop, stop: threading.Event) -> None:
+    """Liest den Stream zeilenweise und reicht die Zeilen an die Queue weiter."""
+
+    def put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stop.is_set():
+            try:
+                future.result(timeout=RECV_TIMEOUT)
+                return True
+            except TimeoutError:
+                continue  # Queue voll → Backpressure, nicht weiterlesen
+        future.cancel()
+        return False
+
+    channel.settimeout(RECV_TIMEOUT)
+    pending = b""
+    try:
+        while not stop.is_set():
+            try:
+                data = channel.recv(READ_CHUNK)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if not put(line.decode("utf-8", errors="replace").rstrip("\r")):
+                    return
+        if pending and not stop.is_set():
+            put(pending.decode("utf-8", errors="replace"))
+    except Exception as exc:
+        logger.warning("Log-Stream abgebrochen: %s", exc)
+    finally:
+        if not stop.is_set():
+            put(None)  # Ende signalisieren
+
+
+def _sse(data: str, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    # Zeilenumbrüche sind in SSE-Daten nicht erlaubt
+    return f"{prefix}data: {data.replace(chr(10), ' ')}\n\n"
+
+
+async def container_log_events(provision, user_id: int, stream_id: str, tail: int):
+    """
+    Async-Generator mit SSE-Nachrichten für die Logs von ``provision``.
+    Gibt den Stream-Platz beim Beenden (auch bei Verbindungsabbruch) frei.
+    """
+    host = provision.host
+    cmd = f"docker logs -f --tail {int(tail)} {shlex.quote(provision.container_name)} 2>&1"
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LOG_STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    channel = None
+
+    try:
+        try:
+            channel = await asyncio.to_thread(open_stream, host, cmd, settings.LOG_STREAM_CONNECT_TIMEOUT)
+        except Exception as exc:
+            logger.warning("Log-Stream für %s nicht möglich: %s", provision.pk, exc)
+            yield _sse("Verbindung zum Host fehlgeschlagen.", event="end")
+            return
+
+        threading.Thread(
+            target=_pump, args=(channel, queue, loop, stop),
+            name=f"log-stream-{provision.pk}", daemon=True,
+        ).start()
+
+        yield "retry: 5000\n\n"
+        idle_deadline = loop.time() + settings.LOG_STREAM_IDLE_TIMEOUT
+        while True:
+            try:
+                line = await asyncio.wait_for(queue.get(), timeout=settings.LOG_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if loop.time() >= idle_deadline:
+                    yield _sse("Keine neuen Logs – Stream beendet.", event="end")
+                    return
+                await asyncio.to_thread(refresh_stream_slot, user_id, stream_id)
+                yield ": keepalive\n\n"
+                continue
+
+            if line is None:
+                yield _sse("Container-Log beendet.", event="end")
+                return
+            idle_deadline = loop.time() + settings.LOG_STREAM_IDLE_TIMEOUT
+            yield _sse(line)
+    finally:
+        stop.set()
+        if channel is not None:
+            channel.close()
+        # Redis blockiert – nicht auf der Event-Loop
+        await asyncio.to_thread(release_stream_slot, user_id, stream_id)
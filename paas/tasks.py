@@ -1,174 +1,116 @@
 import os
 import time
-import paramiko
-from pathlib import Path
 from django.utils import timezone
 from datetime import datetime
 from django.db import transaction
 from django.conf import settings
 from tornado.gen import sleep
 
-from .models import ProvisionedApp, RemoteHost, AppDefinition, AppEnvVarPerApp, AppVolumePerApp, ConfigPatch
+from .models import ProvisionedApp, RemoteHost, ConfigPatch, ProvisionSpan
+from . import agent, deadlines, health, idle, timeseries
+from .events import EventLog, prune_events
+from .specs import DeploymentSpec, get_spec
+from .shell import ShellTimeout
+from .transport import TRANSPORT_ERRORS, CommandResult, Transport, open_transport
+from .metrics import SSH_COMMAND, SSH_COMMAND_TIMEOUTS, SWEEP_BACKLOG, SWEEP_DURATION, SWEEP_RESULTS, host_label
+from .spans import SpanRecorder, prune_spans
+from .usage import STATS_CMD, prune_usage, record_usage
 from celery import shared_task # celery framework
+from celery.exceptions import SoftTimeLimitExceeded
 from celery import app # celery app datei
 import logging
-import re
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 
-import subprocess
 from typing import Tuple
 import contextlib
 from typing import Generator
 
 logger = logging.getLogger(__name__)
 
-
-# ----------------------------------------------------
-# Lokaler SSH‑Client (für localhost)
-# ----------------------------------------------------
-
-class LocalSFTP:
-    """Minimaler Ersatz für Paramiko SFTP – nutzt einfach Python‑I/O."""
-    def open(self, path: str, mode: str):
-        # Im lokalen Fall muss das Verzeichnis existieren
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        return open(path, mode)
-
-class LocalSSH:
-    """Paramiko‑ähnlicher Client für die lokale Maschine"""
-
-    def __init__(self, host: "RemoteHost"):
-        self.host = host
-        self.host_obj = host          # damit get_transport() etwas weiß
-
-    # ------------------------------------------------------------------
-    # Dummy‑Transport‑Interface (nur get_username() wird benötigt)
-    # ------------------------------------------------------------------
-    def get_transport(self):
-        class DummyTransport:
-            def __init__(self, username):
-                self._user = username
-
-            def get_username(self):
-                return self._user
-
-        username = (
-            getattr(self.host_obj, "ssh_user", None)
-            or os.getenv("USER", "root")
-        )
-        return DummyTransport(username)
-
-    # ------------------------------------------------------------------
-    # Dummy SFTP‑Interface – **context‑manager‑fähig** + stat()
-    # ------------------------------------------------------------------
-    def open_sftp(self):
-        """
-        Liefert ein Objekt, das Paramiko’s SFTP‑Client simuliert
-        und als Kontext‑Manager verwendet werden kann.
-        """
-
-        class DummySFTP:
-            """Minimale SFTP‑Simulation für lokale Dateien"""
-
-            def __init__(self, base_dir: Path):
-                self.base_dir = base_dir
-
-            def open(self, remote_path, mode="r"):
-                local_path = Path(remote_path).expanduser()
-                if "w" in mode:
-                    local_path.parent.mkdir(parents=True, exist_ok=True)
-                return open(local_path, mode, encoding="utf-8")
-
-            # ---- Kontext‑Manager‑API -----------------------------------
-            def __enter__(self):
-                return self
-
-            def __exit__(self, exc_type, exc_val, exc_tb):
-                # Dummy – nichts zu tun
-                pass
-
-            # --------------------- stat() --------------------------------
-            def stat(self, remote_path):
-                """Prüft, ob die Datei existiert – wirft FileNotFoundError,
-                wenn sie nicht vorhanden ist."""
-                path = Path(remote_path).expanduser()
-                if not path.exists():
-                    raise FileNotFoundError(f"File {remote_path} not found")
-                # Bei Paramiko würde hier ein SFTPAttributes‑Objekt zurück
-                # kommen; das konkreten Objekt braucht unser Code nicht,
-                # daher einfach Path.stat() zurückgeben.
-                return path.stat()
-
-            def close(self):
-                pass
-
-        # Basis: Home‑Verzeichnis
-        return DummySFTP(Path.home())
-
-    # ---- exec_command --------------------------------------------------
-    def exec_command(self, cmd):
-        res = subprocess.run(
-            cmd, shell=True, text=True, capture_output=True
-        )
-        return res.returncode, res.stdout.strip(), res.stderr.strip()
-
-    # ---- Kontext‑Manager‑API ------------------------------------------
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        return False
+# Zeitbudget pro Abschnitt in Sekunden („total“ = ganzer Deploy bzw. Teardown).
+# Jedes Remote-Kommando bekommt höchstens die Restzeit seines Abschnitts.
+DEPLOY_STAGE_BUDGETS = {
+    "ports": 60,
+    "tor_unit": 120,
+    "onion_wait": 180,
+    "uid_gid": 30,
+    "docker_run": 600,    # inkl. Image-Pull
+    "patch_wait": 150,
+    "patch_write": 60,
+}
+TEARDOWN_STAGE_BUDGETS = {
+    "container": 120,
+    "volumes": 120,
+    "tor": 60,
+}
+# Aufräumen nach abgebrochenem Deploy – muss in die Lücke zwischen weichem und hartem Limit passen
+DEPLOY_CLEANUP_BUDGET = 60
+# Lastabfrage pro Host
+LOAD_PROBE_BUDGET = 20
+# docker stats pro Host (misst die CPU über ein bis zwei Sekunden)
+USAGE_BUDGET = 30
 
 
 # ----------------------------------------------------------------------
 # SSH‑Hilfsfunktionen
 # ----------------------------------------------------------------------
 @contextlib.contextmanager
-def _ssh_client(host: "RemoteHost") -> Generator:
-    # Remote‑Host
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(
-        hostname=host.hostname,
-        username=host.ssh_user,
-        key_filename=str(Path(host.ssh_key_path).expanduser()),
-        timeout=15,
-    )
+def _ssh_client(host: "RemoteHost") -> Generator[Transport, None, None]:
+    # Offener Breaker → sofort HostUnavailable statt Connect-Timeout (paas.health)
+    health.guard(host)
+    # Backend nach host.transport (Paramiko, OpenSSH-ControlMaster oder lokal)
+    try:
+        ssh = open_transport(host)
+    except TRANSPORT_ERRORS as exc:
+        health.record_failure(host, exc)
+        raise
     try:
         yield ssh
     finally:
         ssh.close()
 
 
-def _run_cmd(ssh, cmd: str):
+def _run_cmd(ssh: Transport, cmd: str, timeout: float | None = None) -> CommandResult:
     """
-    Unified wrapper that works with both a Paramiko SSHClient
-    *and* the LocalSSH helper used for localhost.
-    Returns: (exit_code: int, stdout: str, stderr: str)
+    Führt ``cmd`` über den Transport aus und misst die Laufzeit.
+    ``timeout`` überschreibt ``SSH_COMMAND_TIMEOUT`` für dieses Kommando; beides
+    ist durch das laufende Zeitbudget (``paas.deadlines``) begrenzt. Nach Ablauf
+    wird das Kommando auf dem Host beendet – von der Shell-Sitzung oder, wo der
+    Transport das nicht kann, per ``timeout -k`` – und ``DeadlineExceeded`` geworfen.
+    Returns: CommandResult(exit_code, stdout, stderr)
     """
-    # Execute the command once
-    result = ssh.exec_command(cmd)
+    limit = deadlines.command_timeout(timeout)
+    started = time.perf_counter()
+    try:
+        if ssh.kills_on_timeout:
+            result = ssh.exec(cmd, limit)
+        else:
+            result = ssh.exec(deadlines.remote_command(cmd, limit), deadlines.client_timeout(limit))
+    except ShellTimeout as exc:
+        # Kommando zu langsam, Host aber erreichbar (er hat es auf Zuruf beendet)
+        SSH_COMMAND_TIMEOUTS.labels(host_label(ssh)).inc()
+        raise deadlines.DeadlineExceeded(f"Kommando nach {limit:g}s auf dem Host beendet: {cmd[:80]}") from exc
+    except TimeoutError as exc:
+        # Der Host hat nicht einmal sein eigenes timeout beantwortet → Verbindungsproblem
+        SSH_COMMAND_TIMEOUTS.labels(host_label(ssh)).inc()
+        health.record_failure(ssh.host, exc)
+        raise deadlines.DeadlineExceeded(f"Kommando nach {limit:g}s abgebrochen: {cmd[:80]}") from exc
+    except TRANSPORT_ERRORS as exc:
+        health.record_failure(ssh.host, exc)
+        raise
+    finally:
+        SSH_COMMAND.labels(host_label(ssh)).observe(time.perf_counter() - started)
 
-    # ----------------- Detect local return (int, str, str) -----------------
-    # Paramiko returns a tuple of ChannelFile objects → first element is NOT int
-    if isinstance(result, tuple) and len(result) == 3:
-        # local:  (int, str, str)
-        if isinstance(result[0], int):
-            exit_code, out, err = result
-            # Ensure strings (no trailing newlines)
-            if not isinstance(out, str):
-                out = out.decode().strip()
-            if not isinstance(err, str):
-                err = err.decode().strip()
-            return exit_code, out, err
+    # Erste Antwort pro Verbindung: Host erreichbar, Dauer als Round-Trip-Zeit
+    if not getattr(ssh, "health_reported", False):
+        health.record_success(ssh.host, time.perf_counter() - started)
+        ssh.health_reported = True
 
-    # ----------------- Paramiko case ------------------------------------
-    stdin, stdout, stderr = result
-    exit_code = stdout.channel.recv_exit_status()
-    out = stdout.read().decode().strip()
-    err = stderr.read().decode().strip()
-    return exit_code, out, err
+    if result.exit_code in deadlines.TIMEOUT_EXIT_CODES and time.perf_counter() - started >= limit:
+        SSH_COMMAND_TIMEOUTS.labels(host_label(ssh)).inc()
+        raise deadlines.DeadlineExceeded(f"Kommando nach {limit:g}s auf dem Host beendet: {cmd[:80]}")
+    return result
 
 
 def _get_user_id_uid(ssh, username: str = "deploy") -> tuple[str, str]:
@@ -198,14 +140,13 @@ def _get_user_id_gid(ssh, username: str = "deploy") -> tuple[str, str]:
 
 
 def _wait_for_file(ssh, file_path: str, timeout: int = 60):
-    """Warten, bis eine Datei existiert – gibt True/False zurück."""
+    """Warten, bis eine Datei existiert – gibt True/False zurück (höchstens bis zur Frist)."""
     end = time.time() + timeout
     while time.time() < end:
-        try:
-            ssh.open_sftp().stat(file_path)
+        if ssh.exists(file_path):
             return True
-        except FileNotFoundError:
-            time.sleep(1)
+        deadlines.check()
+        time.sleep(1)
     return False
 
 
@@ -232,16 +173,14 @@ def _is_port_in_use(ssh, port: int):
 
 def _write_systemd_unit(ssh, unit_name, unit_content):
     """
-    Schreibt die unit_datei in ~/.config/systemd/user/ und lädt sie neu.
-    Funktioniert sowohl für einen echten Paramiko‑SSHClient (remote)
-    als auch für die LocalSSH‑Klasse (lokal).
+    Schreibt die unit_datei in ~/.config/systemd/user/ und lädt sie neu
+    (für jeden Transport – Paramiko, OpenSSH oder lokal).
     """
     # ---------------------------------------------------------
     # 2.1  Determine username & target directory
     # ---------------------------------------------------------
 
-    # Remote / Paramiko client
-    user = ssh.get_transport().get_username()
+    user = ssh.username
     unit_dir = f"/home/{user}/.config/systemd/user/"
     # Remote: ensure dir via SSH (no local os.makedirs)
     _run_cmd(ssh, f"mkdir -p {unit_dir}")
@@ -250,9 +189,7 @@ def _write_systemd_unit(ssh, unit_name, unit_content):
     # ---------------------------------------------------------
     # 2.2  Write the unit file
     # ---------------------------------------------------------
-    with ssh.open_sftp() as sftp:
-        with sftp.open(str(unit_path), "w") as f:
-            f.write(unit_content)
+    ssh.put(unit_path, unit_content)
 
     # ---------------------------------------------------------
     # 3. Reload systemd, enable & start the unit
@@ -265,17 +202,26 @@ def _write_systemd_unit(ssh, unit_name, unit_content):
 
 
 
-def _reserve_ports(ssh, max_attempts=10):
+def _reserve_ports(ssh, max_attempts=10, reserved=frozenset()):
     """
     Reserviert zwei freie Ports – einen für Web und einen für API – und stellt sicher,
     dass sie verschieden sind.
 
     :param ssh:  SSH‑Connection‑Object (oder beliebiger Kontext, den _get_free_port nutzt)
     :param max_attempts:  Optionaler Höchstwert für die Versuche (None = unbegrenzt)
+    :param reserved:  Ports angehaltener Container (Scale‑to‑Zero) – frei, aber vergeben
     :return:  Tuple (free_port_web, free_port_api)
     """
-    # 1. Web‑Port holen – das ist ein einmaliger Vorgang
+    # 1. Web‑Port holen – nicht den eines angehaltenen Containers
     free_port_web = _get_free_port(ssh)
+    attempts = 0
+    while free_port_web in reserved:
+        if max_attempts is not None and attempts >= max_attempts:
+            raise RuntimeError(
+                f"Kein freier Port für Web gefunden, nach {attempts} Versuchen."
+            )
+        free_port_web = _get_free_port(ssh)
+        attempts += 1
 
     # 2. API‑Port holen – bis er verschieden vom Web‑Port ist
     attempts = 0
@@ -285,14 +231,14 @@ def _reserve_ports(ssh, max_attempts=10):
                 f"Kein freier Port für API gefunden, nach {attempts} Versuchen."
             )
         free_port_api = _get_free_port(ssh)
-        if free_port_api != free_port_web:
+        if free_port_api != free_port_web and free_port_api not in reserved:
             break  # Bedingung erfüllt – wir können weitermachen
         attempts += 1
 
     return free_port_web, free_port_api
 
 
-def _build_torrc(app_def: AppDefinition,
+def _build_torrc(app_def: DeploymentSpec,
                 socks_port: int,
                 hidden_dir: str,
                 free_port_web: int,
@@ -314,9 +260,9 @@ def _build_torrc(app_def: AppDefinition,
     ]
 
     # Bedingte Zeilen hinzufügen
-    if app_def.app_port_intern_web != 1:
+    if app_def.has_web_port:
         lines.append(f"HiddenServicePort {app_def.hiddenservice_port_web} 127.0.0.1:{free_port_web}")
-    if app_def.app_port_intern_api != 1:
+    if app_def.has_api_port:
         lines.append(f"HiddenServicePort {app_def.hiddenservice_port_api} 127.0.0.1:{free_port_api}")
 
     # Alle Zeilen zu einem String mit Zeilenumbrüchen zusammenfügen
@@ -330,27 +276,74 @@ def _build_torrc(app_def: AppDefinition,
 def _cleanup_provision(provision: ProvisionedApp):
     """Stopp, Löschung von Container und Tor‑Hidden‑Service."""
     host = provision.host
+    events = EventLog(provision, stage="teardown")
+    try:
+        _teardown(provision, host, events)
+    except Exception as exc:
+        # Nur im Fehlerfall persistieren – bei Erfolg wird die Provision
+        # (samt Events) ohnehin gelöscht.
+        events.error(f"Löschen fehlgeschlagen: {exc}")
+        events.flush()
+        raise
+
+
+def _teardown(provision: ProvisionedApp, host: RemoteHost, events: EventLog):
     with _ssh_client(host) as ssh:
-        # 1. Container entfernen
-        if provision.container_id:
+        _teardown_on(ssh, provision, host, events)
+
+
+def _teardown_on(ssh, provision: ProvisionedApp, host: RemoteHost, events: EventLog,
+                 prune_volumes: bool = True):
+    """Teardown über eine bereits offene SSH‑Verbindung (auch für Batches)."""
+    spans = SpanRecorder(provision, ProvisionSpan.OPERATION_TEARDOWN, {
+        **TEARDOWN_STAGE_BUDGETS, "total": settings.TEARDOWN_SOFT_TIME_LIMIT,
+    })
+    try:
+        with spans.stage("total"):
+            _teardown_steps(ssh, provision, host, events, spans, prune_volumes)
+    finally:
+        # vor delete() schreiben – danach setzt SET_NULL nur noch die Referenz zurück
+        spans.flush()
+
+    # 3. DB-Eintrag löschen (ProvisionEvents werden per CASCADE mitgelöscht)
+    events.discard()
+    provision.delete()
+
+    # alternativ: 3.1 DB-Eintrag auf Status "deleted" setzen
+    #provision.status = "deleted"
+    #provision.last_modified = timezone.now()
+    #provision.save(update_fields=[
+    #    "container_id", "onion_address", "status",
+    #    "log", "last_modified"
+    #])
+
+
+def _teardown_steps(ssh, provision: ProvisionedApp, host: RemoteHost, events: EventLog,
+                    spans: SpanRecorder, prune_volumes: bool):
+    # 1. Container entfernen
+    if provision.container_id:
+        with spans.stage("container"):
             _run_cmd(ssh, f"docker rm -f {provision.container_id}")
-            provision.log += f"\nContainer {provision.container_id} removed."
-            provision.container_id = None
-
-        # 1.1 Unbenutzte Docker‑Volumes entfernen
-        # Achtung: Prüfen, ob Docker überhaupt läuft!
-        _run_cmd(ssh, "docker volume prune -f")
-        provision.log += "\nUnused Docker volumes pruned."
-
-        # 2. Tor‑Hidden‑Service entfernen
-        if provision.container_name:
-            tor_data_dir = f"/home/{host.ssh_user}/{provision.container_name}/"
-            hidden = f"{tor_data_dir}.tor_hidden_{provision.container_name}"
-            provision.log += f"\nTor Hidden‑Service {hidden} removed."
-            provision.onion_address = None
-
-            #systemd dienst entfernen
-            # Remote commands – executed via the SSH client
+        events.add(f"Container {provision.container_id} removed.")
+        provision.container_id = None
+
+    # 1.1 Unbenutzte Docker‑Volumes entfernen (bei Batches einmal am Ende)
+    # Achtung: Prüfen, ob Docker überhaupt läuft!
+    if prune_volumes:
+        with spans.stage("volumes"):
+            _run_cmd(ssh, "docker volume prune -f")
+        events.add("Unused Docker volumes pruned.")
+
+    # 2. Tor‑Hidden‑Service entfernen
+    if provision.container_name:
+        tor_data_dir = f"/home/{host.ssh_user}/{provision.container_name}/"
+        hidden = f"{tor_data_dir}.tor_hidden_{provision.container_name}"
+        events.add(f"Tor Hidden‑Service {hidden} removed.")
+        provision.onion_address = None
+
+        #systemd dienst entfernen
+        # Remote commands – executed via the SSH client
+        with spans.stage("tor"):
             _run_cmd(ssh, f"systemctl --user stop tor-hidden-service@{provision.container_name}.service")
             _run_cmd(ssh, f"systemctl --user disable tor-hidden-service@{provision.container_name}.service")
             _run_cmd(ssh, f"rm ~/.config/systemd/user/tor-hidden-service@{provision.container_name}.service")
@@ -358,82 +351,79 @@ def _cleanup_provision(provision: ProvisionedApp):
             # tor datenverzeichnis löschen
             _run_cmd(ssh, f"rm -rf {tor_data_dir} || true")
 
-        # 3. DB-Eintrag löschen
-        provision.delete()
-
-        # alternativ: 3.1 DB-Eintrag auf Status "deleted" setzen
-        #provision.status = "deleted"
-        #provision.last_modified = timezone.now()
-        #provision.save(update_fields=[
-        #    "container_id", "onion_address", "status",
-        #    "log", "last_modified"
-        #])
-
 
 # ----------------------------------------------------------------------
 # Anpassung Config eines Containers
 # ----------------------------------------------------------------------
-def _apply_patches(ssh, app_def: AppDefinition, host: RemoteHost, provision: ProvisionedApp):
+def _apply_patches(ssh, app_def: DeploymentSpec, host: RemoteHost, provision: ProvisionedApp,
+                   spans: SpanRecorder):
     """
     Führt alle Config‑Patch‑Anweisungen aus, die für die App definiert sind.
+    Die Patches kommen vorgruppiert nach Zieldatei aus der Deployment‑Spec –
+    pro Datei wird nur einmal auf deren Existenz gewartet.
+    Warten und Schreiben werden getrennt gemessen (``patch_wait``/``patch_write``).
     """
-    # 1. Alle Patches holen
-    patches = list(app_def.config_patches.all())
-
-    # 2. Für jedes Patch
-    for patch in patches:
+    for target_file, patches in app_def.patches_by_file:
         # Pfad relativ zum Deploy‑User (z.B. /home/deploy/<user-containername>simplex/smp/config/smp-server.ini)
         file_path = os.path.join(
             f"/home/{host.ssh_user}/{provision.container_name}",
-            patch.target_file.lstrip('/')  # falls der Pfad mit / beginnt
+            target_file.lstrip('/')  # falls der Pfad mit / beginnt
         )
 
         # ------------------------------------------------------------------
         # Warten, bis die Datei auf dem Remote‑Host existiert
         # ------------------------------------------------------------------
-        if not _file_exists(ssh, file_path, timeout=120, interval=2.0):
+        with spans.stage("patch_wait"):
+            found = _file_exists(ssh, file_path, timeout=120, interval=2.0)
+        if not found:
             raise FileNotFoundError(
                 f"Target file {file_path} not found on remote host after waiting."
             )
 
-        # 3. Aktion ausführen
-        if patch.action == ConfigPatch.ACTION_COMMENT:
-            # Zeilen auskommentieren:  sed -i 's/^\(https\|cert\|key\):/#\1:/'
-            # Wir benutzen `grep -nE` um die Zeilennummern zu holen und `sed -i` zum Einfügen des #.
-            cmd = (
-                f"sed -i \"s/{patch.pattern}/#&/\" {file_path}"
-            )
-            #Bsp: sed -i 's/^\(https\|cert\|key\):/#&/' /home/deploy/testuser16-simplex-smp-1763212099/simplex/smp/config/smp-server.ini
-            print(cmd)
+        with spans.stage("patch_write"):
+            for patch in patches:
+                _apply_patch(ssh, patch, file_path)
 
-            exit_code, out, err = _run_cmd(ssh, cmd)
-            if exit_code:
-                raise RuntimeError(f"Patch comment failed: {err}")
-
-        elif patch.action == ConfigPatch.ACTION_REPLACE:
-            # z.B.  replace  ^https:.*  WITH https://example.com
-            # Wir nutzen sed -i 's/^https:.*/https://example.com/'
-            # Um den Platzhalter <onion_address> etc. zu ersetzen, können wir
-            # vorher `envsubst` benutzen oder `sed` selbst.
-            replacement = patch.replacement or ''
-            # Escape slashes in replacement
-            replacement_escaped = replacement.replace('/', r'\/')
-            cmd = (
-                f"sed -i \"s/^{patch.pattern}/{replacement_escaped}/\" {file_path}"
-            )
-            exit_code, out, err = _run_cmd(ssh, cmd)
-            if exit_code:
-                raise RuntimeError(f"Patch replace failed: {err}")
 
-        elif patch.action == ConfigPatch.ACTION_DELETE:
-            # delete lines that match the pattern
-            cmd = f'sed -i "/^{patch.pattern}/d" {file_path}'
-            exit_code, out, err = _run_cmd(ssh, cmd)
-            if exit_code:
-                raise RuntimeError(f"Patch delete failed: {err}")
+def _apply_patch(ssh, patch, file_path: str):
+    """Führt eine einzelne Patch‑Aktion auf ``file_path`` aus."""
+    if patch.action == ConfigPatch.ACTION_COMMENT:
+        # Zeilen auskommentieren:  sed -i 's/^\(https\|cert\|key\):/#\1:/'
+        # Wir benutzen `grep -nE` um die Zeilennummern zu holen und `sed -i` zum Einfügen des #.
+        cmd = (
+            f"sed -i \"s/{patch.pattern}/#&/\" {file_path}"
+        )
+        #Bsp: sed -i 's/^\(https\|cert\|key\):/#&/' /home/deploy/testuser16-simplex-smp-1763212099/simplex/smp/config/smp-server.ini
+        print(cmd)
+
+        exit_code, out, err = _run_cmd(ssh, cmd)
+        if exit_code:
+            raise RuntimeError(f"Patch comment failed: {err}")
+
+    elif patch.action == ConfigPatch.ACTION_REPLACE:
+        # z.B.  replace  ^https:.*  WITH https://example.com
+        # Wir nutzen sed -i 's/^https:.*/https://example.com/'
+        # Um den Platzhalter <onion_address> etc. zu ersetzen, können wir
+        # vorher `envsubst` benutzen oder `sed` selbst.
+        replacement = patch.replacement or ''
+        # Escape slashes in replacement
+        replacement_escaped = replacement.replace('/', r'\/')
+        cmd = (
+            f"sed -i \"s/^{patch.pattern}/{replacement_escaped}/\" {file_path}"
+        )
+        exit_code, out, err = _run_cmd(ssh, cmd)
+        if exit_code:
+            raise RuntimeError(f"Patch replace failed: {err}")
 
-        else:
-            raise ValueError(f"Unbekannte Patch‑Aktion: {patch.action}")
+    elif patch.action == ConfigPatch.ACTION_DELETE:
+        # delete lines that match the pattern
+        cmd = f'sed -i "/^{patch.pattern}/d" {file_path}'
+        exit_code, out, err = _run_cmd(ssh, cmd)
+        if exit_code:
+            raise RuntimeError(f"Patch delete failed: {err}")
+
+    else:
+        raise ValueError(f"Unbekannte Patch‑Aktion: {patch.action}")
 
 
 # ----------------------------------------------------------------------
@@ -450,6 +440,7 @@ def _file_exists(ssh, path: str, timeout: int = 60, interval: float = 1.0) -> bo
         exit_code, _, _ = _run_cmd(ssh, f"test -f {path}")
         if exit_code == 0:          # 0 == erfolgreich → Datei existiert
             return True
+        deadlines.check()           # Abschnitts-/Task-Frist abgelaufen → abbrechen
         time.sleep(interval)        # kurze Pause bevor erneut geprüft wird
     return False
 
@@ -469,61 +460,82 @@ def simple_task():
     return "Test successful"
 
 
-@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+@shared_task(bind=True, max_retries=5, default_retry_delay=60,
+             soft_time_limit=settings.DEPLOY_SOFT_TIME_LIMIT, time_limit=settings.DEPLOY_TIME_LIMIT)
 def deploy_app_task(self, provision_id: int, env_vars=None,**kwargs):
-    """Deploy einer App als Docker‑Container + Tor‑Hidden‑Service."""
+    """
+    Deploy einer App als Docker‑Container + Tor‑Hidden‑Service.
+    Jeder Abschnitt hat ein Zeitbudget (``DEPLOY_STAGE_BUDGETS``), der ganze
+    Deploy ``DEPLOY_SOFT_TIME_LIMIT``. Bei Abbruch räumt :func:`_rollback_deploy`
+    auf, was die bis dahin erreichten Abschnitte angelegt haben.
+    """
     provision = None
+    events = None
+    spans = None
     try:
-        provision = ProvisionedApp.objects.select_related("app", "host").get(pk=provision_id)
-        app_def = provision.app
+        provision = ProvisionedApp.objects.select_related("user", "host").get(pk=provision_id)
+        events = EventLog(provision, stage="deploy")
+        spans = SpanRecorder(provision, ProvisionSpan.OPERATION_DEPLOY, {
+            **DEPLOY_STAGE_BUDGETS, "total": settings.DEPLOY_SOFT_TIME_LIMIT,
+        }, events=events)
         host = provision.host
+        # Katalogdaten (Env, Volumes, Patches, Ports) aus der gecachten Deployment‑Spec
+        app_def = get_spec(provision.app_id)
+        if app_def is None:
+            raise RuntimeError(f"AppDefinition {provision.app_id} nicht gefunden")
 
         #####################################
         # Environment‑Variables zusammenbauen
         #####################################
-        default_env_qs = AppEnvVarPerApp.objects.filter(app=app_def) # Vordefinierte Variablen aus DB holen
         # Werte aus dem Form‑Input übernehmen
         env_from_user = env_vars or {} # Falls env_vars None, dann leeres dict
         # Endgültiges dict zusammenführen (User‑Werte überschreiben Defaults)
         final_env = {}
-        for env in default_env_qs:
-            key = env.key
+        for key, default in app_def.env_defaults.items():
             # Wert: User‑Eintrag, falls vorhanden, sonst Default
-            final_env[key] = env_from_user.get(key, env.value)
+            final_env[key] = env_from_user.get(key, default)
 
         # SSH / Local‑Verbindung
-        with _ssh_client(host) as ssh:
-            # Freien Port ermitteln
-            try:
-                free_port_web, free_port_api = _reserve_ports(ssh)
-                print(f"Web‑Port:  {free_port_web}")
-                print(f"API‑Port:  {free_port_api}")
-            except RuntimeError as e:
-                print(f"Fehler: {e}")
+        with spans.stage("total"), _ssh_client(host) as ssh:
+            with spans.stage("ports"):
+                # Freien Port ermitteln
+                try:
+                    reserved = {
+                        port
+                        for ports in ProvisionedApp.objects.filter(host=host, status="stopped")
+                        .values_list("port", "api_port")
+                        for port in ports
+                        if port is not None
+                    }
+                    free_port_web, free_port_api = _reserve_ports(ssh, reserved=reserved)
+                    print(f"Web‑Port:  {free_port_web}")
+                    print(f"API‑Port:  {free_port_api}")
+                except RuntimeError as e:
+                    print(f"Fehler: {e}")
 
             # Container‑Name setzen, falls noch nicht vorhanden
             if not provision.container_name:
                 provision.container_name = f"{provision.user.username}-{app_def.name}-{int(time.time())}"
                 provision.save(update_fields=["container_name"])
 
-            # Tor‑Hidden‑Service
-            tor_data_dir = f"/home/{host.ssh_user}/{provision.container_name}/"
-            hidden_dir = f"{tor_data_dir}.tor_hidden_{provision.container_name}"
-            _run_cmd(ssh, f"mkdir -p {hidden_dir} && chmod 700 {hidden_dir}")
+            with spans.stage("tor_unit"):
+                # Tor‑Hidden‑Service
+                tor_data_dir = f"/home/{host.ssh_user}/{provision.container_name}/"
+                hidden_dir = f"{tor_data_dir}.tor_hidden_{provision.container_name}"
+                _run_cmd(ssh, f"mkdir -p {hidden_dir} && chmod 700 {hidden_dir}")
 
-            DEFAULT_SOCKS_PORT = 9050
-            socks_port = DEFAULT_SOCKS_PORT if not _is_port_in_use(ssh, DEFAULT_SOCKS_PORT) else _get_free_port(ssh)
+                DEFAULT_SOCKS_PORT = 9050
+                socks_port = DEFAULT_SOCKS_PORT if not _is_port_in_use(ssh, DEFAULT_SOCKS_PORT) else _get_free_port(ssh)
 
-            torrc_path = f"{tor_data_dir}.torrc_{provision.container_name}"
-            torrc_content = _build_torrc(app_def, socks_port, hidden_dir, free_port_web, free_port_api)
-            print("=== erzeugte torrc ===")
-            print(torrc_content)
-            with ssh.open_sftp().open(torrc_path, "w") as f:
-                f.write(torrc_content)
+                torrc_path = f"{tor_data_dir}.torrc_{provision.container_name}"
+                torrc_content = _build_torrc(app_def, socks_port, hidden_dir, free_port_web, free_port_api)
+                print("=== erzeugte torrc ===")
+                print(torrc_content)
+                ssh.put(torrc_path, torrc_content)
 
-            # user‑systemd‑Unit für tor-instanz erzeugen
-            unit_name = f"tor-hidden-service@{provision.container_name}.service"
-            unit_content = f"""\
+                # user‑systemd‑Unit für tor-instanz erzeugen
+                unit_name = f"tor-hidden-service@{provision.container_name}.service"
+                unit_content = f"""\
 [Unit]
 Description=Tor Hidden Service for {provision.container_name}
 After=network.target
@@ -539,94 +551,150 @@ StandardError=inherit
 WantedBy=default.target
 """
 
-            _write_systemd_unit(ssh, unit_name, unit_content)
+                _write_systemd_unit(ssh, unit_name, unit_content)
 
-            if not _wait_for_file(ssh, f"{hidden_dir}/hostname", timeout=120):
-                raise RuntimeError("Tor hat hostname nicht erzeugt")
+            with spans.stage("onion_wait"):
+                if not _wait_for_file(ssh, f"{hidden_dir}/hostname", timeout=120):
+                    raise RuntimeError("Tor hat hostname nicht erzeugt")
 
-            _, onion_addr, _ = _run_cmd(ssh, f"cat {hidden_dir}/hostname")
-            if not onion_addr:
-                raise RuntimeError("Keine Onion‑Adresse gefunden")
+                _, onion_addr, _ = _run_cmd(ssh, f"cat {hidden_dir}/hostname")
+                if not onion_addr:
+                    raise RuntimeError("Keine Onion‑Adresse gefunden")
 
 
             # Docker‑Run
 
-            # UID / GID vom Remote‑User holen
-            uid = _get_user_id_uid(ssh, host.ssh_user)
-            gid = _get_user_id_gid(ssh, host.ssh_user)
-
-            cmd_parts = [
-                f"docker run -d --restart unless-stopped",
-                f"--name {provision.container_name}",
-            ]
-            if app_def.use_deploy_user:
-                cmd_parts.insert(1, f"--user {uid}:{gid}")  # wird nur hinzugefügt, wenn true
-            if app_def.app_port_intern_web != 1:
-                cmd_parts.append(f"-p {free_port_web}:{app_def.app_port_intern_web}")
-            if app_def.app_port_intern_api != 1:
-                cmd_parts.append(f"-p {free_port_api}:{app_def.app_port_intern_api}")
-            env_flag_parts = [
-                f"-e {k}={v.replace('<onion_address>', onion_addr) if '<onion_address>' in v else v}"
-                for k, v in final_env.items()
-            ]
-            cmd_parts.extend(env_flag_parts)
-
-            # Docker‑Volumes
-            vol_qs = AppVolumePerApp.objects.filter(app=app_def)
-            vol_flag_parts = []
-            for vol in vol_qs:
-                # kompletter Host‑Pfad (relativ zu tor_data_dir)
-                full_host_path = os.path.join(tor_data_dir, vol.host_path)
-
-                # Optional: Verzeichnis auf dem Host anlegen (falls noch nicht vorhanden)
-                _run_cmd(ssh, f"mkdir -p {full_host_path}")
-
-                # Docker‑Flag: -v <host_path>:<container_path>
-                vol_flag_parts.append(
-                    f"-v {full_host_path}:{vol.container_path}"
-                )
-            # Volumes vor den Umgebungsvariablen anfügen (Reihenfolge ist für Docker irrelevant)
-            cmd_parts.extend(vol_flag_parts)
-
-            cmd_parts.append(app_def.docker_image)
-
-            docker_cmd = " ".join(cmd_parts)
-            print(f"[deploy_app_task] Docker‑Cmd: {docker_cmd}")  # Debug‑Ausgabe
-
-            exit_code, _, err = _run_cmd(ssh, docker_cmd)
-            if exit_code:
-                raise RuntimeError(f"Docker‑Run fehlgeschlagen: {err}")
-
-            # Container‑ID abfragen
-            ps_cmd = f"docker ps -q -f name={provision.container_name}"
-            _, container_id, _ = _run_cmd(ssh, ps_cmd)
-            if not container_id:
-                raise RuntimeError("Kein Container‑ID zurückgegeben")
+            with spans.stage("uid_gid"):
+                # UID / GID vom Remote‑User holen
+                uid = _get_user_id_uid(ssh, host.ssh_user)
+                gid = _get_user_id_gid(ssh, host.ssh_user)
+
+            with spans.stage("docker_run"):
+                cmd_parts = [
+                    f"docker run -d --restart unless-stopped",
+                    f"--name {provision.container_name}",
+                ]
+                if app_def.use_deploy_user:
+                    cmd_parts.insert(1, f"--user {uid}:{gid}")  # wird nur hinzugefügt, wenn true
+                if app_def.has_web_port:
+                    cmd_parts.append(f"-p {free_port_web}:{app_def.app_port_intern_web}")
+                if app_def.has_api_port:
+                    cmd_parts.append(f"-p {free_port_api}:{app_def.app_port_intern_api}")
+                env_flag_parts = [
+                    f"-e {k}={v.replace('<onion_address>', onion_addr) if '<onion_address>' in v else v}"
+                    for k, v in final_env.items()
+                ]
+                cmd_parts.extend(env_flag_parts)
+
+                # Docker‑Volumes
+                vol_flag_parts = []
+                for vol in app_def.volumes:
+                    # kompletter Host‑Pfad (relativ zu tor_data_dir)
+                    full_host_path = os.path.join(tor_data_dir, vol.host_path)
+
+                    # Optional: Verzeichnis auf dem Host anlegen (falls noch nicht vorhanden)
+                    _run_cmd(ssh, f"mkdir -p {full_host_path}")
+
+                    # Docker‑Flag: -v <host_path>:<container_path>
+                    vol_flag_parts.append(
+                        f"-v {full_host_path}:{vol.container_path}"
+                    )
+                # Volumes vor den Umgebungsvariablen anfügen (Reihenfolge ist für Docker irrelevant)
+                cmd_parts.extend(vol_flag_parts)
+
+                cmd_parts.append(app_def.docker_image)
+
+                docker_cmd = " ".join(cmd_parts)
+                print(f"[deploy_app_task] Docker‑Cmd: {docker_cmd}")  # Debug‑Ausgabe
+
+                exit_code, _, err = _run_cmd(ssh, docker_cmd)
+                if exit_code:
+                    raise RuntimeError(f"Docker‑Run fehlgeschlagen: {err}")
+
+                # Container‑ID abfragen
+                ps_cmd = f"docker ps -q -f name={provision.container_name}"
+                _, container_id, _ = _run_cmd(ssh, ps_cmd)
+                if not container_id:
+                    raise RuntimeError("Kein Container‑ID zurückgegeben")
 
             # Jetzt die Config‑Patches anwenden
-            _apply_patches(ssh, app_def, host, provision)
+            _apply_patches(ssh, app_def, host, provision, spans)
 
             # Basis‑Daten persistieren
             provision.container_id = container_id
             provision.port = free_port_web
+            provision.api_port = free_port_api if app_def.has_api_port else None
             provision.status = "running"
-            provision.log = f"Container {container_id} läuft auf Port {free_port_web}"
-            provision.save(update_fields=["container_id", "port", "status", "log"])
-
             provision.onion_address = onion_addr
-            provision.log += f"\nOnion‑Service erstellt: http://{onion_addr}:80"
-            provision.save(update_fields=["onion_address", "log"])
+            # last_modified explizit – auto_now greift nur, wenn das Feld in update_fields steht (ETag in my_apps_json)
+            provision.save(update_fields=[
+                "container_id", "port", "api_port", "status", "onion_address", "last_modified",
+            ])
+            events.add(f"Container {container_id} läuft auf Port {free_port_web} (Spec {app_def.content_hash})")
+            events.add(f"Onion‑Service erstellt: http://{onion_addr}:80")
+            events.flush()
 
     except Exception as exc:
         if provision:
+            if events is not None:
+                if isinstance(exc, SoftTimeLimitExceeded):
+                    events.error(f"Zeitlimit überschritten ({settings.DEPLOY_SOFT_TIME_LIMIT}s)")
+                else:
+                    events.error(str(exc))
+            if spans is not None:
+                _rollback_deploy(provision, provision.host, spans.started, events)
             provision.status = "error"
-            provision.log = f"{provision.log or ''}\n{exc}"
-            provision.save(update_fields=["status", "log"])
+            provision.save(update_fields=["status", "last_modified"])
+            if events is not None:
+                events.flush()
         logger.exception("[deploy_app_task] Fehler")
         raise  # Celery kennzeichnet Task als fehlgeschlagen
+    finally:
+        if spans is not None:
+            spans.flush()
 
 
-@shared_task
+def _rollback_deploy(provision: ProvisionedApp, host: RemoteHost, stages: list[str],
+                     events: EventLog | None):
+    """
+    Entfernt nach einem abgebrochenen Deploy, was die begonnenen Abschnitte
+    angelegt haben: Container (``docker_run``) bzw. Tor‑Unit und
+    Datenverzeichnis (``tor_unit``). Läuft mit eigenem Budget auf einer neuen
+    Verbindung – die alte kann mitten in einem Kommando abgebrochen sein.
+    """
+    name = provision.container_name
+    if not name:
+        return
+    commands = []
+    if "docker_run" in stages:
+        commands.append(f"docker rm -f {name}")
+    if "tor_unit" in stages:
+        unit = f"tor-hidden-service@{name}.service"
+        commands += [
+            f"systemctl --user stop {unit}",
+            f"systemctl --user disable {unit}",
+            f"rm -f ~/.config/systemd/user/{unit}",
+            f"rm -rf /home/{host.ssh_user}/{name}/",
+        ]
+    if not commands:
+        return
+
+    try:
+        with deadlines.budget(DEPLOY_CLEANUP_BUDGET, "deploy:cleanup"), _ssh_client(host) as ssh:
+            for cmd in commands:
+                _run_cmd(ssh, cmd)
+    except Exception as exc:
+        logger.warning("[deploy_app_task] Aufräumen von %s unvollständig: %s", name, exc)
+        if events is not None:
+            events.error(f"Aufräumen unvollständig: {exc}")
+        return
+    provision.container_id = None
+    provision.onion_address = None
+    if events is not None:
+        events.add(f"Abgebrochener Deploy aufgeräumt ({', '.join(s for s in stages if s != 'total')}).")
+
+
+@shared_task(soft_time_limit=settings.TEARDOWN_SOFT_TIME_LIMIT, time_limit=settings.TEARDOWN_TIME_LIMIT)
 def delete_container_by_id(provision_id: int, *_, **__):
     """Idempotenter Löscht‑Task – wird von Sweep oder Countdown aufgerufen."""
     try:
@@ -651,11 +719,12 @@ def sweep_expired_containers(self):
     Wird minütlich von Celery Beat aufgerufen.
     """
     now = timezone.now()
+    started = time.perf_counter()
     logger.info("sweep_expired_containers gestartet – jetzt: %s", now)
 
     # WICHTIG: nur aware DateTimes! Falls expires_at naive ist → mach es aware
     expired_qs = ProvisionedApp.objects.filter(
-        Q(status__in=("running", "deleting")) &
+        Q(status__in=("running", "stopped", "deleting")) &
         Q(expires_at__lt=now)
     )
 
@@ -667,10 +736,12 @@ def sweep_expired_containers(self):
     # )
 
     count = expired_qs.count()
+    SWEEP_BACKLOG.set(count)
     logger.info("Gefundene abgelaufene ProvisionedApps: %d", count)
 
     if count == 0:
         logger.info("Keine abgelaufenen Container → nichts zu tun")
+        SWEEP_DURATION.observe(time.perf_counter() - started)
         return
 
     deleted = 0
@@ -684,7 +755,7 @@ def sweep_expired_containers(self):
                 obj = ProvisionedApp.objects.select_for_update(skip_locked=True).get(pk=prov.pk)
                 if obj.expires_at >= now:
                     continue  # wurde inzwischen verlängert
-                if obj.status not in ("running", "deleting"):
+                if obj.status not in ("running", "stopped", "deleting"):
                     continue
 
                 logger.info("Lösche abgelaufene ProvisionedApp ID=%s (expires_at=%s)", obj.id, obj.expires_at)
@@ -700,10 +771,13 @@ def sweep_expired_containers(self):
             # Optional: retry mit Celery
             # raise self.retry(exc=exc, countdown=60)
 
+    SWEEP_RESULTS.labels("deleted").inc(deleted)
+    SWEEP_RESULTS.labels("failed").inc(failed)
+    SWEEP_DURATION.observe(time.perf_counter() - started)
     logger.info("Sweep fertig → %d gelöscht, %d fehlgeschlagen", deleted, failed)
 
 
-@shared_task
+@shared_task(soft_time_limit=settings.TEARDOWN_SOFT_TIME_LIMIT, time_limit=settings.TEARDOWN_TIME_LIMIT)
 def delete_container_task(provision_id: int):
     """Stoppt einen Container und entfernt den Tor‑Hidden‑Service, danach wird der DB‑Eintrag gelöscht."""
     try:
@@ -713,52 +787,139 @@ def delete_container_task(provision_id: int):
         logger.exception("[delete_container_task] Fehler")
         raise
 
-# --------------------------------------------------------------------------- #
-#  Parse CPU‑Last aus „uptime“ oder „cat /proc/loadavg“
-# --------------------------------------------------------------------------- #
-def _parse_loadavg(output: str) -> float:
+# ----------------------------------------------------------------------
+# Massen‑Teardown (Admin‑Aktionen) – gebündelt pro Host
+# ----------------------------------------------------------------------
+BULK_BATCH_SIZE = 50
+
+
+def queue_bulk_teardown(queryset, force: bool = False) -> tuple[int, int]:
     """
-    Erwartet Output einer Zeile wie:
-        12:34:56 up 1 day,  3:45,  1 user,  load average: 0.25, 0.45, 0.32
-    Gibt den ersten Load‑Average‑Wert (last 1 min) als Float zurück.
+    Markiert die Provisionen als ``deleting`` und plant pro Host Batches von
+    höchstens ``BULK_BATCH_SIZE`` IDs als :func:`bulk_teardown_task` ein.
+    Gibt ``(anzahl_provisionen, anzahl_batches)`` zurück.
     """
-    # Finde alle Float‑Werte am Ende
-    match = re.match(r'\s*([0-9]+(?:\.[0-9]+)?)', output)
-    # match = re.search(r'load average:\s*([0-9.,]+)', output)
-    if not match:
-        raise ValueError(f"Ungültige loadavg‑Zeile: {output!r}")
-    return float(match.group(1))
+    by_host: dict[int, list[int]] = {}
+    for host_id, pk in queryset.order_by().values_list("host_id", "id").iterator():
+        by_host.setdefault(host_id, []).append(pk)
+
+    total = sum(len(ids) for ids in by_host.values())
+    if not total:
+        return 0, 0
+
+    batches = [
+        (host_id, ids[i:i + BULK_BATCH_SIZE])
+        for host_id, ids in by_host.items()
+        for i in range(0, len(ids), BULK_BATCH_SIZE)
+    ]
 
-    # In Debian/Ubuntu ist das Trennzeichen „,“ – deshalb ersetzen wir Komma durch Punkt
-    load_str = match.group(1).replace(',', '.')
-    # Der erste Wert ist der 1‑Min‑Durchschnitt
-    return float(load_str.split()[0])
+    def _enqueue():
+        for host_id, ids in batches:
+            bulk_teardown_task.delay(host_id, ids, force)
 
+    with transaction.atomic():
+        for _, ids in batches:
+            ProvisionedApp.objects.filter(pk__in=ids).update(
+                status="deleting", last_modified=timezone.now()
+            )
+        transaction.on_commit(_enqueue)
+    return total, len(batches)
+
+
+@shared_task(bind=True, name='paas.tasks.bulk_teardown_task',
+             soft_time_limit=settings.BULK_TEARDOWN_SOFT_TIME_LIMIT, time_limit=settings.BULK_TEARDOWN_TIME_LIMIT)
+def bulk_teardown_task(self, host_id: int, provision_ids: list[int], force: bool = False):
+    """
+    Entfernt mehrere Provisionen *eines* Hosts über eine einzige SSH‑Verbindung.
+    ``force``: DB‑Eintrag auch dann löschen, wenn der Remote‑Teardown scheitert
+    (z.B. Host nicht mehr erreichbar).
+    """
+    provisions = list(
+        ProvisionedApp.objects.select_related("host").defer("log")
+        .filter(pk__in=provision_ids, host_id=host_id, status="deleting")
+    )
+    if not provisions:
+        return {"deleted": 0, "failed": 0}
+    host = provisions[0].host
 
-@shared_task(bind=True, name='paas.tasks.update_remote_loads')
+    deleted = failed = 0
+    done: set[int] = set()
+    try:
+        with _ssh_client(host) as ssh:
+            for provision in provisions:
+                done.add(provision.pk)
+                events = EventLog(provision, stage="teardown")
+                try:
+                    _teardown_on(ssh, provision, host, events, prune_volumes=False)
+                    deleted += 1
+                except SoftTimeLimitExceeded:
+                    raise
+                except Exception as exc:
+                    logger.warning("[bulk_teardown] %s: %s", provision.pk, exc)
+                    if force:
+                        provision.delete()
+                        deleted += 1
+                    else:
+                        events.error(f"Löschen fehlgeschlagen: {exc}")
+                        events.flush()
+                        ProvisionedApp.objects.filter(pk=provision.pk).update(
+                            status="error", last_modified=timezone.now()
+                        )
+                        failed += 1
+            _run_cmd(ssh, "docker volume prune -f")
+    except Exception as exc:
+        # Verbindung zum Host gescheitert oder Zeitlimit – Rest des Batches betroffen
+        logger.error("[bulk_teardown] Host %s: Batch abgebrochen: %s", host, exc)
+        remaining = [p.pk for p in provisions if p.pk not in done]
+        if force:
+            deleted += ProvisionedApp.objects.filter(pk__in=remaining).delete()[1].get(
+                ProvisionedApp._meta.label, 0
+            )
+        else:
+            ProvisionedApp.objects.filter(pk__in=remaining).update(
+                status="error", last_modified=timezone.now()
+            )
+            failed += len(remaining)
+
+    logger.info("[bulk_teardown] Host %s: %d gelöscht, %d fehlgeschlagen", host, deleted, failed)
+    return {"deleted": deleted, "failed": failed}
+
+
+@shared_task(bind=True, name='paas.tasks.update_remote_loads',
+             soft_time_limit=settings.LOADS_SOFT_TIME_LIMIT, time_limit=settings.LOADS_TIME_LIMIT)
 def update_remote_loads(self):
     """
     Wird regelmäßig (Beat) ausgeführt und aktualisiert die CPU‑Last aller RemoteHost‑Instanzen.
+    Hosts mit frischem Agent-Bericht (``paas.agent``) werden nicht per SSH abgefragt;
+    für die übrigen landet die Messung auch in den Zeitreihen (``paas.timeseries``).
     """
     logger.info("Update CPU‑Load aller RemoteHosts gestartet")
     successes = 0
     failures = 0
 
-    for host in RemoteHost.objects.all():
+    hosts = list(RemoteHost.objects.all())
+    states = health.get_health(h.pk for h in hosts)
+    samples = {}
+    for host in hosts:
+        live_load = states[host.pk].live_load
+        if live_load is not None and states[host.pk].state == health.STATE_CLOSED:
+            # Agent pusht – nur den Wert für Admin/Metriken übernehmen
+            if host.current_load != live_load:
+                host.current_load = live_load
+                host.save(update_fields=['current_load'])
+            successes += 1
+            continue
         try:
-            # Methode: uptime
-            with _ssh_client(host) as ssh:
-                _, out, _ = _run_cmd(ssh, 'uptime')
-            load = _parse_loadavg(out)
-            '''
-            Falls `uptime` nicht verfügbar ist (z.B. auf minimalistischen Docker‑Hosts), kann man stattdessen `cat /proc/loadavg` ausführen:            
-            out = _run_ssh_command(host, 'cat /proc/loadavg')
-            load = float(out.split()[0])                        
-            Das liefert denselben ersten Load‑Average‑Wert.
-            '''
+            # Last, RAM/Swap, Platte und Container in einem Kommando – ein hängender Host darf
+            # die anderen nicht blockieren. Zugleich der Probe für den Host-Breaker
+            # (offen → übersprungen, halb offen → Versuch).
+            with deadlines.budget(LOAD_PROBE_BUDGET, "loads"), _ssh_client(host) as ssh:
+                _, out, _ = _run_cmd(ssh, agent.METRICS_CMD)
+            sample = agent.parse_metrics(out)
+            samples[host.pk] = sample
 
             # Für ein Feld, das 0–10 (100 %) bedeutet, normalisieren:
-            load_normalized = min(max(load, 0.0), 10.0)
+            load_normalized = min(max(sample.load1, 0.0), 10.0)
 
             # Validierung mit Django‑Validators (falls ein Fehler auftreten sollte)
             host.current_load = load_normalized
@@ -767,6 +928,12 @@ def update_remote_loads(self):
             logger.debug(f"Host {host.hostname} ({host.ip_address}): load={load_normalized}")
             successes += 1
 
+        except SoftTimeLimitExceeded:
+            logger.error("CPU‑Load Update abgebrochen (Zeitlimit) nach %d Hosts", successes + failures)
+            raise
+        except health.HostUnavailable as exc:
+            logger.info("%s – übersprungen", exc)
+            failures += 1
         except Exception as exc:
             logger.error(
                 f"Fehler beim Abruf von {host.hostname} ({host.ip_address}): {exc}",
@@ -777,6 +944,151 @@ def update_remote_loads(self):
             # host.current_load = None
             # host.save(update_fields=['current_load'])
 
+    timeseries.append(samples)
     logger.info(
         f"CPU‑Load Update beendet – {successes} erfolgreich, {failures} fehlgeschlagen."
-    )
\ No newline at end of file
+    )
+
+
+@shared_task(bind=True, name='paas.tasks.sample_host_metrics')
+def sample_host_metrics(self):
+    """
+    Übernimmt die Agent-Berichte aller Hosts in die Zeitreihen (``paas.timeseries``).
+    Läuft per Beat alle 15 Sekunden; ein Bericht, der schon übernommen wurde,
+    wird übersprungen. Hosts ohne Agent liefert ``update_remote_loads``.
+    """
+    states = health.get_health(RemoteHost.objects.values_list('pk', flat=True))
+    written = timeseries.append({
+        host_id: state.agent for host_id, state in states.items() if state.agent is not None
+    })
+    logger.debug("[sample_host_metrics] %d neue Messungen", written)
+    return written
+
+
+@shared_task(bind=True, name='paas.tasks.collect_container_usage',
+             soft_time_limit=settings.USAGE_SOFT_TIME_LIMIT, time_limit=settings.USAGE_TIME_LIMIT)
+def collect_container_usage(self):
+    """
+    Ein ``docker stats`` pro Host mit laufenden Provisionen; die Messwerte landen
+    als ContainerUsageSample in der Datenbank (``paas.usage``). Hosts mit offenem
+    Breaker werden übersprungen – den Probe macht ``update_remote_loads``.
+    """
+    hosts = list(RemoteHost.objects.filter(provisionedapp__status='running').distinct())
+    states = health.get_health(h.pk for h in hosts)
+    recorded = 0
+    failures = 0
+    for host in hosts:
+        if states[host.pk].state != health.STATE_CLOSED:
+            continue
+        try:
+            with deadlines.budget(USAGE_BUDGET, "usage"), _ssh_client(host) as ssh:
+                _, out, _ = _run_cmd(ssh, STATS_CMD)
+            recorded += record_usage(host, out)
+        except SoftTimeLimitExceeded:
+            logger.error("[collect_container_usage] abgebrochen (Zeitlimit), %d Messungen", recorded)
+            raise
+        except Exception as exc:
+            logger.warning("[collect_container_usage] %s: %s", host.hostname, exc)
+            failures += 1
+
+    logger.info("[collect_container_usage] %d Messungen von %d Hosts, %d fehlgeschlagen",
+                recorded, len(hosts) - failures, failures)
+    return {"samples": recorded, "failed": failures}
+
+
+# ----------------------------------------------------------------------
+# Scale‑to‑Zero (paas/idle.py) – untätige Container anhalten und wieder starten
+# ----------------------------------------------------------------------
+@shared_task(bind=True, name='paas.tasks.scale_idle_provisions',
+             soft_time_limit=settings.USAGE_SOFT_TIME_LIMIT, time_limit=settings.USAGE_TIME_LIMIT)
+def scale_idle_provisions(self):
+    """
+    Hält untätige Container an (``docker stop`` einzeln, eine Verbindung pro
+    Host). Onion‑Adresse, Tor‑Dienst und Volumes bleiben, der Status wird ``stopped``.
+    """
+    if not idle.enabled():
+        return {"stopped": 0, "failed": 0, "skipped": 0}
+
+    by_host: dict[int, list[ProvisionedApp]] = {}
+    for provision in (
+        ProvisionedApp.objects.filter(pk__in=idle.find_idle(), container_name__isnull=False)
+        .select_related("host").defer("log")
+    ):
+        by_host.setdefault(provision.host_id, []).append(provision)
+
+    counts = {"stopped": 0, "failed": 0, "skipped": 0}
+    for provisions in by_host.values():
+        host = provisions[0].host
+        handled = 0
+        try:
+            with deadlines.budget(USAGE_BUDGET, "scale_to_zero"), _ssh_client(host) as ssh:
+                for provision in provisions:
+                    counts[_stop_idle(ssh, provision)] += 1
+                    handled += 1
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception as exc:
+            logger.warning("[scale_idle_provisions] %s: %s", host.hostname, exc)
+            counts["failed"] += len(provisions) - handled
+
+    logger.info("[scale_idle_provisions] %(stopped)d angehalten, %(failed)d fehlgeschlagen, "
+                "%(skipped)d wieder aktiv", counts)
+    return counts
+
+
+def _stop_idle(ssh: Transport, provision: ProvisionedApp) -> str:
+    """Einen Container anhalten; liefert ``stopped``, ``failed`` oder ``skipped``."""
+    # Seit find_idle aktiv geworden, geweckt, verlängert oder gelöscht?
+    if not idle.find_idle(provision_ids=[provision.pk]):
+        return "skipped"
+    # Einzeln: ein fehlender Container darf die anderen nicht mitreißen
+    exit_code, _, err = _run_cmd(ssh, f"docker stop {provision.container_name}")
+    if exit_code:
+        logger.warning("[scale_idle_provisions] %s/%s: docker stop fehlgeschlagen: %s",
+                       provision.host.hostname, provision.container_name, err.strip())
+        return "failed"
+    # inzwischen gelöschte Provisionen bleiben unberührt
+    ProvisionedApp.objects.filter(pk=provision.pk, status="running").update(
+        status="stopped", last_modified=timezone.now(),
+    )
+    with EventLog(provision, stage="scale_to_zero") as events:
+        events.add("Container angehalten (Leerlauf) – Onion‑Adresse und Daten bleiben erhalten.")
+    return "stopped"
+
+
+@shared_task(soft_time_limit=settings.TEARDOWN_SOFT_TIME_LIMIT, time_limit=settings.TEARDOWN_TIME_LIMIT)
+def wake_provision_task(provision_id: int):
+    """Startet einen angehaltenen Container (und sicherheitshalber seinen Tor‑Dienst) wieder."""
+    provision = ProvisionedApp.objects.select_related("host").defer("log").get(pk=provision_id)
+    if provision.status != "stopped":
+        return False
+
+    with EventLog(provision, stage="wake") as events:
+        try:
+            with deadlines.budget(USAGE_BUDGET, "wake"), _ssh_client(provision.host) as ssh:
+                _run_cmd(ssh, f"systemctl --user start tor-hidden-service@{provision.container_name}.service")
+                exit_code, _, err = _run_cmd(ssh, f"docker start {provision.container_name}")
+            if exit_code:
+                raise RuntimeError(f"docker start fehlgeschlagen: {err}")
+        except Exception as exc:
+            events.error(f"Start fehlgeschlagen: {exc}")
+            logger.warning("[wake_provision_task] Provision %s: %s", provision_id, exc)
+            raise
+
+        ProvisionedApp.objects.filter(pk=provision.pk, status="stopped").update(
+            status="running", last_modified=timezone.now(),
+        )
+        events.add("Container wieder gestartet.")
+    return True
+
+
+@shared_task(bind=True, name='paas.tasks.prune_provision_events')
+def prune_provision_events(self):
+    """
+    Setzt die Aufbewahrungsregel für ProvisionEvents durch (Alter + Anzahl pro Provision).
+    Wird stündlich von Celery Beat aufgerufen. Alte ProvisionSpans und
+    ContainerUsageSamples werden im selben Lauf entfernt.
+    """
+    prune_events()
+    prune_spans()
+    prune_usage()
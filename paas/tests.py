@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .fakehost import FakeHostProfile, fake_hosts
+from .management.commands.bench_controller import Command as BenchCommand
+from .models import ProvisionedApp, RemoteHost
+from .tasks import deploy_app_task
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class MyAppsEtagTests(TestCase):
+    """ETag von my_apps_json muss Statuswechsel aus den Tasks abbilden."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('etag', password='x')
+        self.client.force_login(self.user)
+        app = BenchCommand()._seed_app()
+        host = RemoteHost.objects.create(
+            hostname='etag.invalid', ip_address='10.98.0.1', ssh_user='deploy', ssh_key_path='/dev/null',
+        )
+        self.provision = ProvisionedApp.objects.create(user=self.user, app=app, host=host, status='pending')
+
+    def _get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('paas_my_apps_json'), **headers)
+
+    def test_deploy_status_change_invalidates_etag(self):
+        etag = self._get()['ETag']
+        self.assertEqual(self._get(etag).status_code, 304)
+
+        with fake_hosts(FakeHostProfile(latency=0, connect_latency=0)):
+            deploy_app_task(self.provision.pk)
+        self.provision.refresh_from_db()
+        self.assertEqual(self.provision.status, 'running')
+
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'running')
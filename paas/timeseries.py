@@ -0,0 +1,170 @@
+"""
+Zeitreihen der Host-Metriken in Redis, verdichtet für Trends und Kapazitätsplanung.
+
+Pro Host und Auflösung ein Ringpuffer (``LPUSH`` + ``LTRIM``) aus gepackten
+:class:`~paas.agent.HostSample` (53 Bytes pro Eintrag, neuester vorn):
+
+========  ==========================  ======================
+Stufe     Inhalt                      Kapazität
+========  ==========================  ======================
+``raw``   jede Messung                :data:`RAW_CAPACITY`
+``1m``    Minutenmittel               1 Tag
+``1h``    Stundenmittel               90 Tage
+========  ==========================  ======================
+
+Die Verdichtung läuft beim Schreiben: jede Messung fließt in einen offenen
+Minuten- und Stunden-Bucket (Summen, Anzahl, Spitzen-Load) unter
+``host_metrics:<id>:acc``. Kommt die erste Messung des nächsten Intervalls,
+wird der Bucket als Mittelwert in seine Reihe geschrieben. Für beliebig viele
+Hosts kostet :func:`append` zwei Roundtrips (``MGET`` der Buckets, Pipeline
+mit allen Schreibzugriffen).
+
+Quellen sind die Agent-Berichte (``paas.tasks.sample_host_metrics``, alle
+15 Sekunden) und die SSH-Abfrage in ``update_remote_loads`` für Hosts ohne Agent.
+"""
+
+import json
+import logging
+import math
+from typing import Iterable
+
+import redis
+
+from config.cache import get_redis, make_key
+from .agent import HostSample, decode, encode
+
+logger = logging.getLogger(__name__)
+
+RAW = "raw"
+MINUTE = "1m"
+HOUR = "1h"
+
+RAW_CAPACITY = 240
+# Stufe → (Intervall in Sekunden, Kapazität)
+ROLLUPS = {
+    MINUTE: (60, 24 * 60),
+    HOUR: (3600, 90 * 24),
+}
+CAPACITY = {RAW: RAW_CAPACITY, **{name: capacity for name, (_, capacity) in ROLLUPS.items()}}
+# Reihen eines gelöschten Hosts verschwinden von selbst
+SERIES_TTL = 100 * 24 * 60 * 60
+
+# Felder, die im Bucket gemittelt werden (ohne Zeitstempel und Spitze)
+_AVERAGED = tuple(f for f in HostSample._fields if f not in ("timestamp", "load1_peak"))
+_INTEGER = {"cpus", "mem_total", "swap_total", "containers"}
+
+
+def _series_key(host_id: int, resolution: str) -> str:
+    return make_key("host_metrics", host_id, resolution)
+
+
+def _acc_key(host_id: int) -> str:
+    return make_key("host_metrics", host_id, "acc")
+
+
+def _push(pipe, host_id: int, resolution: str, sample: HostSample) -> None:
+    key = _series_key(host_id, resolution)
+    pipe.lpush(key, encode(sample))
+    pipe.ltrim(key, 0, CAPACITY[resolution] - 1)
+    pipe.expire(key, SERIES_TTL)
+
+
+def _close(bucket: dict) -> HostSample:
+    count = bucket["n"]
+    values = {
+        name: (round(total / count) if name in _INTEGER else total / count)
+        for name, total in zip(_AVERAGED, bucket["sum"])
+    }
+    return HostSample(timestamp=bucket["start"], load1_peak=bucket["peak"], **values)
+
+
+def _accumulate(state: dict, resolution: str, width: int, sample: HostSample) -> HostSample | None:
+    """Messung in den offenen Bucket; liefert den abgeschlossenen Bucket beim Intervallwechsel."""
+    start = math.floor(sample.timestamp / width) * width
+    bucket = state.get(resolution)
+    closed = None
+    if bucket and bucket["start"] != start:
+        closed = _close(bucket)
+        bucket = None
+    if bucket is None:
+        bucket = {"start": start, "n": 0, "sum": [0.0] * len(_AVERAGED), "peak": 0.0}
+    bucket["n"] += 1
+    bucket["sum"] = [total + getattr(sample, name) for total, name in zip(bucket["sum"], _AVERAGED)]
+    bucket["peak"] = max(bucket["peak"], sample.load1_peak)
+    state[resolution] = bucket
+    return closed
+
+
+# ----------------------------------------------------------------------
+# Schreiben
+# ----------------------------------------------------------------------
+def append(samples: dict[int, HostSample]) -> int:
+    """
+    Neue Messungen (Host-ID → Messung) anhängen und verdichten. Messungen, die
+    nicht neuer sind als die zuletzt geschriebene des Hosts, werden übergangen –
+    derselbe Agent-Bericht darf mehrfach ankommen. Liefert die Zahl der neuen Messungen.
+    """
+    if not samples:
+        return 0
+    host_ids = list(samples)
+    try:
+        r = get_redis()
+        states = r.mget([_acc_key(host_id) for host_id in host_ids])
+        pipe = r.pipeline(transaction=False)
+        written = 0
+        for host_id, raw_state in zip(host_ids, states):
+            sample = samples[host_id]
+            state = json.loads(raw_state) if raw_state else {}
+            if sample.timestamp <= state.get("last", 0):
+                continue
+            state["last"] = sample.timestamp
+            _push(pipe, host_id, RAW, sample)
+            for resolution, (width, _) in ROLLUPS.items():
+                closed = _accumulate(state, resolution, width, sample)
+                if closed is not None:
+                    _push(pipe, host_id, resolution, closed)
+            pipe.set(_acc_key(host_id), json.dumps(state), ex=SERIES_TTL)
+            written += 1
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning("Host-Metriken nicht gespeichert: %s", exc)
+        return 0
+    return written
+
+
+# ----------------------------------------------------------------------
+# Lesen
+# ----------------------------------------------------------------------
+def series(host_id: int, resolution: str = MINUTE, limit: int | None = None) -> list[HostSample]:
+    """Die letzten ``limit`` Einträge einer Stufe, älteste zuerst."""
+    if resolution not in CAPACITY:
+        raise ValueError(f"Unbekannte Auflösung {resolution!r} – erlaubt: {', '.join(CAPACITY)}")
+    end = (limit or CAPACITY[resolution]) - 1
+    raw = get_redis().lrange(_series_key(host_id, resolution), 0, end)
+    return [sample for sample in map(decode, reversed(raw)) if sample is not None]
+
+
+def summarize(samples: Iterable[HostSample]) -> dict | None:
+    """Mittel und Spitzen eines Zeitraums für die Kapazitätsplanung; ``None`` ohne Daten."""
+    samples = list(samples)
+    if not samples:
+        return None
+    count = len(samples)
+    return {
+        "samples": count,
+        "since": samples[0].timestamp,
+        "load_avg": sum(s.load1 for s in samples) / count,
+        "load_peak": max(s.load1_peak for s in samples),
+        "load_per_cpu": sum(s.load1 / max(s.cpus, 1) for s in samples) / count,
+        "mem_avg": sum(s.mem_used for s in samples) / count,
+        "mem_peak": max(s.mem_used for s in samples),
+        "swap_peak": max(s.swap_used for s in samples),
+        "home_used": samples[-1].home_used,
+        "docker_used": samples[-1].docker_used,
+        "containers": samples[-1].containers,
+    }
+
+
+def clear(host_id: int) -> None:
+    """Alle Reihen eines Hosts verwerfen."""
+    get_redis().delete(_acc_key(host_id), *(_series_key(host_id, name) for name in CAPACITY))
@@ -0,0 +1,437 @@
+"""
+Transport-Schicht: Kommandos, Dateien und Streams auf einem RemoteHost.
+
+Bisher arbeitete ``paas.tasks`` direkt mit einem Paramiko-``SSHClient`` bzw.
+dem Ersatz ``LocalSSH`` und erkannte am Rückgabetyp von ``exec_command``,
+womit es gerade sprach. Jetzt bietet jeder Backend dieselbe Schnittstelle
+(:class:`Transport`) und dasselbe Ergebnis (:class:`CommandResult`):
+
+* :class:`ParamikoTransport` – eine Paramiko-Verbindung pro Operation,
+  Kommandos über eine langlebige Shell (:class:`~paas.shell.RemoteShell`),
+  Dateien per SFTP.
+* :class:`OpenSSHTransport` – das ``ssh``-Binary mit ``ControlMaster``: der
+  Handshake passiert einmal pro Host und ``OPENSSH_CONTROL_PERSIST``-Fenster,
+  alle weiteren Aufrufe (auch aus anderen Worker-Prozessen) laufen als Kanal
+  über dieselbe Verbindung. Die Crypto von OpenSSH ist bei großen Dateien
+  deutlich schneller als Paramikos reines Python.
+* :class:`LocalTransport` – der Controller-Host selbst (ohne SSH).
+
+Welcher Backend verwendet wird, steht pro Host in ``RemoteHost.transport``:
+
+    with open_transport(host) as transport:
+        result = transport.exec("docker ps -q")
+        if result.ok:
+            transport.put("~/app/.env", content)
+"""
+
+import logging
+import os
+import selectors
+import shlex
+import signal
+import socket
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+import paramiko
+from django.conf import settings
+
+from . import deadlines, health
+from .models import RemoteHost
+from .shell import ProcessShell, RemoteShell, ShellError
+from .ssh_pool import CONNECT_TIMEOUT, open_ssh_client, pool
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+
+# Fehler der Verbindung (nicht des Kommandos) – zählen für den Host-Breaker (paas.health)
+TRANSPORT_ERRORS = (OSError, ShellError, paramiko.SSHException)
+
+
+class CommandResult(NamedTuple):
+    """Ergebnis eines Kommandos (``stdout``/``stderr`` ohne umschließende Leerzeichen)."""
+    exit_code: int
+    stdout: str
+    stderr: str
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+
+class Stream(Protocol):
+    """Laufendes Kommando, dessen Ausgabe (stdout+stderr) gelesen wird – z.B. ``docker logs -f``."""
+
+    def settimeout(self, timeout: float | None) -> None: ...
+
+    def recv(self, size: int) -> bytes:
+        """Nächste Daten; ``b""`` am Ende, ``socket.timeout`` nach ``settimeout``."""
+        ...
+
+    def close(self) -> None: ...
+
+
+class Transport(ABC):
+    """
+    Verbindung zu einem Host für die Dauer einer Operation.
+
+    Unterklassen implementieren :meth:`exec`, :meth:`put`, :meth:`get` und :meth:`stream`.
+    """
+
+    def __init__(self, host: RemoteHost):
+        self.host = host
+
+    @property
+    def username(self) -> str:
+        return self.host.ssh_user
+
+    @property
+    def kills_on_timeout(self) -> bool:
+        """
+        Beendet :meth:`exec` ein Kommando nach seinem Timeout auch auf dem Host?
+        Sonst muss ``paas.deadlines.remote_command`` es dort mit ``timeout -k`` begrenzen.
+        """
+        return False
+
+    @abstractmethod
+    def exec(self, cmd: str, timeout: float | None = None) -> CommandResult:
+        """Führt ``cmd`` in einer POSIX-Shell aus (Timeout: ``SSH_COMMAND_TIMEOUT``)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, path: str, content: str) -> None:
+        """Schreibt ``content`` nach ``path`` (``~`` = Home des SSH-Users)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, path: str) -> str:
+        """Liest ``path``; ``FileNotFoundError``, wenn es die Datei nicht gibt."""
+        raise NotImplementedError
+
+    def exists(self, path: str) -> bool:
+        return self.exec(f"test -e {_quote_path(path)}").ok
+
+    @abstractmethod
+    def stream(self, cmd: str) -> Stream:
+        """Startet ``cmd`` und liefert seine Ausgabe fortlaufend (ohne Kommando-Timeout)."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _quote_path(path: str) -> str:
+    """Shell-Quoting, das ein führendes ``~/`` als ``"$HOME"/`` erhält."""
+    path = str(path)
+    if path == "~":
+        return '"$HOME"'
+    if path.startswith("~/"):
+        return '"$HOME"/' + shlex.quote(path[2:])
+    return shlex.quote(path)
+
+
+def _command_timeout(timeout: float | None) -> float:
+    # ohne explizites Timeout: SSH_COMMAND_TIMEOUT, begrenzt durch das laufende Zeitbudget
+    return timeout if timeout is not None else deadlines.command_timeout()
+
+
+# ----------------------------------------------------------------------
+# Paramiko
+# ----------------------------------------------------------------------
+class ParamikoTransport(Transport):
+    """Eigene Paramiko-Verbindung; Kommandos über eine Shell-Sitzung, Dateien per SFTP."""
+
+    def __init__(self, host: RemoteHost, client: paramiko.SSHClient | None = None):
+        super().__init__(host)
+        self.client = client or open_ssh_client(host)
+        self._shell: RemoteShell | None = None
+        self._sftp: paramiko.SFTPClient | None = None
+
+    @property
+    def username(self) -> str:
+        return self.client.get_transport().get_username()
+
+    @property
+    def kills_on_timeout(self) -> bool:
+        # nur die Shell-Sitzung kennt die PID; ein geschlossener Kanal lässt das Kommando weiterlaufen
+        return settings.SSH_PERSISTENT_SHELL
+
+    def exec(self, cmd, timeout=None):
+        if not settings.SSH_PERSISTENT_SHELL:
+            return self._exec_channel(cmd, _command_timeout(timeout))
+        if self._shell is None or self._shell.closed:
+            self._shell = RemoteShell(self.client, settings.SSH_COMMAND_TIMEOUT)
+        return CommandResult(*self._shell.run(cmd, _command_timeout(timeout)))
+
+    def _exec_channel(self, cmd, timeout):
+        # Kanal-Timeout gilt pro recv(); den Exit-Status ebenfalls nur begrenzt abwarten
+        _, stdout, stderr = self.client.exec_command(cmd, timeout=timeout)
+        channel = stdout.channel
+        try:
+            out = stdout.read().decode(errors="replace").strip()
+            err = stderr.read().decode(errors="replace").strip()
+            if not channel.status_event.wait(timeout):
+                raise TimeoutError(f"Kein Exit-Status nach {timeout:g}s")
+        except TimeoutError:
+            channel.close()
+            raise
+        return CommandResult(channel.recv_exit_status(), out, err)
+
+    def _sftp_client(self) -> paramiko.SFTPClient:
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        # hängende Übertragungen enden mit socket.timeout (= TimeoutError)
+        self._sftp.get_channel().settimeout(_command_timeout(None))
+        return self._sftp
+
+    def _sftp_path(self, path: str) -> str:
+        # SFTP kennt kein „~“, relative Pfade beziehen sich aber aufs Home
+        path = str(path)
+        return path[2:] if path.startswith("~/") else path
+
+    def put(self, path, content):
+        with self._sftp_client().open(self._sftp_path(path), "w") as f:
+            f.write(content)
+
+    def get(self, path):
+        try:
+            with self._sftp_client().open(self._sftp_path(path), "r") as f:
+                return f.read().decode()
+        except IOError as exc:
+            raise FileNotFoundError(path) from exc
+
+    def exists(self, path):
+        try:
+            self._sftp_client().stat(self._sftp_path(path))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stream(self, cmd):
+        channel = self.client.get_transport().open_session(timeout=CONNECT_TIMEOUT)
+        channel.set_combine_stderr(True)
+        channel.exec_command(cmd)
+        return channel
+
+    def close(self):
+        for resource in (self._shell, self._sftp, self.client):
+            if resource is not None:
+                resource.close()
+
+
+class _PooledStream:
+    """Kanal der gepoolten Paramiko-Verbindung (``paas.ssh_pool``)."""
+
+    def __init__(self, host, cmd: str, timeout: float | None):
+        self.host = host
+        self.channel = pool.open_channel(host, cmd, timeout)
+
+    def settimeout(self, timeout):
+        self.channel.settimeout(timeout)
+
+    def recv(self, size):
+        return self.channel.recv(size)
+
+    def close(self):
+        pool.close_channel(self.host, self.channel)
+
+
+# ----------------------------------------------------------------------
+# Prozesse (lokal und OpenSSH)
+# ----------------------------------------------------------------------
+class _ProcessStream:
+    """Ausgabe eines Kindprozesses mit der Schnittstelle eines Paramiko-Kanals."""
+
+    def __init__(self, argv: list[str]):
+        self._proc = subprocess.Popen(
+            argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._proc.stdout, selectors.EVENT_READ)
+        self._timeout = None
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def recv(self, size):
+        if not self._selector.select(self._timeout):
+            raise socket.timeout("timed out")
+        return os.read(self._proc.stdout.fileno(), size)
+
+    def close(self):
+        # Pipe und Selector schließt der GC, sobald auch der lesende Thread fertig ist –
+        # ein recv() in einem anderen Thread endet mit b"" (EOF)
+        try:
+            os.killpg(self._proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+
+
+class _ProcessTransport(Transport):
+    """Gemeinsame Logik für Backends, die Kommandos über einen Prozess ausführen."""
+
+    # Kommandos laufen auf einem anderen Host (ssh) – beenden nur über die Shell-Sitzung
+    remote = True
+
+    def __init__(self, host: RemoteHost):
+        super().__init__(host)
+        self._shell: ProcessShell | None = None
+
+    @property
+    def kills_on_timeout(self) -> bool:
+        # lokal beendet _run die ganze Prozessgruppe, remote nur die Shell-Sitzung
+        return settings.SSH_PERSISTENT_SHELL or not self.remote
+
+    @abstractmethod
+    def _argv(self, cmd: str) -> list[str]:
+        """argv, das ``cmd`` in einer Shell auf dem Zielhost ausführt."""
+        raise NotImplementedError
+
+    def _run(self, cmd: str, timeout: float | None, stdin: bytes | None = None) -> subprocess.CompletedProcess:
+        limit = _command_timeout(timeout)
+        with subprocess.Popen(
+            self._argv(cmd), stdin=subprocess.DEVNULL if stdin is None else subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True,
+        ) as proc:
+            try:
+                out, err = proc.communicate(stdin, timeout=limit)
+            except subprocess.TimeoutExpired as exc:
+                # ganze Prozessgruppe – subprocess.run() beendet nur das direkte Kind
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.communicate()
+                raise TimeoutError(f"Kommando nach {limit:g}s abgebrochen") from exc
+        return subprocess.CompletedProcess(proc.args, proc.returncode, out, err)
+
+    def exec(self, cmd, timeout=None):
+        if not settings.SSH_PERSISTENT_SHELL:
+            res = self._run(cmd, timeout)
+            return CommandResult(
+                res.returncode,
+                res.stdout.decode(errors="replace").strip(),
+                res.stderr.decode(errors="replace").strip(),
+            )
+        if self._shell is None or self._shell.closed:
+            self._shell = ProcessShell(
+                self._argv("/bin/sh"), settings.SSH_COMMAND_TIMEOUT,
+                kill_argv=self._argv if self.remote else None,
+            )
+        return CommandResult(*self._shell.run(cmd, _command_timeout(timeout)))
+
+    def put(self, path, content):
+        quoted = _quote_path(path)
+        res = self._run(f"mkdir -p \"$(dirname {quoted})\" && cat > {quoted}", None, content.encode())
+        if res.returncode:
+            raise OSError(f"{path} nicht schreibbar: {res.stderr.decode(errors='replace').strip()}")
+
+    def get(self, path):
+        res = self._run(f"cat {_quote_path(path)}", None)
+        if res.returncode:
+            raise FileNotFoundError(path)
+        return res.stdout.decode()
+
+    def stream(self, cmd):
+        return _ProcessStream(self._argv(cmd))
+
+    def close(self):
+        if self._shell is not None:
+            self._shell.close()
+
+
+class LocalTransport(_ProcessTransport):
+    """Der Controller-Host selbst – Kommandos über ein lokales ``/bin/sh``."""
+
+    remote = False
+
+    def _argv(self, cmd):
+        return ["/bin/sh", "-c", cmd]
+
+    def put(self, path, content):
+        # Ohne Shell-Umweg: direkt schreiben
+        local_path = Path(path).expanduser()
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        local_path.write_text(content, encoding="utf-8")
+
+    def get(self, path):
+        return Path(path).expanduser().read_text(encoding="utf-8")
+
+    def exists(self, path):
+        return Path(path).expanduser().exists()
+
+
+class OpenSSHTransport(_ProcessTransport):
+    """
+    ``ssh``-Binary mit ``ControlMaster=auto``: die erste Verbindung pro Host
+    wird zum Master (Socket unter ``OPENSSH_CONTROL_DIR``), alle weiteren
+    ``ssh``-Aufrufe laufen darüber. Der Master bleibt nach dem letzten Aufruf
+    noch ``OPENSSH_CONTROL_PERSIST`` Sekunden bestehen.
+    """
+
+    def _base_argv(self) -> list[str]:
+        control_dir = Path(settings.OPENSSH_CONTROL_DIR)
+        control_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        argv = [
+            settings.OPENSSH_BINARY,
+            "-T",
+            "-o", "BatchMode=yes",
+            "-o", "StrictHostKeyChecking=accept-new",
+            "-o", f"ConnectTimeout={CONNECT_TIMEOUT}",
+            "-o", "ServerAliveInterval=30",
+            "-o", "ControlMaster=auto",
+            # %C = Hash aus Host, Port und User → kurzer Socket-Pfad
+            "-o", f"ControlPath={control_dir}/%C",
+            "-o", f"ControlPersist={settings.OPENSSH_CONTROL_PERSIST}",
+            "-l", self.host.ssh_user,
+        ]
+        if self.host.ssh_key_path:
+            argv += ["-i", str(Path(self.host.ssh_key_path).expanduser())]
+        return argv + [self.host.hostname]
+
+    def _argv(self, cmd):
+        # ssh fügt die Argumente mit Leerzeichen zusammen und übergibt sie der Login-Shell
+        return self._base_argv() + ["--", cmd]
+
+
+TRANSPORTS = {
+    RemoteHost.TRANSPORT_PARAMIKO: ParamikoTransport,
+    RemoteHost.TRANSPORT_OPENSSH: OpenSSHTransport,
+    RemoteHost.TRANSPORT_LOCAL: LocalTransport,
+}
+
+
+def open_transport(host: RemoteHost) -> Transport:
+    """Transport nach ``host.transport`` (unbekannt → Paramiko)."""
+    return TRANSPORTS.get(host.transport, ParamikoTransport)(host)
+
+
+def open_stream(host: RemoteHost, cmd: str, timeout: float | None = None) -> Stream:
+    """
+    Lang laufendes Kommando (z.B. ``docker logs -f``). Paramiko-Hosts nutzen die
+    gepoolte Verbindung; bei OpenSSH übernimmt der ControlMaster das Pooling.
+    Wie ``paas.tasks._ssh_client``: offener Breaker → sofort ``HostUnavailable``.
+    """
+    health.guard(host)
+    try:
+        if host.transport in (RemoteHost.TRANSPORT_PARAMIKO, "", None):
+            stream = _PooledStream(host, cmd, timeout)
+        else:
+            stream = open_transport(host).stream(cmd)
+    except TRANSPORT_ERRORS as exc:
+        health.record_failure(host, exc)
+        raise
+    health.record_success(host)
+    return stream
@@ -0,0 +1,127 @@
+"""
+Ressourcenverbrauch pro Container.
+
+``collect_container_usage`` (``paas.tasks``) schickt pro Host *ein*
+:data:`STATS_CMD` – ``docker stats`` über alle laufenden Container. Die
+Zeilen werden über ``container_name`` den Provisionen des Hosts zugeordnet
+und als :class:`~paas.models.ContainerUsageSample` per ``bulk_create``
+gespeichert; Container ohne Provision (fremde Dienste auf dem Host) fallen weg.
+
+Die Messwerte sind die Grundlage für Leerlauf-Erkennung, faire Platzierung
+und Limits. :func:`prune_usage` hält die Tabelle klein
+(``container_usage_retention_days``).
+"""
+
+import json
+import logging
+import re
+from datetime import timedelta
+
+from django.utils import timezone
+
+from config.registry import registry
+from .models import ContainerUsageSample, ProvisionedApp
+
+logger = logging.getLogger(__name__)
+
+# Fallback-Werte, überschreibbar per PlatformSetting
+DEFAULT_RETENTION_DAYS = 14
+
+# Eine JSON-Zeile pro Container; "{{json .}}" statt "json", das erst neuere Docker-Versionen kennen
+STATS_CMD = "docker stats --no-stream --format '{{json .}}'"
+
+_SIZE_RE = re.compile(r"^\s*([0-9.]+)\s*([a-zA-Z]*)\s*$")
+_UNITS = {
+    "": 1, "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+
+def parse_size(text: str) -> int:
+    """``"25.5MiB"``, ``"1.05kB"`` → Bytes; ``"--"`` (keine Angabe) → 0."""
+    match = _SIZE_RE.match(text)
+    if not match:
+        return 0
+    number, unit = match.groups()
+    try:
+        return int(float(number) * _UNITS[unit.lower()])
+    except (KeyError, ValueError):
+        raise ValueError(f"Unbekannte Größe: {text!r}")
+
+
+def _percent(text: str) -> float:
+    try:
+        return float(text.strip().rstrip("%"))
+    except ValueError:
+        return 0.0
+
+
+def _pair(text: str) -> tuple[int, int]:
+    # "1.05kB / 0B"
+    first, _, second = text.partition("/")
+    return parse_size(first), parse_size(second)
+
+
+def parse_stats(output: str) -> dict[str, dict]:
+    """Ausgabe von :data:`STATS_CMD` → Containername → Messwerte (Feldnamen des Modells)."""
+    rows = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            logger.warning("docker stats: Zeile nicht lesbar: %r", line)
+            continue
+        try:
+            net_rx, net_tx = _pair(row.get("NetIO", ""))
+            block_read, block_write = _pair(row.get("BlockIO", ""))
+            memory, _ = _pair(row.get("MemUsage", ""))
+        except ValueError as exc:
+            # Nur diese Zeile verwerfen, nicht die Messungen aller Container des Hosts
+            logger.warning("docker stats: Zeile übersprungen (%s): %r", exc, line)
+            continue
+        pids = row.get("PIDs", "")
+        rows[row.get("Name", "").lstrip("/")] = {
+            "cpu": _percent(row.get("CPUPerc", "")),
+            "memory": memory,
+            "net_rx": net_rx,
+            "net_tx": net_tx,
+            "block_read": block_read,
+            "block_write": block_write,
+            "pids": int(pids) if pids.isdigit() else 0,
+        }
+    return rows
+
+
+def record_usage(host, output: str, now=None) -> int:
+    """Zeilen eines Hosts den Provisionen zuordnen und gesammelt speichern."""
+    rows = parse_stats(output)
+    if not rows:
+        return 0
+    now = now or timezone.now()
+    provisions = dict(
+        ProvisionedApp.objects.filter(host=host, container_name__in=rows)
+        .exclude(status='deleted')
+        .values_list('container_name', 'pk')
+    )
+    samples = [
+        ContainerUsageSample(provision_id=provisions[name], host_id=host.pk, sampled_at=now, **values)
+        for name, values in rows.items()
+        if name in provisions
+    ]
+    ContainerUsageSample.objects.bulk_create(samples, batch_size=500)
+    return len(samples)
+
+
+def prune_usage(now=None) -> int:
+    """Messungen älter als ``container_usage_retention_days`` löschen."""
+    now = now or timezone.now()
+    retention_days = registry.get_int("container_usage_retention_days", DEFAULT_RETENTION_DAYS)
+    deleted, _ = ContainerUsageSample.objects.filter(
+        sampled_at__lt=now - timedelta(days=retention_days)
+    ).delete()
+    logger.info("ContainerUsageSamples bereinigt: %d", deleted)
+    return deleted
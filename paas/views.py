@@ -7,15 +7,32 @@ from django.utils import timezone
 from django.urls import reverse
 
 from django.utils.dateparse import parse_duration
-from .models import ProvisionedApp, RemoteHost, AppDefinition, AppEnvVarPerApp
+from .models import ProvisionedApp, RemoteHost
 from .forms import DeployForm, DeployFormAdmin
+from .specs import get_spec, get_spec_by_name
+from .catalog import catalog_version, FRAGMENT_TIMEOUT
 from .strategies import LeastLoadStrategy
-from .tasks import deploy_app_task, delete_container_task
-from core.settings import PLATFORM_NAME, USER_RATELIMIT_PER_HOUR
+from .tasks import deploy_app_task, delete_container_task, wake_provision_task
+from core.settings import PLATFORM_NAME, USER_RATELIMIT_PER_HOUR, API_RATELIMIT_PER_HOUR
 from django_smart_ratelimit import rate_limit
 
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponse, StreamingHttpResponse, JsonResponse, HttpResponseNotModified
+from django.db.models import Count, Max
+from django.utils.http import parse_etags
+from asgiref.sync import sync_to_async
+import hashlib
+from .decorators import async_rate_limit
+from .pagination import akeyset_page
+from .models import ProvisionEvent
+from .streams import acquire_stream_slot, release_stream_slot, container_log_events
+from . import metrics as prometheus_metrics
+
+
+# max. Events pro Antwort von provision_progress
+PROGRESS_PAGE_SIZE = 100
+# Einträge pro Seite in my_apps (Keyset‑Pagination)
+MY_APPS_PAGE_SIZE = 25
 
 
 def _check_user_limits(user, requested_duration, request):
@@ -58,6 +75,14 @@ def _check_user_limits(user, requested_duration, request):
     return True
 
 
+def _catalog_context():
+  """Kontext für das ``{% cache %}``‑Fragment der App‑Beschreibung: Katalog‑Version als Schlüssel."""
+  return {
+      'catalog_version': catalog_version(),
+      'fragment_timeout': FRAGMENT_TIMEOUT,
+  }
+
+
 @login_required
 @rate_limit(key='user', rate=f'{USER_RATELIMIT_PER_HOUR}/h')
 def select_app(request):
@@ -121,6 +146,7 @@ def deploy_app(request):
                 app_def = form.cleaned_data.get('app')
                 duration = form.cleaned_data['duration']  # timedelta oder None
                 target_host = form.cleaned_data.get('target_host')
+                spec = get_spec(app_def.pk) if app_def else None
 
                 # Nur die Vorschau anzeigen – kein Deploy
                 context = {
@@ -128,8 +154,9 @@ def deploy_app(request):
                     'duration_selected': duration,
                     'target_host_selected': target_host,
                     'app_description': app_def.description,
+                    **_catalog_context(),
                     'readonly': True,
-                    'app_env_vars': AppEnvVarPerApp.objects.filter(app=app_def, editable=True) if app_def else [], # nur editierbare Umgeb.Variablen an den Client schicken
+                    'app_env_vars': spec.editable_env_vars if spec else [], # nur editierbare Umgeb.Variablen an den Client schicken
                     "PLATFORM_NAME": PLATFORM_NAME,
                 }
                 return render(request, 'paas/deploy_app.html', context)
@@ -151,11 +178,10 @@ def deploy_app(request):
 def _handle_deploy(request, form):
 
     app_selected = request.POST.get('app_selected')
-    print(app_selected)
-    try:
-        app_def = AppDefinition.objects.get(name=app_selected)
-    except AppDefinition.DoesNotExist:
-        app_def = None  # oder andere Fehlerbehandlung
+    # Deployment-Spec aus dem Cache statt AppDefinition/AppEnvVarPerApp-Queries
+    spec = get_spec_by_name(app_selected)
+    if spec is None:
+        return render_deploy(request, error="Unbekannte App ausgewählt.")
 
     duration = request.POST.get('duration_selected', 1)
 
@@ -174,7 +200,7 @@ def _handle_deploy(request, form):
             request,
             error=("Der ausgewählte Host ist ausschließlich für Super‑Users "
                    "reserviert. Bitte wähle einen anderen Host."),
-            app_def=app_def,
+            spec=spec,
         )
 
     # 1) Editierbare Environment‑Variablen extrahieren
@@ -185,18 +211,16 @@ def _handle_deploy(request, form):
     }
 
     # 1.1) Nicht‑editierbare Umgebungsvariablen ergänzen
-    non_editable_qs = AppEnvVarPerApp.objects.filter(app=app_def, editable=False)
-
-    for var in non_editable_qs:
+    for var in spec.non_editable_env_vars:
         # Falls die Variable bereits als editierbar vorkommt, behalten wir
         # den editierbaren Wert (setdefault tut genau das)
         env_vars.setdefault(var.key, var.value)
 
     # 2) Validierung der Env‑Variablen
-    errors = _validate_env_vars(app_def, env_vars)
+    errors = _validate_env_vars(spec, env_vars)
     if errors:
         return render_deploy(
-            request, error=' '.join(errors), app_def=app_def
+            request, error=' '.join(errors), spec=spec
         )
 
 
@@ -209,12 +233,17 @@ def _handle_deploy(request, form):
         strategy = LeastLoadStrategy()  # ggf. RoundRobinStrategy()
         host = strategy.select_target(request, request.user,
                                       RemoteHost.objects.all())
+        if host is None:
+            # kein erlaubter Host erreichbar (Breaker offen, siehe paas/health.py)
+            return render_deploy(
+                request, error="Derzeit ist kein Server verfügbar. Bitte später erneut versuchen.", spec=spec
+            )
 
     # 4) Limits prüfen
     if not _check_user_limits(request.user, duration, request):
         # Rückmeldung an den User
         return render_deploy(
-            request, error=' '.join("Ihre Limits wurden überschritten."), app_def=app_def
+            request, error=' '.join("Ihre Limits wurden überschritten."), spec=spec
         )
 
     # 5) expires_at berechnen
@@ -225,12 +254,11 @@ def _handle_deploy(request, form):
 
     # 6) Provision‑Objekt erzeugen
     print(request.user)
-    print(app_def)
     print(host)
     print(expires_at)
     provision = ProvisionedApp.objects.create(
         user=request.user,
-        app=app_def,
+        app_id=spec.app_id,
         host=host,
         expires_at=expires_at,
         status='pending',
@@ -247,14 +275,13 @@ def _handle_deploy(request, form):
         "PLATFORM_NAME": PLATFORM_NAME,
     })
 
-def _validate_env_vars(app, env_vars):
+def _validate_env_vars(spec, env_vars):
     """
-    Prüft die übergebenen Env‑Variablen gegen die DB‑Definitionen.
+    Prüft die übergebenen Env‑Variablen gegen die Definitionen der Deployment‑Spec.
     Gibt eine Liste von Fehlermeldungen zurück.
     """
-    qs = AppEnvVarPerApp.objects.filter(app=app)
-    defined_keys = set(qs.values_list('key', flat=True))
-    required_keys = set(qs.filter(optional=False).values_list('key', flat=True))
+    defined_keys = spec.defined_keys
+    required_keys = spec.required_keys
 
     errors = []
 
@@ -273,11 +300,12 @@ def _validate_env_vars(app, env_vars):
 
     return errors
 
-def render_deploy(request, error=None, app_def=None):
+def render_deploy(request, error=None, spec=None):
     """Render‑Wrapper für die Deploy‑Template‑Seite."""
     context = {
         'readonly': True,
-        'app_env_vars': AppEnvVarPerApp.objects.filter(app=app_def) if app_def else [],
+        'app_env_vars': spec.env_vars if spec else [],
+        **_catalog_context(),
         "PLATFORM_NAME": PLATFORM_NAME,
     }
     if error:
@@ -295,31 +323,87 @@ def deploy_success(request, pk):
       "PLATFORM_NAME": PLATFORM_NAME,
   })
 
+def _my_apps_queryset(user):
+  """Provisionen eines Users inkl. App/Host in *einer* Query, ohne das Legacy‑Log."""
+  return (
+      ProvisionedApp.objects.filter(user=user)
+      .select_related('app', 'host')
+      .defer('log')
+  )
+
+
 @login_required
-@rate_limit(key='user', rate=f'{USER_RATELIMIT_PER_HOUR}/h')
-def my_apps(request):
-  provisions = ProvisionedApp.objects.filter(user=request.user).order_by('-started_at')
+@async_rate_limit(USER_RATELIMIT_PER_HOUR)
+async def my_apps(request):
+  # Async: Seite per async ORM komplett laden, das Template greift danach
+  # nicht mehr auf die DB zu (request.user ist hier nicht verwendbar).
+  user = await request.auser()
+  page = await akeyset_page(_my_apps_queryset(user), request.GET.get('after'), MY_APPS_PAGE_SIZE)
   return render(request, 'paas/my_apps.html', {
-      'provisions': provisions,
+      'provisions': page.items,
+      'next_cursor': page.next_cursor,
+      'is_first_page': not request.GET.get('after'),
+      'show_host': user.is_superuser,
       "PLATFORM_NAME": PLATFORM_NAME,
   })
 
+
+def _my_apps_etag(stats, cursor):
+  """ETag aus jüngster Änderung + Anzahl (Löschungen ändern max(last_modified) nicht)."""
+  latest = stats['latest'].isoformat() if stats['latest'] else '-'
+  raw = f"{latest}|{stats['count']}|{cursor or ''}"
+  return '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+@login_required
+@async_rate_limit(API_RATELIMIT_PER_HOUR)
+async def my_apps_json(request):
+  """
+  JSON‑Variante von my_apps für Polling‑Clients.
+  Unverändert → ``304 Not Modified`` nach einer einzigen Aggregat‑Query.
+  """
+  user = await request.auser()
+  cursor = request.GET.get('after')
+  stats = await ProvisionedApp.objects.filter(user=user).aaggregate(
+      latest=Max('last_modified'), count=Count('id'),
+  )
+  etag = _my_apps_etag(stats, cursor)
+  if etag in parse_etags(request.headers.get('If-None-Match', '')):
+      response = HttpResponseNotModified()
+      response['ETag'] = etag
+      return response
+
+  page = await akeyset_page(_my_apps_queryset(user), cursor, MY_APPS_PAGE_SIZE)
+  items = []
+  for p in page.items:
+      item = _status_payload(p)
+      item.update({
+          'app': p.app.name,
+          'app_display_name': p.app.display_name,
+          'web_port': p.app.hiddenservice_port_web if p.app.app_port_intern_web != 1 else None,
+          'api_port': p.app.hiddenservice_port_api if p.app.app_port_intern_api != 1 else None,
+      })
+      if user.is_superuser:
+          item['host'] = p.host.hostname
+      items.append(item)
+
+  response = JsonResponse({'results': items, 'next': page.next_cursor})
+  response['ETag'] = etag
+  response['Cache-Control'] = 'private, no-cache'
+  return response
+
 @login_required
 @rate_limit(key='user', rate=f'{USER_RATELIMIT_PER_HOUR}/h')
 def delete_app(request, pk):
     """
     2‑Schritt‑Delete: Erstes POST → Bestätigungsseite, zweites POST → Löschen
     """
-    provision = get_object_or_404(ProvisionedApp, pk=pk, user=request.user)
-    provisions = ProvisionedApp.objects.filter(user=request.user).order_by('-started_at')
+    provision = get_object_or_404(ProvisionedApp.objects.defer('log'), pk=pk, user=request.user)
 
-    # App darf nur laufen oder gelöscht werden
-    if provision.status not in ('running', 'deleting'):
+    # App darf nur laufen (oder angehalten sein) oder gelöscht werden
+    if provision.status not in ('running', 'stopped', 'deleting'):
         # Nicht‑zulässige App – einfach weiterleiten
-        return render(request, 'paas/my_apps.html', {
-            'provisions': provisions,
-            "PLATFORM_NAME": PLATFORM_NAME,
-        })
+        return redirect('paas_my_apps')
 
     # ---------- 1. Schritt – Bestätigungsseite ----------
     if request.method == 'POST' and 'confirmed' not in request.POST:
@@ -332,11 +416,8 @@ def delete_app(request, pk):
     # ---------- 2. Schritt – Löschen ----------
     if request.method == 'POST' and 'confirmed' in request.POST:
         # Sicherheits‑Check: der Benutzer muss wieder die App besitzen
-        if provision.status not in ('running', 'deleting'):
-            return render(request, 'paas/my_apps.html', {
-                'provisions': provisions,
-                "PLATFORM_NAME": PLATFORM_NAME,
-            })
+        if provision.status not in ('running', 'stopped', 'deleting'):
+            return redirect('paas_my_apps')
 
         provision.status = 'deleting'
         provision.save()
@@ -345,13 +426,140 @@ def delete_app(request, pk):
         delete_container_task(provision.id)
 
         # Nach erfolgreichem Löschen Weiterleitung
-        return render(request, 'paas/my_apps.html', {
-            'provisions': provisions,
-            "PLATFORM_NAME": PLATFORM_NAME,
-        })
+        return redirect('paas_my_apps')
 
     # Für jede andere Methode (z.B. GET) leiten wir einfach weiter
-    return render(request, 'paas/my_apps.html', {
-        'provisions': provisions,
+    return redirect('paas_my_apps')
+
+
+@login_required
+@rate_limit(key='user', rate=f'{USER_RATELIMIT_PER_HOUR}/h')
+def wake_app(request, pk):
+    """Im Leerlauf angehaltene App (Scale‑to‑Zero, ``paas/idle.py``) wieder starten – nur per POST."""
+    provision = get_object_or_404(ProvisionedApp.objects.defer('log'), pk=pk, user=request.user)
+    if request.method == 'POST' and provision.status == 'stopped':
+        try:
+            # Synchron wie das Löschen – docker start dauert nur Sekunden
+            wake_provision_task(provision.id)
+        except Exception:
+            # Fehler steht im Event-Log der Provision, die App bleibt angehalten
+            pass
+    return redirect('paas_my_apps')
+
+
+@login_required
+@rate_limit(key='user', rate=f'{USER_RATELIMIT_PER_HOUR}/h')
+def app_logs(request, pk):
+    """Seite mit den Live-Logs einer laufenden App (EventSource auf ``stream_logs``)."""
+    provision = get_object_or_404(ProvisionedApp.objects.defer('log'), pk=pk, user=request.user)
+    return render(request, 'paas/app_logs.html', {
+        'provision': provision,
+        'spec': get_spec(provision.app_id),
         "PLATFORM_NAME": PLATFORM_NAME,
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+async def stream_logs(request, pk):
+    """
+    SSE-Endpunkt: ``docker logs -f`` des Containers.
+    Asynchron, damit ein offener Stream unter ASGI keinen Worker blockiert.
+    Das Request-Limit übernimmt hier die Obergrenze gleichzeitiger Streams pro User.
+    """
+    user = await request.auser()
+    provision = await (
+        ProvisionedApp.objects.select_related('host').defer('log')
+        .filter(pk=pk, user=user, status='running').afirst()
+    )
+    if provision is None or provision.host is None:
+        return HttpResponse(status=404)
+
+    # Redis-Aufrufe blockieren – im Threadpool statt auf der Event-Loop (wie async_rate_limit)
+    stream_id = await sync_to_async(acquire_stream_slot, thread_sensitive=False)(user.pk)
+    if stream_id is None:
+        return HttpResponse("Zu viele offene Log-Streams.", status=429, content_type="text/plain")
+
+    try:
+        tail = int(request.GET.get('tail', 100))
+    except ValueError:
+        tail = 100
+    tail = max(0, min(tail, settings.LOG_STREAM_MAX_TAIL))
+
+    try:
+        events = container_log_events(provision, user.pk, stream_id, tail)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+    except Exception:
+        await sync_to_async(release_stream_slot, thread_sensitive=False)(user.pk, stream_id)
+        raise
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ----------------------------------------------------------------------
+# Status‑Polling (JSON, async)
+# ----------------------------------------------------------------------
+def _status_payload(provision):
+  return {
+      'id': provision.pk,
+      'status': provision.status,
+      'onion_address': provision.onion_address,
+      'started_at': provision.started_at.isoformat() if provision.started_at else None,
+      'expires_at': provision.expires_at.isoformat() if provision.expires_at else None,
+      'last_modified': provision.last_modified.isoformat() if provision.last_modified else None,
+  }
+
+
+@login_required
+async def provision_status(request, pk):
+  """Aktueller Status einer Bereitstellung – für Polling aus dem Browser."""
+  user = await request.auser()
+  provision = await (
+      ProvisionedApp.objects.filter(pk=pk, user=user)
+      .only('id', 'status', 'onion_address', 'started_at', 'expires_at', 'last_modified')
+      .afirst()
+  )
+  if provision is None:
+      return JsonResponse({'error': 'not found'}, status=404)
+  return JsonResponse(_status_payload(provision))
+
+
+@login_required
+async def provision_progress(request, pk):
+  """
+  Fortschritt einer Bereitstellung: Status plus ProvisionEvents mit ``id > after``.
+  Der Client merkt sich die letzte ID und fragt nur neue Einträge ab.
+  """
+  user = await request.auser()
+  provision = await (
+      ProvisionedApp.objects.filter(pk=pk, user=user)
+      .only('id', 'status', 'onion_address', 'started_at', 'expires_at', 'last_modified')
+      .afirst()
+  )
+  if provision is None:
+      return JsonResponse({'error': 'not found'}, status=404)
+
+  try:
+      after = int(request.GET.get('after', 0))
+  except ValueError:
+      after = 0
+  events = [
+      {
+          'id': e['id'],
+          'created_at': e['created_at'].isoformat(),
+          'stage': e['stage'],
+          'level': e['level'],
+          'message': e['message'],
+      }
+      async for e in ProvisionEvent.objects.filter(provision_id=provision.pk, id__gt=after)
+      .order_by('id').values('id', 'created_at', 'stage', 'level', 'message')[:PROGRESS_PAGE_SIZE]
+  ]
+  return JsonResponse({**_status_payload(provision), 'events': events})
+
+
+def metrics(request):
+    """Prometheus-Scrape-Endpunkt (Zugriff: ``METRICS_ALLOWED_NETWORKS`` / ``METRICS_TOKEN``)."""
+    if not prometheus_metrics.scrape_allowed(request):
+        return HttpResponseForbidden("Forbidden")
+    body, content_type = prometheus_metrics.render()
+    return HttpResponse(body, content_type=content_type)